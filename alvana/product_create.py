@@ -42,7 +42,7 @@ def create_a_product(sgc:utils.Client, product_info, vendor):
     res = sgc.product_create(title=product_info['title'],
                              description_html=description_html,
                              vendor=vendor, tags=tags, option_lists=options)
-    res2 = [sgc.enable_and_activate_inventory(option2['sku'], []) for option1 in product_info['options'] for option2 in option1['options']]
+    res2 = sgc.enable_and_activate_inventories([option2['sku'] for option1 in product_info['options'] for option2 in option1['options']], [])
     return (res, res2)
 
 def create_products(sgc:utils.Client, product_info_list, vendor):
@@ -1,13 +1,11 @@
+import json
 import string
 import utils
+from helpers.description_template import compiled_template
 from alvana.size_text_to_html_table import size_text_to_html_table
 
 def get_description(product_description, material, made_in):
-    description_html = product_description_template()
-    description_html = description_html.replace('${DESCRIPTION}', product_description)
-    description_html = description_html.replace('${MATERIAL}', material)
-    description_html = description_html.replace('${MADEIN}', made_in)
-    return description_html
+    return compiled_template('alvana').render(DESCRIPTION=product_description, MATERIAL=material, MADEIN=made_in)
 
 
 def get_product_care(product_care_text):
@@ -23,6 +21,8 @@ def main():
     client = utils.client('alvanas')
     rows = client.worksheet_rows(client.sheet_id, 'Product Master')
 
+    metafields = []
+    product_inputs = []
     for row in rows[1:]:
         title = row[1].strip()
         if not title:
@@ -30,39 +30,19 @@ def main():
         print(f'processing {title}')
         product_id = client.product_id_by_title(title)
         size_table_html = size_text_to_html_table(row[string.ascii_uppercase.index('H')].strip())
-        res = client.update_size_table_html_metafield(product_id, size_table_html)
-        print(res)
+        product_care = get_product_care(row[string.ascii_uppercase.index('F')].strip())
+        metafields += [{'ownerId': product_id, 'namespace': 'custom', 'key': 'size_table_html', 'value': size_table_html},
+                       {'ownerId': product_id, 'namespace': 'custom', 'key': 'product_care', 'value': json.dumps(product_care)}]
         product_description = row[string.ascii_uppercase.index('E')].strip()
         made_in = row[string.ascii_uppercase.index('I')].strip()
         material = row[string.ascii_uppercase.index('G')].strip()
-        res = client.update_product_description(product_id, get_description(product_description, material, made_in))
-        print(res)
-        res = client.update_product_care_metafield(product_id, get_product_care(row[string.ascii_uppercase.index('F')].strip()))
-        print(res)
+        product_inputs.append({'id': product_id, 'descriptionHtml': get_description(product_description, material, made_in)})
+    res = client.bulk_update_products(product_inputs)
+    print([row for row in res if not row['success']])
+    res = client.metafields_set(metafields)
+    print(res)
     print('done updating')
 
 
-def product_description_template():
-    return r"""<!DOCTYPE html>
-<html><body>
-  <div id="alvanaProduct">
-    <p>${DESCRIPTION}</p>
-    <br>
-    <table width="100%">
-      <tbody>
-        <tr>
-          <th>素材</th>
-          <td>${MATERIAL}</td>
-        </tr>
-        <tr>
-          <th>原産国</th>
-          <td>${MADEIN}</td>
-        </tr>
-      </tbody>
-    </table>
-  </div>
-</body>
-</html>"""
-
 if __name__ == '__main__':
     main()
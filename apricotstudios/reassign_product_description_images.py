@@ -2,6 +2,7 @@ import os
 import pprint
 import utils
 
+# ignored by upload_and_assign_description_images_to_shopify, still passed as its positional dummy_product_id
 DUMMY_PRODUCT = 'gid://shopify/Product/9035094130944'
 
 localdir = '/Users/taro/Downloads/apricot_studios_psd_to_jpg'
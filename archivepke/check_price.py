@@ -7,18 +7,10 @@ def main():
     title_column = string.ascii_uppercase.index('A')
     client = utils.client('archive-epke')
     rows = client.worksheet_rows(sheet_id, '現 JP EC 価格改定 ')
-    for row in rows[4:]:
-        title = row[title_column]
-        price = int(row[price_column])
-        products = client.products_by_title(title, additional_fields=['status'])
-
-        for product in products:
-            for variant in product['variants']['nodes']:
-                variant_price = int(variant['price'])
-                if price and variant_price != price:
-                    print(f"Status: {product['status']}, Title: {title}, Variant ID: {variant['id']}, Price: {variant_price}, Expected: {price}")
-                elif not price:
-                    print(f"Status: {product['status']}, Title: {title}, Variant ID: {variant['id']}, Price: {variant_price}, Expected: {price}")
+    sheet_prices = [{'title': row[title_column], 'price': row[price_column]} for row in rows[4:]]
+    diff = client.price_diff(sheet_prices, on='title')
+    for row in diff.to_dict('records'):
+        print(f"Status: {row['status']}, Title: {row['title']}, Variant ID: {row['variant_id']}, Price: {row['price']}, Expected: {row['price_expected']}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,23 @@
+from benchmarks.fakes import BenchClient, drive_folders, launch_product_infos
+from benchmarks.measure import measure
+
+
+def test_image_upload_500(benchmark, fake_shop, tmp_path):
+    """
+    Client.process_product_images for 50 products of 2 colors with 5 images each: drive download, validation,
+    staged upload, productCreateMedia, processing wait and the variant images.
+    """
+    shop = fake_shop(media_processing_seconds=0)
+    product_infos = launch_product_infos(50, colors_per_product=2)
+    client = BenchClient(shop, folders=drive_folders(product_infos, images_per_folder=5))
+
+    def create_products():
+        for product_info in product_infos:
+            client.product_create(product_info['title'], '', 'Bench Vendor', [], handle=product_info['handle'],
+                                  option_lists=[[{'カラー': option['カラー']}, option['price'], option['sku']] for option in product_info['options']])
+
+    def process_images():
+        return [client.process_product_images(product_info, str(tmp_path), 'bench_') for product_info in product_infos]
+    res = measure(benchmark, process_images, shop=shop, setup=create_products)
+    assert len(res) == 50
+    assert len(client.medias_by_product_id(client.product_id_by_title(product_infos[0]['title']))) == 10
@@ -0,0 +1,20 @@
+import random
+from benchmarks.fakes import BenchClient
+from benchmarks.measure import measure
+
+
+def sync_inventory(client, sku_quantity_map, location_name):
+    """
+    set_inventory_quantity.py: the quantity of every SKU of a sheet at one location.
+    """
+    location_id = client.location_id_by_name(location_name)
+    return [client.set_inventory_quantity_by_sku_and_location_id(sku, location_id, quantity) for sku, quantity in sku_quantity_map.items()]
+
+
+def test_inventory_sync_2000_skus(benchmark, fake_shop):
+    shop = fake_shop(products=500, variants_per_product=4)
+    client = BenchClient(shop)
+    rnd = random.Random(0)
+    sku_quantity_map = {f'SKU{i:05d}-{j + 1}': rnd.randint(1, 30) for i in range(500) for j in range(4)}
+    res = measure(benchmark, sync_inventory, client, sku_quantity_map, 'Main Warehouse', shop=shop)
+    assert len(res) == 2000 and all(res)
@@ -0,0 +1,29 @@
+from benchmarks.fakes import BenchClient, launch_product_infos, size_table_html
+from benchmarks.measure import measure
+
+
+def create_products(client, product_infos, vendor, location_names):
+    """
+    the launch scripts' product creation: description, productSet with the color variants, inventory tracked and activated.
+    """
+    res = []
+    for product_info in product_infos:
+        description_html = client.get_description_html(product_info['description'], '', product_info['material'],
+                                                       product_info['size_text'], product_info['made_in'], size_table_html)
+        res.append(client.product_create(title=product_info['title'],
+                                         handle=product_info['handle'],
+                                         description_html=description_html,
+                                         vendor=vendor,
+                                         tags=','.join([product_info['release_date'], product_info['collection'], product_info['category']]),
+                                         option_lists=[[{'カラー': option['カラー']}, option['price'], option['sku']] for option in product_info['options']]))
+        client.enable_and_activate_inventories([option['sku'] for option in product_info['options']], location_names)
+    return res
+
+
+def test_product_create_100(benchmark, fake_shop):
+    shop = fake_shop()
+    client = BenchClient(shop)
+    product_infos = launch_product_infos(100)
+    res = measure(benchmark, create_products, client, product_infos, 'Bench Vendor', ['Main Warehouse'], shop=shop)
+    assert len(res) == 100
+    assert client.product_id_by_sku(product_infos[-1]['options'][-1]['sku']) == res[-1]['id']
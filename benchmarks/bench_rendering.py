@@ -0,0 +1,28 @@
+from benchmarks.fakes import BenchClient, launch_product_infos, size_table_html
+from benchmarks.measure import measure
+from helpers import description_template, size_table
+
+product_care = '使用しないときはダストバッグに入れ、涼しく風通しのいい場所で保管してください。'
+
+
+def clear_caches():
+    size_table._size_table_html.cache_clear()
+    description_template.fragment_cache.clear()
+
+
+def test_size_tables(benchmark):
+    size_texts = [product_info['size_text'] for product_info in launch_product_infos(1000)]
+    res = measure(benchmark, lambda: [size_table_html(size_text) for size_text in size_texts], setup=clear_caches)
+    assert all(html.startswith('<table>') for html in res)
+
+
+def test_descriptions(benchmark):
+    client = BenchClient(None)
+    product_infos = launch_product_infos(1000)
+
+    def render():
+        return {product_info['title']: client.get_description_html(product_info['description'], product_care, product_info['material'],
+                                                                   product_info['size_text'], product_info['made_in'], size_table_html)
+                for product_info in product_infos}
+    res = measure(benchmark, render, setup=clear_caches)
+    assert len(res) == 1000
@@ -0,0 +1,10 @@
+from benchmarks.fakes import BenchClient, product_attr_column_map, product_sheet_rows, variant_attr_column_map
+from benchmarks.measure import measure
+
+
+def test_to_products_list(benchmark):
+    client = BenchClient(None, {'fake-sheet': {'launch': product_sheet_rows(1000)}})
+    res = measure(benchmark, client.to_products_list, 'fake-sheet', 'launch', 2, product_attr_column_map, variant_attr_column_map,
+                  handle_suffix='bench', row_filter_func=lambda row: row[0].strip() == 'NEW')
+    assert len(res) == 1000
+    assert [option['カラー'] for option in res[0]['options']] == ['Black', 'Ivory', 'Brown']
@@ -0,0 +1,19 @@
+from benchmarks.fakes import BenchClient
+from benchmarks.measure import measure
+
+
+def remap_tags(client, tags_mapping):
+    """
+    update_tags.py: scan the tags of every product, plan the changes and apply them.
+    """
+    plan = client.tag_remapping_plan(tags_mapping, client.products_tags())
+    client.apply_tag_changes(plan)
+    return plan
+
+
+def test_tag_remapping_1000_products(benchmark, fake_shop):
+    shop = fake_shop(products=1000, variants_per_product=1)
+    client = BenchClient(shop)
+    plan = measure(benchmark, remap_tags, client, {'seeded': 'Seeded', 'fake': 'bench'}, shop=shop)
+    assert len(plan) == 1000
+    assert client.products_tags("tag:'bench'")[next(iter(plan))]['tags'] == ['Seeded', 'bench']
@@ -0,0 +1,79 @@
+"""
+End-to-end benchmarks of the launch and sync workflows against the fake Shopify server and fake Google backends.
+
+    python -m pytest benchmarks/bench_*.py                      # with pytest-benchmark: --benchmark-json=out.json
+
+Every benchmark runs its workflow once and records, next to the wall time, the GraphQL requests it sent, their
+actual query cost, the throttled retries and the tracemalloc peak of the client process (extra_info with
+pytest-benchmark). Without pytest-benchmark installed the same numbers are printed in a table at the end.
+
+BENCH_SHOPIFY_LATENCY (seconds per request) and BENCH_SHOPIFY_BUCKET (e.g. 2000/100, the standard plan) make the
+fake server slower and throttle like a real store, by default it answers immediately without throttling.
+"""
+import os
+import time
+import pytest
+from benchmarks.fakes import FakeShopProcess
+
+try:
+    import pytest_benchmark     # noqa: F401
+    has_pytest_benchmark = True
+except ImportError:
+    has_pytest_benchmark = False
+
+results = []
+
+
+class SingleRunBenchmark:
+    """
+    the part of pytest-benchmark's fixture the benchmarks use, for running them without the plugin.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.extra_info = {}
+
+    def pedantic(self, target, args=(), kwargs=None, setup=None, rounds=1, iterations=1):
+        if setup:
+            args, kwargs = setup() or (args, kwargs)
+        started = time.perf_counter()
+        res = target(*args, **(kwargs or {}))
+        self.extra_info.setdefault('wall_s', round(time.perf_counter() - started, 3))
+        return res
+
+
+if not has_pytest_benchmark:
+    @pytest.fixture
+    def benchmark(request):
+        bench = SingleRunBenchmark(request.node.name)
+        yield bench
+        results.append((bench.name, bench.extra_info))
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not results:
+        return
+    columns = ['benchmark', 'wall_s', 'requests', 'actual_cost', 'throttled', 'peak_mb']
+    rows = [[name] + [str(info.get(column, '')) for column in columns[1:]] for name, info in results]
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+    terminalreporter.write_sep('-', 'benchmarks')
+    terminalreporter.write_line('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        terminalreporter.write_line('  '.join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+@pytest.fixture
+def fake_shop():
+    """
+    a factory of fake servers in child processes, seeded with products and stopped after the benchmark.
+    """
+    shops = []
+    maximum_available, restore_rate = map(int, os.environ.get('BENCH_SHOPIFY_BUCKET', f'{10 ** 6}/{10 ** 6}').split('/'))
+
+    def start(**kwargs):
+        kwargs = dict({'latency': float(os.environ.get('BENCH_SHOPIFY_LATENCY', 0)),
+                       'maximum_available': maximum_available, 'restore_rate': restore_rate}, **kwargs)
+        shops.append(FakeShopProcess(**kwargs))
+        return shops[-1]
+    yield start
+    for shop in shops:
+        shop.stop()
@@ -0,0 +1,213 @@
+"""
+Offline backends for the benchmarks: the fake Shopify server in a child process, and in-memory stand-ins for the
+Drive and Sheets services behind GoogleApiInterface, so the real client code runs end to end without credentials.
+"""
+import io
+import random
+import re
+import subprocess
+import sys
+import httplib2
+import requests
+from googleapiclient.http import HttpRequest
+from helpers.client import Client
+from helpers.shopify_graphql_client import file_queries, inventory_management
+from helpers.shopify_graphql_client.client import ShopifyGraphqlClient
+
+url_expression = re.compile(r'fake shopify at ([^\s,]+)')
+
+
+class FakeShopProcess:
+    """
+    the fake server runs in its own process, so its allocations and its share of the GIL stay out of the measurements.
+    """
+    def __init__(self, products=0, variants_per_product=3, media_per_product=0, latency=0., maximum_available=10 ** 6, restore_rate=10 ** 6,
+                 media_processing_seconds=0., bulk_operation_seconds=0.):
+        self.process = subprocess.Popen([sys.executable, '-m', 'helpers.fake_shopify.server', '--port', '0',
+                                         '--products', str(products), '--variants-per-product', str(variants_per_product),
+                                         '--media-per-product', str(media_per_product), '--latency', str(latency), '--latency-jitter', '0',
+                                         '--maximum-available', str(maximum_available), '--restore-rate', str(restore_rate),
+                                         '--media-processing-seconds', str(media_processing_seconds),
+                                         '--bulk-operation-seconds', str(bulk_operation_seconds)],
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for line in self.process.stdout:
+            if match := url_expression.search(line):
+                self.graphql_url = match.group(1)
+                break
+        else:
+            raise RuntimeError(f'the fake shopify server exited with {self.process.wait()}')
+        self.url = self.graphql_url.split('/admin/', 1)[0]
+
+    def stats(self):
+        return requests.get(f'{self.url}/stats').json()
+
+    def client(self, shop_name='fake-shop'):
+        client = ShopifyGraphqlClient(shop_name, 'fake-token')
+        client.base_url = self.graphql_url
+        return client
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+class FakeHttp:
+    """
+    answers the media downloads of MediaIoBaseDownload in one chunk.
+    """
+    def __init__(self, content):
+        self.content = content
+
+    def request(self, uri, method='GET', headers=None, **kwargs):
+        return httplib2.Response({'status': '200', 'content-length': str(len(self.content))}), self.content
+
+
+class FakeDriveFiles:
+    def __init__(self, folders):
+        self.folders = folders
+
+    def list(self, q, **kwargs):
+        folder_id = re.match(r"'([^']+)' in parents", q).group(1)
+        files = [{'id': file_id, 'name': name, 'mimeType': 'image/jpeg'} for file_id, (name, _) in self.folders.get(folder_id, {}).items()]
+        return FakeExecutable({'files': files})
+
+    def get_media(self, fileId, **kwargs):
+        content = next(folder[fileId][1] for folder in self.folders.values() if fileId in folder)
+        return HttpRequest(FakeHttp(content), None, f'https://www.googleapis.com/drive/v3/files/{fileId}?alt=media', headers={})
+
+
+class FakeExecutable:
+    def __init__(self, res):
+        self.res = res
+
+    def execute(self):
+        return self.res
+
+
+class FakeDriveService:
+    """
+    folders: {folder_id: {file_id: (name, content)}}
+    """
+    def __init__(self, folders):
+        self.drive_files = FakeDriveFiles(folders)
+
+    def files(self):
+        return self.drive_files
+
+
+class FakeWorksheet:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_all_values(self, **kwargs):
+        return [list(row) for row in self.rows]
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheets):
+        self.worksheets = worksheets
+
+    def fetch_sheet_metadata(self):
+        return {'sheets': [{'properties': {'title': title, 'index': i}} for i, title in enumerate(self.worksheets)]}
+
+    def get_worksheet(self, index):
+        return FakeWorksheet(list(self.worksheets.values())[index])
+
+
+class FakeGspreadClient:
+    """
+    spreadsheets: {sheet_id: {sheet_title: rows}}
+    """
+    def __init__(self, spreadsheets):
+        self.spreadsheets = spreadsheets
+
+    def open_by_key(self, sheet_id):
+        return FakeSpreadsheet(self.spreadsheets[sheet_id])
+
+
+class BenchClient(Client):
+    """
+    the scripts' Client, with the Google services replaced by the fakes and the shopify calls sent to the fake server.
+    the per-shop caches are cleared, so each benchmark starts like a new run of a script.
+    """
+    def __init__(self, shop, spreadsheets=None, folders=None, sheet_id='fake-sheet'):
+        file_queries.files_indexes.clear()
+        inventory_management.location_registries.clear()
+        ShopifyGraphqlClient.__init__(self, 'fake-shop', 'fake-token')
+        self.base_url = shop.graphql_url if shop else self.base_url
+        self.gspread_client = FakeGspreadClient(spreadsheets or {})
+        self.drive_service = FakeDriveService(folders or {})
+        self.sheets_service = None
+        self.sheet_id = sheet_id
+
+
+# the rohseoul launch sheet layout, 0-based column indexes
+product_attr_column_map = {'title': 4, 'status': 0, 'release_date': 2, 'collection': 6, 'category': 7, 'description': 17,
+                           'size_text': 20, 'material': 21, 'made_in': 22}
+variant_attr_column_map = {'カラー': 9, 'sku': 5, 'price': 12, 'stock': 13, 'drive_link': 15}
+colors = ['Black', 'Ivory', 'Brown', 'Navy', 'Khaki']
+
+
+def product_sheet_rows(products, colors_per_product=3, seed=0):
+    """
+    two header rows, then one row per color with the product columns on its first row, as in the launch sheets.
+    """
+    rnd = random.Random(seed)
+    rows = [['status', 'no', 'release_date', '', 'title', 'sku', 'collection', 'category', '', 'color', '', '', 'price', 'stock', '', 'drive_link',
+             '', 'description', '', '', 'size', 'material', 'made_in']] * 2
+    for i in range(products):
+        for j, color in enumerate(colors[:colors_per_product]):
+            row = [''] * 23
+            row[0] = 'NEW'
+            row[5] = f'BENCH{i:05d}-{color[:3].upper()}'
+            row[9] = color
+            row[12] = 23100 + 1000 * (i % 5)
+            row[13] = rnd.randint(0, 30)
+            row[15] = f'https://drive.google.com/drive/folders/folder-{i:05d}-{j}?usp=sharing'
+            if j == 0:
+                row[2] = 45700 + i % 30
+                row[4] = f'Bench Bag {i:05d}'
+                row[6] = '25SS'
+                row[7] = 'Bag'
+                row[17] = f'Bench Bag {i:05d} は軽量なナイロン素材のショルダーバッグです。\n普段使いに。'
+                row[20] = f'Width(cm) {20 + i % 15}\nHeight(cm) {15 + i % 10}\n\n{300 + i % 200}g'
+                row[21] = 'Nylon 100%'
+                row[22] = 'Korea'
+            rows.append(row)
+    return rows
+
+
+def jpeg_bytes(width=200, height=200, seed=0):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (seed * 37 % 256, seed * 91 % 256, seed * 53 % 256)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def drive_folders(product_infos, images_per_folder):
+    """
+    a folder of images_per_folder JPEGs for the drive link of every color.
+    """
+    folders = {}
+    for product_info in product_infos:
+        for option in product_info['options']:
+            folder_id = option['drive_link'].rsplit('/', 1)[-1].replace('?usp=sharing', '')
+            folders[folder_id] = {f'{folder_id}-{k}': (f'{k + 1}.jpg', jpeg_bytes(seed=k)) for k in range(images_per_folder)}
+    return folders
+
+
+def launch_product_infos(products, colors_per_product=3):
+    """
+    the product infos the launch scripts read from a sheet of product_sheet_rows, parsed by the real to_products_list.
+    """
+    client = BenchClient(None, {'fake-sheet': {'launch': product_sheet_rows(products, colors_per_product)}})
+    return client.to_products_list('fake-sheet', 'launch', 2, product_attr_column_map, variant_attr_column_map,
+                                   handle_suffix='bench', row_filter_func=lambda row: row[0].strip() == 'NEW')
+
+
+def size_table_html(size_text):
+    """
+    the launch sheets' size texts are one measurement per line, rendered as rohseoul's get_size_table_html does.
+    """
+    from helpers.size_table import size_table_html
+    return size_table_html(size_text, 'measurement_lines')
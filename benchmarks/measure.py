@@ -0,0 +1,28 @@
+import time
+import tracemalloc
+
+
+def measure(benchmark, func, *args, shop=None, setup=None, **kwargs):
+    """
+    run func once under benchmark and record its requests to shop, their cost, wall time and peak traced memory.
+    setup runs before, unmeasured.
+    """
+    info = {}
+
+    def target():
+        before = shop.stats() if shop else {}
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            info['wall_s'] = round(time.perf_counter() - started, 3)
+            info['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            tracemalloc.stop()
+            if shop:
+                after = shop.stats()
+                info.update({key: after[key] - before[key] for key in ('requests', 'actual_cost', 'throttled')})
+
+    res = benchmark.pedantic(target, setup=setup, rounds=1, iterations=1)
+    benchmark.extra_info.update(info)
+    return res
@@ -12,7 +12,7 @@ def main():
         title = row[3]
         print(title)
         try:
-            gid = client.product_by_title(title)
+            gid = client.product_id_by_title(title)
         except RuntimeError as e:
             print(e)
         else:
@@ -1,5 +1,6 @@
 import pandas as pd
 import re
+from helpers.shopify_csv import extract_keys
 
 csv_path = '/Users/taro/Downloads/products_export.csv'
 image_url_base = 'https://cdn.shopify.com/s/files/1/0655/9596/5639/files'
@@ -9,15 +10,15 @@ out_products_csv_path = '/Users/taro/Downloads/products_import.csv'
 out_variants_csv_path = '/Users/taro/Downloads/variants_import.csv'
 
 
-def update_sku_image(sku, df):
-    for i in (0, 1):
-        # cover image right now is named either with _0.jpg or _1.jpg, so check both.
-        s = df[df['Image Src'].str.contains(f'{sku}_{i}')]
-        if not s.empty:
-            df.loc[df['Image Src'].str.contains(
-                f'{sku}_{i}'), 'Image Src'] = sku_image_url(sku)
-            return df
-    raise RuntimeError(f'image path not found for {sku}')
+def update_sku_images(df):
+    # cover image right now is named either with _0.jpg or _1.jpg, so check both, preferring _0.
+    skus = df['Variant SKU'].dropna()
+    matches = extract_keys(df['Image Src'], skus, '_([01])').set_axis(['sku', 'image_index'], axis=1).dropna()
+    covers = matches[matches['image_index'] == matches.groupby('sku')['image_index'].transform('min')]
+    if missing := sorted(set(skus) - set(covers['sku'])):
+        raise RuntimeError(f'image path not found for {missing}')
+    df.loc[covers.index, 'Image Src'] = covers['sku'].map(sku_image_url)
+    return df
 
 
 def update_variant_image(sku, df):
@@ -45,8 +46,7 @@ def generate():
     df.loc[df['Variant SKU'].notnull(), 'Variant Image'] = df[df['Variant SKU'].notnull()].apply(
         lambda x: sku_image_url(x['Variant SKU']), axis=1)
 
-    for i, row in df[df['Variant SKU'].notnull()].iterrows():
-        df = update_sku_image(row['Variant SKU'], df)
+    df = update_sku_images(df)
 
     # product update csv
     df[['Handle', 'Title', 'Image Src', 'Image Position']].to_csv(
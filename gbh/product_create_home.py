@@ -30,7 +30,7 @@ def product_info_list_from_sheet_size_options(gai:utils.Client, sheet_id, sheet_
 
 def enable_and_activate_inventory(sgc:utils.Client, product_info, options=None):
     options = options or sgc.populate_option(product_info)
-    res2 = [sgc.enable_and_activate_inventory(option[2], []) for option in options]
+    res2 = sgc.enable_and_activate_inventories([option[2] for option in options], [])
     return res2
 
 def create_a_product(sgc:utils.Client, product_info, vendor):
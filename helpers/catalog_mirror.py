@@ -0,0 +1,454 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from helpers.shopify_graphql_client.query_cache import gid_type, gids
+
+logger = logging.getLogger(__name__)
+
+default_mirror_dir = os.path.expanduser('~/.cache/shopify-snippets')
+
+schema = """
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    handle TEXT,
+    status TEXT,
+    vendor TEXT,
+    product_type TEXT,
+    description_html TEXT,
+    template_suffix TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS variants (
+    id TEXT PRIMARY KEY,
+    product_id TEXT,
+    position INTEGER,
+    title TEXT,
+    sku TEXT,
+    price TEXT,
+    compare_at_price TEXT,
+    inventory_item_id TEXT,
+    selected_options TEXT
+);
+CREATE TABLE IF NOT EXISTS options (
+    product_id TEXT,
+    position INTEGER,
+    name TEXT,
+    option_values TEXT
+);
+CREATE TABLE IF NOT EXISTS tags (
+    product_id TEXT,
+    tag TEXT
+);
+CREATE TABLE IF NOT EXISTS media (
+    id TEXT PRIMARY KEY,
+    product_id TEXT,
+    position INTEGER,
+    alt TEXT,
+    url TEXT,
+    media_content_type TEXT,
+    status TEXT
+);
+CREATE TABLE IF NOT EXISTS metafields (
+    id TEXT PRIMARY KEY,
+    owner_id TEXT,
+    namespace TEXT,
+    key TEXT,
+    type TEXT,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS products_title ON products (title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS products_handle ON products (handle COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS products_status ON products (status COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS variants_sku ON variants (sku COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS variants_product_id ON variants (product_id);
+CREATE INDEX IF NOT EXISTS options_product_id ON options (product_id);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tags_product_id ON tags (product_id);
+CREATE INDEX IF NOT EXISTS media_product_id ON media (product_id);
+CREATE INDEX IF NOT EXISTS metafields_owner_id ON metafields (owner_id);
+"""
+
+product_fields = """
+    id
+    title
+    handle
+    status
+    vendor
+    productType
+    descriptionHtml
+    templateSuffix
+    updatedAt
+    tags
+    options {
+        name
+        position
+        values
+    }
+"""
+
+variant_fields = """
+    id
+    position
+    title
+    sku
+    price
+    compareAtPrice
+    inventoryItem {
+        id
+    }
+    selectedOptions {
+        name
+        value
+    }
+"""
+
+media_fields = """
+    id
+    alt
+    mediaContentType
+    status
+    ... on MediaImage {
+        image {
+            url
+        }
+    }
+"""
+
+metafield_fields = """
+    id
+    namespace
+    key
+    type
+    value
+"""
+
+def bulk_products_query(query_string=None):
+    """
+    the bulk export of the products matching query_string, all of them without one.
+    """
+    arguments = f'(query: {json.dumps(query_string)})' if query_string else ''
+    return """
+{
+    products%s {
+        edges {
+            node {
+                %s
+                variants {
+                    edges {
+                        node {
+                            %s
+                        }
+                    }
+                }
+                media {
+                    edges {
+                        node {
+                            %s
+                        }
+                    }
+                }
+                metafields {
+                    edges {
+                        node {
+                            %s
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+""" % (arguments, product_fields, variant_fields, media_fields, metafield_fields)
+
+
+bulk_export_query = bulk_products_query()
+
+# about 430 points a product, refresh_chunk_size of them keep each request within the 1000 points query cost limit.
+# products with more variants, media or metafields than fit are read whole by the bulk sync instead
+products_by_ids_query = """
+query productsByIds($ids: [ID!]!) {
+    nodes(ids: $ids) {
+        ... on Product {
+            %s
+            variants(first: 100) {
+                nodes {
+                    %s
+                }
+                pageInfo {
+                    hasNextPage
+                }
+            }
+            media(first: 50) {
+                nodes {
+                    %s
+                }
+                pageInfo {
+                    hasNextPage
+                }
+            }
+            metafields(first: 25) {
+                nodes {
+                    %s
+                }
+                pageInfo {
+                    hasNextPage
+                }
+            }
+        }
+    }
+}
+""" % (product_fields, variant_fields, media_fields, metafield_fields)
+refresh_chunk_size = 2
+
+# mutations whose changed products cannot be read from their variables and payload
+resync_mutations = ('bulkOperationRunMutation',)
+
+# shopify search syntax terms the mirror can answer: title:'Foo Bar', handle:foo-bar, tag:new, sku:'ABC-1', status:active, id:123
+query_term_expression = re.compile(r"""(\w+):(?:'((?:[^'\\]|\\.)*)'|"([^"]*)"|(\S+))""")
+
+# fields products_by_query can be asked for on top of its defaults, by mirror column
+additional_field_columns = {
+    'status': 'status',
+    'vendor': 'vendor',
+    'productType': 'product_type',
+    'descriptionHtml': 'description_html',
+    'templateSuffix': 'template_suffix',
+    'updatedAt': 'updated_at',
+}
+
+
+class CatalogMirror:
+    """
+    A local SQLite copy of a shop's products, variants, options, tags, media and metafields.
+    Seeded with a bulk export and kept fresh by bulk exporting the products updated since the last sync.
+    The products a mutation of the client touches are marked stale and read again by ID before the next read from
+    the mirror, changes made elsewhere are only seen after the next sync.
+    """
+    def __init__(self, shop_name, db_path=None):
+        self.shop_name = shop_name
+        if not db_path:
+            os.makedirs(default_mirror_dir, exist_ok=True)
+            db_path = os.path.join(default_mirror_dir, f'catalog_mirror_{shop_name}.sqlite3')
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.stale_product_ids = set()
+        self.needs_sync = False
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(schema)
+
+    def close(self):
+        self.connection.close()
+
+    """ sync """
+    def last_updated_at(self):
+        row = self.connection.execute("SELECT value FROM sync_state WHERE name = 'updated_at'").fetchone()
+        return row['value'] if row else None
+
+    def is_seeded(self):
+        return self.last_updated_at() is not None
+
+    def bulk_products(self, client, query_string=None):
+        """
+        {product_id: product} of a bulk export, with the variants, media and metafields of each product as lists.
+        """
+        products = {}
+        parent_lists = {'ProductVariant': 'variants', 'Metafield': 'metafields'}
+        for line in client.run_bulk_query(bulk_products_query(query_string)):
+            if parent_id := line.pop('__parentId', None):
+                products[parent_id][parent_lists.get(gid_type(line['id']), 'media')].append(line)
+            else:
+                products[line['id']] = dict(line, variants=[], media=[], metafields=[])
+        return products
+
+    def seed(self, client):
+        logger.info(f'seeding the catalog mirror of {self.shop_name} with a bulk export')
+        products = self.bulk_products(client)
+        with self.lock, self.connection:
+            for table in ['products', 'variants', 'options', 'tags', 'media', 'metafields']:
+                self.connection.execute(f'DELETE FROM {table}')
+            for product in products.values():
+                self._insert_product(product)
+            self._set_last_updated_at(max((p['updatedAt'] for p in products.values()), default=''))
+        logger.info(f'seeded {len(products)} products')
+        return len(products)
+
+    def sync(self, client):
+        if not self.is_seeded():
+            return self.seed(client)
+        last_updated_at = self.last_updated_at()
+        # >= as updatedAt is in seconds, products updated in the second of the last sync are read again
+        products = self.bulk_products(client, f"updated_at:>='{last_updated_at}'")
+        with self.lock, self.connection:
+            for product in products.values():
+                self._replace_product(product)
+            self._set_last_updated_at(max([last_updated_at] + [p['updatedAt'] for p in products.values()]))
+        self.needs_sync = False
+        logger.info(f'synced {len(products)} updated products into the catalog mirror of {self.shop_name}')
+        return len(products)
+
+    def invalidate(self, query, variables, data):
+        """
+        mark the products a mutation touched as stale, from the product, variant and metafield GIDs of its variables and payload.
+        """
+        if any(name in query for name in resync_mutations):
+            self.needs_sync = True
+            return
+        touched = gids([variables, data])
+        product_ids = {gid for gid in touched if gid_type(gid) == 'Product'}
+        with self.lock:
+            if other_ids := [gid for gid in touched if gid_type(gid) != 'Product']:
+                placeholders = ','.join('?' * len(other_ids))
+                for table, product_column in [('variants', 'product_id'), ('media', 'product_id'), ('metafields', 'owner_id')]:
+                    rows = self.connection.execute(f'SELECT {product_column} FROM {table} WHERE id IN ({placeholders})', other_ids)
+                    product_ids.update(row[0] for row in rows)
+            self.stale_product_ids |= product_ids
+
+    def refresh(self, client):
+        """
+        read the stale products again by ID, and sync when a mutation changed products it could not name.
+        """
+        if self.needs_sync:
+            self.sync(client)
+        with self.lock:
+            product_ids, self.stale_product_ids = sorted(self.stale_product_ids), set()
+        truncated = False
+        for i in range(0, len(product_ids), refresh_chunk_size):
+            chunk = product_ids[i:i + refresh_chunk_size]
+            nodes = client.run_query(products_by_ids_query, {'ids': chunk})['nodes']
+            with self.lock, self.connection:
+                for product_id, node in zip(chunk, nodes):
+                    if not node:        # deleted
+                        self._delete_product(product_id)
+                    elif any(node[k]['pageInfo']['hasNextPage'] for k in ['variants', 'media', 'metafields']):
+                        # updated since the last sync, so the sync exports it whole
+                        truncated = True
+                    else:
+                        self._replace_product(dict(node, **{k: node[k]['nodes'] for k in ['variants', 'media', 'metafields']}))
+        if truncated:
+            self.sync(client)
+        return self
+
+    def _replace_product(self, product):
+        self._delete_product(product['id'])
+        self._insert_product(product)
+
+    def _set_last_updated_at(self, updated_at):
+        self.connection.execute("INSERT OR REPLACE INTO sync_state (name, value) VALUES ('updated_at', ?)", (updated_at,))
+
+    def _delete_product(self, product_id):
+        for table, column in [('products', 'id'), ('variants', 'product_id'), ('options', 'product_id'),
+                              ('tags', 'product_id'), ('media', 'product_id'), ('metafields', 'owner_id')]:
+            self.connection.execute(f'DELETE FROM {table} WHERE {column} = ?', (product_id,))
+
+    def _insert_product(self, product):
+        product_id = product['id']
+        self.connection.execute('INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                (product_id, product['title'], product['handle'], product['status'], product['vendor'],
+                                 product['productType'], product['descriptionHtml'], product['templateSuffix'], product['updatedAt']))
+        self.connection.executemany('INSERT INTO variants VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                    [(v['id'], product_id, v['position'], v['title'], v['sku'], v['price'], v['compareAtPrice'],
+                                      (v.get('inventoryItem') or {}).get('id'), json.dumps(v['selectedOptions'], ensure_ascii=False))
+                                     for v in product['variants']])
+        self.connection.executemany('INSERT INTO options VALUES (?, ?, ?, ?)',
+                                    [(product_id, o['position'], o['name'], json.dumps(o['values'], ensure_ascii=False)) for o in product['options']])
+        self.connection.executemany('INSERT INTO tags VALUES (?, ?)', [(product_id, tag) for tag in product['tags']])
+        self.connection.executemany('INSERT INTO media VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                    [(m['id'], product_id, i, m.get('alt'), (m.get('image') or {}).get('url'), m.get('mediaContentType'), m.get('status'))
+                                     for i, m in enumerate(product['media'])])
+        self.connection.executemany('INSERT INTO metafields VALUES (?, ?, ?, ?, ?, ?)',
+                                    [(m['id'], product_id, m['namespace'], m['key'], m['type'], m['value']) for m in product['metafields']])
+
+    """ reads """
+    def product_ids_by_query(self, query_string):
+        """
+        product IDs matching a shopify search query, all products without one, or None when the query uses terms the mirror cannot answer.
+        terms are ANDed, values are matched case-insensitively and a trailing * matches by prefix.
+        """
+        if not query_string:
+            return [row['id'] for row in self.connection.execute('SELECT id FROM products ORDER BY title')]
+        terms = query_term_expression.findall(query_string)
+        if not terms or query_term_expression.sub('', query_string).strip():
+            return None
+        conditions = []
+        parameters = []
+        for field, single_quoted, double_quoted, bare in terms:
+            value = single_quoted.replace("\\'", "'") if single_quoted else (double_quoted or bare)
+            if value.endswith('*'):
+                comparison = "LIKE ? ESCAPE '\\'"
+                value = value[:-1].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            else:
+                comparison = '= ? COLLATE NOCASE'
+            if field in ('title', 'handle', 'status'):
+                conditions.append(f'p.{field} {comparison}')
+            elif field == 'tag':
+                conditions.append(f'p.id IN (SELECT product_id FROM tags WHERE tag {comparison})')
+            elif field == 'sku':
+                conditions.append(f'p.id IN (SELECT product_id FROM variants WHERE sku {comparison})')
+            elif field == 'id':
+                conditions.append('p.id = ?')
+                value = f'gid://shopify/Product/{value}'
+            else:
+                return None
+            parameters.append(value)
+        rows = self.connection.execute(f"SELECT p.id FROM products p WHERE {' AND '.join(conditions)} ORDER BY p.title", parameters)
+        return [row['id'] for row in rows]
+
+    def products_by_query(self, query_string, additional_fields=None, profile='full'):
+        """
+        same shape as ProductQueries.products_by_query with the profile, or None when the mirror cannot answer the query.
+        """
+        columns = [additional_field_columns.get(field.strip()) for field in additional_fields or []]
+        if None in columns:
+            return None
+        product_ids = self.product_ids_by_query(query_string)
+        if product_ids is None:
+            return None
+        return [self.product_by_id(product_id, additional_fields, profile) for product_id in product_ids]
+
+    def product_by_id(self, product_id, additional_fields=None, profile='full'):
+        """
+        the fields of the product_field_profiles profile of product_queries, plus additional_fields.
+        """
+        product = self.connection.execute('SELECT * FROM products WHERE id = ?', (product_id,)).fetchone()
+        res = {'id': product['id']}
+        if profile != 'ids':
+            res.update(title=product['title'], handle=product['handle'])
+        if profile == 'summary':
+            res.update(status=product['status'], vendor=product['vendor'], productType=product['product_type'])
+        if profile in ('summary', 'full'):
+            res['tags'] = [row['tag'] for row in self.connection.execute('SELECT tag FROM tags WHERE product_id = ? ORDER BY rowid', (product_id,))]
+        for field in additional_fields or []:
+            res[field.strip()] = product[additional_field_columns[field.strip()]]
+        if profile == 'full':
+            res['metafields'] = {'nodes': [{'id': row['id'], 'namespace': row['namespace'], 'key': row['key'], 'value': row['value']}
+                                           for row in self.connection.execute('SELECT * FROM metafields WHERE owner_id = ? ORDER BY rowid', (product_id,))]}
+        if profile in ('pricing', 'full'):
+            variant_node = self._variant_node if profile == 'full' else self._variant_price_node
+            res['variants'] = {'nodes': [variant_node(row) for row in self.connection.execute('SELECT * FROM variants WHERE product_id = ? ORDER BY position', (product_id,))]}
+        return res
+
+    def variants_by_sku(self, sku):
+        return [dict(self._variant_node(row), product={'id': row['product_id']})
+                for row in self.connection.execute('SELECT * FROM variants WHERE sku = ?', (sku,))]
+
+    def _variant_price_node(self, row):
+        return {'id': row['id'],
+                'sku': row['sku'],
+                'price': row['price'],
+                'compareAtPrice': row['compare_at_price']}
+
+    def _variant_node(self, row):
+        return {'id': row['id'],
+                'title': row['title'],
+                'sku': row['sku'],
+                'price': row['price'],
+                'selectedOptions': json.loads(row['selected_options'])}
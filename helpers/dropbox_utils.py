@@ -1,18 +1,85 @@
+"""
+Images from Dropbox shared links. Responses are streamed to disk in chunks and zips of shared folders are extracted
+member by member, each download in its own temporary directory so many links can be fetched at once.
+
+A manifest in each output directory records the ETag and the files of every link and prefix downloaded there, so a
+link whose ETag has not changed is not downloaded again for the same prefix.
+"""
+import json
+import logging
 import os
-import requests
+import shutil
+import tempfile
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+
+logger = logging.getLogger(__name__)
+
+chunk_size = 1024 * 1024
+manifest_name = '.dropbox_manifest.json'
+manifest_lock = threading.Lock()
+
+
+def direct_link(shared_link):
+    """
+    the shared link with dl=1, which answers the file itself, or a zip of a shared folder.
+    """
+    parts = urlsplit(shared_link)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != 'dl'] + [('dl', '1')]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def file_name(response, shared_link):
+    if (disposition := response.headers.get('Content-Disposition', '')) and 'filename=' in disposition:
+        return disposition.split('filename=', 1)[1].split(';', 1)[0].strip('"\' ')
+    return os.path.basename(urlsplit(shared_link).path) or 'download'
 
-def download_images_from_dropbox(shared_link, output_path):
 
-    shared_link = shared_link.replace('&dl=0', '') + '&dl=1'
-    res = requests.get(shared_link)
-    with open(f'{output_path}.zip', 'wb') as of:
-        of.write(res.content)
-    if not os.path.exists(output_path):
-        os.mkdir(output_path)
-    with zipfile.ZipFile(f'{output_path}.zip') as zipref:
-        zipref.extractall(output_path)
-    os.remove(f'{output_path}.zip')
+def extract_zip(zip_path, output_path):
+    """
+    extract the members one at a time, skipping macOS metadata and anything that would land outside output_path.
+    """
+    root = os.path.realpath(output_path)
+    with zipfile.ZipFile(zip_path) as zf:
+        for member in zf.infolist():
+            if member.is_dir() or member.filename.startswith('__MACOSX/') or os.path.basename(member.filename).startswith('._'):
+                continue
+            target = os.path.realpath(os.path.join(root, member.filename))
+            if not target.startswith(root + os.sep):
+                logger.warning(f'skipping {member.filename} outside of {output_path}')
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with zf.open(member) as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst, chunk_size)
+
+
+def stream_to_file(response, path):
+    with open(path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size):
+            f.write(chunk)
+
+
+def download_images_from_dropbox(shared_link, output_path, response=None):
+    """
+    download the link into output_path, a zip streamed to a temporary file next to it and extracted there.
+    returns the ETag of the download.
+    """
+    os.makedirs(output_path, exist_ok=True)
+    response = response or requests.get(direct_link(shared_link), stream=True)
+    with response:
+        response.raise_for_status()
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_path))) as download_dir:
+            path = os.path.join(download_dir, 'download')
+            stream_to_file(response, path)
+            if zipfile.is_zipfile(path):
+                extract_zip(path, output_path)
+            else:
+                shutil.move(path, os.path.join(output_path, file_name(response, shared_link)))
+        return response.headers.get('ETag')
+
 
 def rename_files(srcdir, destdir, prefix):
     res = []
@@ -22,22 +89,61 @@ def rename_files(srcdir, destdir, prefix):
         res.append(target)
     return res
 
-def download_and_rename_images_from_dropbox(output_path, images_link, prefix, tempdir='tmp'):
-    if not os.path.exists(output_path):
-        os.mkdir(output_path)
-    download_images_from_dropbox(images_link, tempdir)
-    return rename_files(tempdir, output_path, prefix)
+
+def read_manifest(output_path):
+    try:
+        with open(os.path.join(output_path, manifest_name), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def update_manifest(output_path, shared_link, prefix, entry):
+    """
+    entries are {shared_link: {prefix: entry}}, one link can be downloaded under several prefixes, e.g. skus sharing a folder.
+    """
+    with manifest_lock:
+        manifest = read_manifest(output_path)
+        manifest.setdefault(shared_link, {})[prefix] = entry
+        with open(os.path.join(output_path, manifest_name), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
 
 
-def download_files(product_name, main_images_link, detail_images_link, sku_imageslink_map, tempdir='tmp'):
-    if not os.path.exists(product_name):
-        os.mkdir(product_name)
-    download_images_from_dropbox(main_images_link, tempdir)
-    rename_files(tempdir, product_name, 'product_main')
+def download_and_rename_images_from_dropbox(output_path, images_link, prefix, tempdir=None):
+    """
+    the images of the link in output_path as {prefix}_{index}_{name}, skipped when the link's ETag and prefix are
+    those of the files already there. the download is unpacked in a new temporary directory under tempdir, output_path by default.
+    """
+    os.makedirs(output_path, exist_ok=True)
+    cached = read_manifest(output_path).get(images_link, {}).get(prefix)
+    response = requests.get(direct_link(images_link), stream=True)
+    etag = response.headers.get('ETag')
+    if cached and etag and cached['etag'] == etag and all(os.path.exists(path) for path in cached['paths']):
+        response.close()
+        logger.info(f'{images_link} unchanged, reusing {len(cached["paths"])} files in {output_path}')
+        return cached['paths']
+    os.makedirs(tempdir or output_path, exist_ok=True)
+    download_dir = tempfile.mkdtemp(dir=tempdir or output_path, prefix='.dropbox-')
+    try:
+        download_images_from_dropbox(images_link, download_dir, response)
+        paths = rename_files(download_dir, output_path, prefix)
+    finally:
+        shutil.rmtree(download_dir, ignore_errors=True)
+    for path in set((cached or {}).get('paths', [])) - set(paths):      # left from the previous version of the link under this prefix
+        if os.path.exists(path):
+            os.remove(path)
+    update_manifest(output_path, images_link, prefix, {'etag': etag, 'paths': paths})
+    return paths
 
-    download_images_from_dropbox(detail_images_link, tempdir)
-    rename_files(tempdir, product_name, 'product_details')
 
-    for sku, link in sku_imageslink_map.items():
-        download_images_from_dropbox(link, tempdir)
-        rename_files(tempdir, product_name, sku)
+def download_files(product_name, main_images_link, detail_images_link, sku_imageslink_map, tempdir=None, max_workers=4):
+    """
+    the main, detail and per-sku images of a product downloaded in parallel into the product_name directory.
+    returns {prefix: paths}.
+    """
+    os.makedirs(product_name, exist_ok=True)
+    links = {'product_main': main_images_link, 'product_details': detail_images_link, **sku_imageslink_map}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {prefix: executor.submit(download_and_rename_images_from_dropbox, product_name, link, prefix, tempdir)
+                   for prefix, link in links.items()}
+        return {prefix: future.result() for prefix, future in futures.items()}
@@ -0,0 +1,2 @@
+from helpers.fake_shopify.server import FakeShopifyServer, LeakyBucket
+from helpers.fake_shopify.store import FakeShopifyStore
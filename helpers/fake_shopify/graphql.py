@@ -0,0 +1,332 @@
+"""
+A small GraphQL parser and executor, enough for the documents the client sends: operations with variables, aliases,
+arguments, nested selections, inline fragments and fragment spreads. There is no schema: fields are looked up on
+plain dicts, a callable value is called with the field's arguments, and the result is projected onto the selection.
+"""
+import functools
+import json
+import re
+
+token_expression = re.compile(r'''
+    (?P<ignored>[\s,\ufeff]+|\#[^\n]*) |
+    (?P<block_string>"""(?:\\"""|[^"]|"(?!""))*""") |
+    (?P<string>"(?:\\.|[^"\\])*") |
+    (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?) |
+    (?P<spread>\.\.\.) |
+    (?P<name>[_A-Za-z][_0-9A-Za-z]*) |
+    (?P<punctuator>[!$():=@\[\]{}|&])
+''', re.VERBOSE)
+
+
+class GraphQLError(Exception):
+    pass
+
+
+class Variable:
+    def __init__(self, name):
+        self.name = name
+
+
+def tokenize(document):
+    tokens = []
+    position = 0
+    while position < len(document):
+        if not (match := token_expression.match(document, position)):
+            raise GraphQLError(f'Parse error on "{document[position:position + 10]}" at {position}')
+        position = match.end()
+        if match.lastgroup == 'ignored':
+            continue
+        value = match.group()
+        if match.lastgroup == 'block_string':
+            value = value[3:-3].replace('\\"""', '"""')
+        elif match.lastgroup == 'string':
+            value = json.loads(value)
+        tokens.append((match.lastgroup, value))
+    tokens.append(('end', None))
+    return tokens
+
+
+class Parser:
+    def __init__(self, document):
+        self.tokens = tokenize(document)
+        self.position = 0
+
+    def peek(self, value=None):
+        kind, token = self.tokens[self.position]
+        return token if value is None else (kind in ('punctuator', 'name', 'spread') and token == value)
+
+    def take(self, value=None):
+        kind, token = self.tokens[self.position]
+        if value is not None and token != value:
+            raise GraphQLError(f'Parse error on "{token}", expected "{value}"')
+        if kind == 'end':
+            raise GraphQLError('Parse error: unexpected end of document')
+        self.position += 1
+        return token
+
+    def name(self):
+        kind, token = self.tokens[self.position]
+        if kind != 'name':
+            raise GraphQLError(f'Parse error on "{token}", expected a name')
+        self.position += 1
+        return token
+
+    def document(self):
+        operations, fragments = [], {}
+        while self.tokens[self.position][0] != 'end':
+            if self.peek('{'):
+                operations.append({'type': 'query', 'name': None, 'variables': {}, 'selections': self.selection_set()})
+            elif self.peek('fragment'):
+                self.take()
+                name = self.name()
+                self.take('on')
+                fragments[name] = {'type': self.name(), 'selections': (self.directives(), self.selection_set())[1]}
+            elif self.peek() in ('query', 'mutation', 'subscription'):
+                operation_type = self.take()
+                name = self.name() if self.tokens[self.position][0] == 'name' else None
+                variables = self.variable_definitions() if self.peek('(') else {}
+                self.directives()
+                operations.append({'type': operation_type, 'name': name, 'variables': variables, 'selections': self.selection_set()})
+            else:
+                raise GraphQLError(f'Parse error on "{self.peek()}"')
+        return {'operations': operations, 'fragments': fragments}
+
+    def variable_definitions(self):
+        self.take('(')
+        defaults = {}
+        while not self.peek(')'):
+            self.take('$')
+            name = self.name()
+            self.take(':')
+            self.type_reference()
+            defaults[name] = self.value() if self.peek('=') and self.take('=') else None
+            self.directives()
+        self.take(')')
+        return defaults
+
+    def type_reference(self):
+        if self.peek('['):
+            self.take('[')
+            self.type_reference()
+            self.take(']')
+        else:
+            self.name()
+        if self.peek('!'):
+            self.take('!')
+
+    def directives(self):
+        while self.peek('@'):
+            self.take('@')
+            self.name()
+            if self.peek('('):
+                self.arguments()
+
+    def selection_set(self):
+        self.take('{')
+        selections = []
+        while not self.peek('}'):
+            if self.peek('...'):
+                self.take('...')
+                if self.peek('on') or self.peek('{') or self.peek('@'):
+                    type_condition = self.take('on') and self.name() if self.peek('on') else None
+                    self.directives()
+                    selections.append({'kind': 'inline', 'type': type_condition, 'selections': self.selection_set()})
+                else:
+                    selections.append({'kind': 'spread', 'name': self.name()})
+                    self.directives()
+                continue
+            alias = name = self.name()
+            if self.peek(':'):
+                self.take(':')
+                name = self.name()
+            arguments = self.arguments() if self.peek('(') else {}
+            self.directives()
+            selections.append({'kind': 'field', 'alias': alias, 'name': name, 'arguments': arguments,
+                               'selections': self.selection_set() if self.peek('{') else None})
+        self.take('}')
+        return selections
+
+    def arguments(self):
+        self.take('(')
+        arguments = {}
+        while not self.peek(')'):
+            name = self.name()
+            self.take(':')
+            arguments[name] = self.value()
+        self.take(')')
+        return arguments
+
+    def value(self):
+        kind, token = self.tokens[self.position]
+        if token == '$' and kind == 'punctuator':
+            self.take()
+            return Variable(self.name())
+        if token == '[' and kind == 'punctuator':
+            self.take()
+            values = []
+            while not self.peek(']'):
+                values.append(self.value())
+            self.take(']')
+            return values
+        if token == '{' and kind == 'punctuator':
+            self.take()
+            values = {}
+            while not self.peek('}'):
+                name = self.name()
+                self.take(':')
+                values[name] = self.value()
+            self.take('}')
+            return values
+        self.take()
+        if kind in ('string', 'block_string'):
+            return token
+        if kind == 'number':
+            return float(token) if any(c in token for c in '.eE') else int(token)
+        if kind == 'name':
+            return {'true': True, 'false': False, 'null': None}.get(token, token)       # enums as their names
+        raise GraphQLError(f'Parse error on "{token}", expected a value')
+
+
+@functools.lru_cache(maxsize=256)
+def parse(document):
+    return Parser(document).document()
+
+
+def resolve_value(value, variables):
+    if isinstance(value, Variable):
+        return variables.get(value.name)
+    if isinstance(value, list):
+        return [resolve_value(v, variables) for v in value]
+    if isinstance(value, dict):
+        return {k: resolve_value(v, variables) for k, v in value.items()}
+    return value
+
+
+def operation(document, operation_name=None):
+    operations = document['operations']
+    if operation_name:
+        operations = [op for op in operations if op['name'] == operation_name]
+    if len(operations) != 1:
+        raise GraphQLError(f'{"Multiple" if operations else "No"} operations found{f" named {operation_name}" if operation_name else ""}')
+    return operations[0]
+
+
+class Executor:
+    """
+    interfaces: {'File': {'MediaImage', 'GenericFile'}, ...} for type conditions on interfaces, objects carry '__typename'.
+    """
+    def __init__(self, document, variables=None, operation_name=None, interfaces=None):
+        self.document = parse(document) if isinstance(document, str) else document
+        self.operation = operation(self.document, operation_name)
+        self.variables = dict(self.operation['variables'], **(variables or {}))
+        self.interfaces = interfaces or {}
+
+    def type_matches(self, obj, type_condition):
+        typename = obj.get('__typename')
+        return type_condition is None or type_condition == typename or typename in self.interfaces.get(type_condition, ())
+
+    def fields(self, obj, selections):
+        for selection in selections:
+            if selection['kind'] == 'field':
+                yield selection
+            elif selection['kind'] == 'inline':
+                if self.type_matches(obj, selection['type']):
+                    yield from self.fields(obj, selection['selections'])
+            else:
+                if not (fragment := self.document['fragments'].get(selection['name'])):
+                    raise GraphQLError(f"Fragment {selection['name']} was used, but not defined")
+                if self.type_matches(obj, fragment['type']):
+                    yield from self.fields(obj, fragment['selections'])
+
+    def arguments(self, field):
+        return {name: resolve_value(value, self.variables) for name, value in field['arguments'].items()}
+
+    def select(self, obj, selections, root_type=None):
+        if obj is None:
+            return None
+        if isinstance(obj, list):
+            return [self.select(o, selections) for o in obj]
+        res = {}
+        for field in self.fields(obj, selections):
+            if field['name'] == '__typename':
+                res[field['alias']] = obj.get('__typename')
+                continue
+            if root_type and field['name'] not in obj:
+                raise GraphQLError(f"Field '{field['name']}' doesn't exist on type '{root_type}'")
+            value = obj.get(field['name'])
+            if callable(value):
+                value = value(self.arguments(field))
+            if field['selections'] is not None:
+                value = self.select(value, field['selections'])
+            res[field['alias']] = merge(res[field['alias']], value) if field['alias'] in res else value
+        return res
+
+    def execute(self, query_root, mutation_root):
+        if self.operation['type'] == 'mutation':
+            return self.select(mutation_root, self.operation['selections'], 'Mutation')
+        return self.select(query_root, self.operation['selections'], 'QueryRoot')
+
+
+def merge(a, b):
+    """
+    the same response key selected twice, e.g. once directly and once in a fragment.
+    """
+    if isinstance(a, dict) and isinstance(b, dict):
+        return {**a, **{k: merge(a[k], v) if k in a else v for k, v in b.items()}}
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        return [merge(x, y) for x, y in zip(a, b)]
+    return b
+
+
+def requested_cost(document, variables=None, operation_name=None):
+    """
+    shopify's calculated cost, approximately: a mutation field 10, an object 1, a connection 2 plus first times its nodes.
+    """
+    executor = Executor(document, variables, operation_name)
+
+    def fields(selections):
+        for selection in selections:
+            if selection['kind'] == 'field':
+                yield selection
+            elif selection['kind'] == 'inline':
+                yield from fields(selection['selections'])
+            elif fragment := executor.document['fragments'].get(selection['name']):
+                yield from fields(fragment['selections'])
+
+    def node_cost(selections):
+        total = 1
+        for field in fields(selections):
+            if field['name'] == 'nodes':
+                total += cost(field['selections'])
+            elif field['name'] == 'edges':
+                total += sum(cost(node['selections']) for node in fields(field['selections']) if node['name'] == 'node')
+        return total
+
+    def cost(selections):
+        total = 0
+        for field in fields(selections):
+            if field['selections'] is None or field['name'] == 'pageInfo':
+                continue
+            arguments = executor.arguments(field)
+            if (first := arguments.get('first') or arguments.get('last')) is not None:
+                total += 2 + int(first) * node_cost(field['selections'])
+            elif 'ids' in arguments:
+                total += len(arguments['ids'] or ()) * (1 + cost(field['selections']))
+            else:
+                total += 1 + cost(field['selections'])
+        return total
+
+    if executor.operation['type'] == 'mutation':
+        return 10 * sum(1 for _ in fields(executor.operation['selections']))
+    return max(1, cost(executor.operation['selections']))
+
+
+def actual_cost(data):
+    """
+    the cost of what was returned, one point per object.
+    """
+    if isinstance(data, list):
+        return sum(actual_cost(value) for value in data)
+    if isinstance(data, dict):
+        return 1 + sum(actual_cost(value) for key, value in data.items() if key != 'pageInfo')
+    return 0
@@ -0,0 +1,243 @@
+"""
+A local stand-in for the Shopify Admin GraphQL API, to benchmark and load-test the scripts without a real store.
+
+    server = FakeShopifyServer(latency=.05).start()
+    server.store.seed(products=100)
+    client = server.client()        # a ShopifyGraphqlClient pointed at the server
+    ...
+    server.stop()
+
+Requests are charged against a leaky bucket like shopify's calculated query cost limits, and answered with THROTTLED
+errors and the throttle status when the bucket is empty, or with MAX_COST_EXCEEDED errors when one costs over 1000 points. Staged uploads are POSTed to the server itself, the CDN URLs
+of files and the results of bulk operations are served by it too.
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from helpers.fake_shopify.graphql import GraphQLError, actual_cost, operation, parse, requested_cost
+from helpers.fake_shopify.store import FakeShopifyStore
+
+logger = logging.getLogger(__name__)
+
+graphql_path_expression = re.compile(r'^/admin/api/[^/]+/graphql\.json$')
+
+# shopify rejects a single query requesting more, whatever is left in the bucket
+max_query_cost = 1000
+
+
+class LeakyBucket:
+    """
+    shopify's cost limits: a bucket of maximum_available points refilled at restore_rate points per second.
+    """
+    def __init__(self, maximum_available=2000, restore_rate=100):
+        self.maximum_available = maximum_available
+        self.restore_rate = restore_rate
+        self.available = float(maximum_available)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.available = min(self.maximum_available, self.available + (now - self.updated) * self.restore_rate)
+        self.updated = now
+
+    def take(self, cost):
+        with self.lock:
+            self.refill()
+            if cost > self.available:
+                return False
+            self.available -= cost
+            return True
+
+    def refund(self, points):
+        with self.lock:
+            self.refill()
+            self.available = min(self.maximum_available, self.available + points)
+
+    def status(self):
+        with self.lock:
+            self.refill()
+            return {'maximumAvailable': float(self.maximum_available),
+                    'currentlyAvailable': int(max(0, self.available)),
+                    'restoreRate': float(self.restore_rate)}
+
+
+def multipart_fields(content_type, body):
+    message = BytesParser(policy=HTTP).parsebytes(b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+    return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True) for part in message.iter_parts()}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def respond(self, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        fake = self.server.fake
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if graphql_path_expression.match(self.path):
+            fake.simulate_latency()
+            if fake.access_token and self.headers.get('X-Shopify-Access-Token') != fake.access_token:
+                return self.respond(401, {'errors': '[API] Invalid API key or access token (unrecognized login or wrong password)'})
+            return self.respond(200, fake.graphql(json.loads(body)))
+        if self.path == '/staged-uploads':
+            fields = multipart_fields(self.headers['Content-Type'], body)
+            key = (fields.get('key') or b'').decode('utf-8')
+            if not fake.store.receive_upload(key, fields.get('file') or b''):
+                return self.respond(403, f'<Error><Code>AccessDenied</Code><Message>no staged target for {key}</Message></Error>'.encode(), 'application/xml')
+            with fake.counter_lock:
+                fake.uploads += 1
+            status = int((fields.get('success_action_status') or b'204').decode())
+            return self.respond(status, f'<PostResponse><Key>{key}</Key></PostResponse>'.encode() if status == 201 else b'', 'application/xml')
+        self.respond(404, {'errors': 'Not Found'})
+
+    def do_GET(self):
+        store = self.server.fake.store
+        path = self.path.split('?', 1)[0]
+        content = None
+        if path == '/stats':
+            return self.respond(200, self.server.fake.stats())
+        if path.startswith('/bulk/'):
+            content = store.bulk_results.get(path[len('/bulk/'):])
+        elif path.startswith('/staged-uploads/'):
+            content = (store.staged_uploads.get(path[len('/staged-uploads/'):]) or {}).get('content')
+        elif path.startswith('/cdn/shop/files/'):
+            content = store.media_content(path[len('/cdn/shop/files/'):])
+        if content is None:
+            return self.respond(404, {'errors': 'Not Found'})
+        self.respond(200, content, 'application/octet-stream')
+
+
+class FakeShopifyServer:
+    """
+    latency: seconds added to every GraphQL request, plus up to latency_jitter more.
+    maximum_available, restore_rate: the cost bucket, 2000 points refilled at 100 per second as on standard plans.
+    """
+    def __init__(self, store=None, host='127.0.0.1', port=0, latency=0., latency_jitter=0., maximum_available=2000, restore_rate=100,
+                 access_token=None, api_version='2025-04'):
+        self.httpd = ThreadingHTTPServer((host, port), RequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.url = f'http://{host}:{self.httpd.server_address[1]}'
+        self.graphql_url = f'{self.url}/admin/api/{api_version}/graphql.json'
+        self.store = store or FakeShopifyStore()
+        self.store.base_url = self.url
+        self.bucket = LeakyBucket(maximum_available, restore_rate)
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.access_token = access_token
+        self.thread = None
+        self.requests = 0
+        self.throttled = 0
+        self.uploads = 0
+        self.actual_cost = 0
+        self.counter_lock = threading.Lock()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='fake-shopify', daemon=True)
+        self.thread.start()
+        logger.info(f'fake shopify listening on {self.graphql_url}')
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def client(self, shop_name='fake-shop'):
+        from helpers.shopify_graphql_client.client import ShopifyGraphqlClient
+        client = ShopifyGraphqlClient(shop_name, self.access_token or 'fake-token')
+        client.base_url = self.graphql_url
+        return client
+
+    def stats(self):
+        """
+        request counters, also served at /stats for a server running in another process.
+        """
+        with self.counter_lock:
+            return {'requests': self.requests, 'throttled': self.throttled, 'uploads': self.uploads, 'actual_cost': self.actual_cost}
+
+    def simulate_latency(self):
+        if self.latency or self.latency_jitter:
+            time.sleep(self.latency + random.uniform(0, self.latency_jitter))
+
+    def graphql(self, payload):
+        with self.counter_lock:
+            self.requests += 1
+        query, variables, operation_name = payload.get('query'), payload.get('variables') or {}, payload.get('operationName')
+        try:
+            document = parse(query)
+            cost = requested_cost(document, variables, operation_name)
+        except GraphQLError as e:
+            return {'errors': [{'message': str(e), 'locations': [], 'extensions': {'code': 'PARSE_ERROR'}}]}
+        if cost > max_query_cost:
+            return {'errors': [{'message': f'Query cost is {cost}, which exceeds the single query max cost limit ({max_query_cost}).',
+                                'extensions': {'code': 'MAX_COST_EXCEEDED', 'cost': cost, 'maxCost': max_query_cost}}]}
+        if not self.bucket.take(cost):
+            with self.counter_lock:
+                self.throttled += 1
+            return {'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED', 'documentation': 'https://shopify.dev/api/usage/rate-limits'}}],
+                    'extensions': {'cost': {'requestedQueryCost': cost, 'actualQueryCost': None, 'throttleStatus': self.bucket.status()}}}
+        try:
+            data = self.store.execute(document, variables, operation_name)
+        except GraphQLError as e:
+            self.bucket.refund(cost)
+            return {'errors': [{'message': str(e), 'extensions': {'code': 'GRAPHQL_ERROR'}}]}
+        actual = cost if operation(document, operation_name)['type'] == 'mutation' else min(cost, actual_cost(data))
+        self.bucket.refund(cost - actual)
+        with self.counter_lock:
+            self.actual_cost += actual
+        return {'data': data, 'extensions': {'cost': {'requestedQueryCost': cost, 'actualQueryCost': actual, 'throttleStatus': self.bucket.status()}}}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Run a fake Shopify Admin GraphQL server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=.05)
+    parser.add_argument('--latency-jitter', type=float, default=.02)
+    parser.add_argument('--maximum-available', type=int, default=2000)
+    parser.add_argument('--restore-rate', type=int, default=100)
+    parser.add_argument('--media-processing-seconds', type=float, default=2.)
+    parser.add_argument('--bulk-operation-seconds', type=float, default=2.)
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--variants-per-product', type=int, default=3)
+    parser.add_argument('--media-per-product', type=int, default=2)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = FakeShopifyServer(FakeShopifyStore(args.media_processing_seconds, args.bulk_operation_seconds),
+                               args.host, args.port, args.latency, args.latency_jitter, args.maximum_available, args.restore_rate)
+    server.store.seed(args.products, args.variants_per_product, args.media_per_product)
+    print(f'fake shopify at {server.graphql_url}, set client.base_url to it', flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1077 @@
+"""
+The in-memory shop behind the fake server: products, variants, inventory, media and files, metafields, staged uploads
+and bulk operations, with resolvers for the subset of Admin GraphQL fields the client mixins use.
+
+Entities are plain dicts, the views built from them carry the GraphQL field names, with callables for fields taking
+arguments (connections, metafield, quantities). Media and files are PROCESSING until media_processing_seconds after
+their creation, bulk operations RUNNING until bulk_operation_seconds after theirs.
+"""
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from helpers.fake_shopify.graphql import Executor, GraphQLError, parse
+
+search_term_expression = re.compile(r"""(-)?(?:(\w+):)?(<=|>=|<|>)?('(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*"|[^\s()]+)""")
+max_page_size = 250
+
+
+def timestamp(seconds=None):
+    return datetime.fromtimestamp(seconds or time.time(), timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def user_error(field, message, code=None):
+    return {'field': field, 'message': message, 'code': code}
+
+
+def search_clauses(query_string):
+    """
+    the OR-separated clauses of a search query, each a list of ANDed (negated, field, comparator, value, quoted) terms,
+    e.g. "sku:'A-1' status:active -tag:old OR sku:B-2". parentheses are not supported.
+    """
+    clauses = [[]]
+    for negated, field, comparator, value in search_term_expression.findall(query_string or ''):
+        if not field and value == 'OR':
+            clauses.append([])
+            continue
+        if not field and value in ('AND', 'NOT'):
+            continue
+        quoted = value[:1] in ('"', "'") and value[-1:] == value[:1] and len(value) > 1
+        if quoted:
+            value = re.sub(r'\\(.)', r'\1', value[1:-1])
+        clauses[-1].append((bool(negated), field or None, comparator, value, quoted))
+    return [terms for terms in clauses if terms] or [[]]
+
+
+def term_matches(values, comparator, value, quoted=True):
+    """
+    quoted values match whole field values, unquoted ones also single words of them, as shopify's tokenized search does.
+    """
+    value = value.lower()
+    for v in values:
+        if v is None:
+            continue
+        v = str(v).lower()
+        if comparator:
+            try:
+                v, compared = float(v), float(value)
+            except ValueError:
+                compared = value
+            if {'<': v < compared, '<=': v <= compared, '>': v > compared, '>=': v >= compared}[comparator]:
+                return True
+        elif value.endswith('*') and v.startswith(value[:-1]):
+            return True
+        elif v == value or (not quoted and value in re.split(r'[\s/,-]+', v)):
+            return True
+    return False
+
+
+def gid_number(gid):
+    return gid.rsplit('/', 1)[-1].split('?', 1)[0]
+
+
+class FakeShopifyStore:
+    interfaces = {
+        'Node': {'Product', 'ProductVariant', 'InventoryItem', 'InventoryLevel', 'Location', 'MediaImage', 'GenericFile',
+                 'Metafield', 'MetafieldDefinition', 'BulkOperation'},
+        'File': {'MediaImage', 'GenericFile'},
+        'Media': {'MediaImage'},
+        'HasMetafields': {'Product', 'ProductVariant'},
+    }
+    sort_keys = {'ID': 'number', 'TITLE': 'title', 'UPDATED_AT': 'updatedAt', 'CREATED_AT': 'createdAt', 'SKU': 'sku',
+                 'FILENAME': 'filename', 'NAME': 'name', 'POSITION': 'position'}
+
+    def __init__(self, media_processing_seconds=.5, bulk_operation_seconds=.5, base_url='http://127.0.0.1'):
+        self.media_processing_seconds = media_processing_seconds
+        self.bulk_operation_seconds = bulk_operation_seconds
+        self.base_url = base_url
+        self.lock = threading.RLock()
+        self.numbers = itertools.count(1000000001)
+        self.products = {}
+        self.variants = {}
+        self.inventory_items = {}
+        self.media = {}                 # the Files library, product media included
+        self.locations = {}
+        self.metafields = {}
+        self.metafield_ids = {}         # (owner_id, namespace, key) -> metafield id
+        self.metafield_definitions = {}
+        self.staged_uploads = {}        # key -> {'filename', 'mime_type', 'resource', 'content'}
+        self.bulk_operations = {}
+        self.bulk_results = {}          # file name -> JSONL bytes
+        self.bulk = False
+        self.add_location('Main Warehouse')
+        for namespace, key, type_name in [('custom', 'product_description', 'rich_text_field'),
+                                          ('custom', 'product_care', 'rich_text_field'),
+                                          ('custom', 'size_table_html', 'multi_line_text_field'),
+                                          ('custom', 'variation_value', 'single_line_text_field'),
+                                          ('custom', 'variation_products', 'list.product_reference')]:
+            self.add_metafield_definition(namespace, key, type_name)
+
+    def new_id(self, resource):
+        return f'gid://shopify/{resource}/{next(self.numbers)}'
+
+    def execute(self, document, variables=None, operation_name=None):
+        with self.lock:
+            return Executor(document, variables, operation_name, self.interfaces).execute(self.query_root(), self.mutation_root())
+
+    """ setup """
+    def add_location(self, name):
+        location_id = self.new_id('Location')
+        self.locations[location_id] = {'id': location_id, 'number': gid_number(location_id), 'name': name, 'isActive': True}
+        return location_id
+
+    def add_metafield_definition(self, namespace, key, type_name, owner_type='PRODUCT'):
+        definition_id = self.new_id('MetafieldDefinition')
+        self.metafield_definitions[definition_id] = {'id': definition_id, 'namespace': namespace, 'key': key, 'name': key,
+                                                     'ownerType': owner_type, 'type': {'name': type_name}}
+        return definition_id
+
+    def seed(self, products=10, variants_per_product=3, media_per_product=2, tags=('fake', 'seeded')):
+        """
+        products with one Size option, SKUs 'SKU00000-1'..., ready media with the first one on every variant.
+        returns the product IDs.
+        """
+        with self.lock:
+            product_ids = []
+            for i in range(products):
+                sizes = [f'Size {j + 1}' for j in range(variants_per_product)]
+                res = self.product_set({'input': {
+                    'title': f'Product {i:05d}',
+                    'vendor': 'Fake Vendor',
+                    'status': 'ACTIVE',
+                    'tags': list(tags),
+                    'productOptions': [{'name': 'Size', 'values': [{'name': size} for size in sizes]}],
+                    'variants': [{'sku': f'SKU{i:05d}-{j + 1}', 'price': '10000.00',
+                                  'optionValues': [{'optionName': 'Size', 'name': size}]} for j, size in enumerate(sizes)],
+                }})
+                product = self.products[res['product']['id']]
+                for j in range(media_per_product):
+                    media = self.create_media(f'{self.base_url}/cdn/seed/product-{i:05d}-{j + 1}.jpg', f'Product {i:05d} {j + 1}')
+                    media['ready_at'] = 0
+                    self.attach_media(product, media)
+                if product['media_ids']:
+                    for variant_id in product['variant_ids']:
+                        self.variants[variant_id]['media_ids'] = product['media_ids'][:1]
+                product_ids.append(product['id'])
+            return product_ids
+
+    """ views """
+    def connection(self, items, arguments, view):
+        items = list(items)
+        if arguments.get('reverse'):
+            items.reverse()
+        first = arguments.get('first')
+        if first is None and (last := arguments.get('last')) is not None:
+            first, items = last, items[-last:]
+        if first is None and not self.bulk:
+            raise GraphQLError('you must provide one of first or last')
+        if first is not None and first > max_page_size:
+            raise GraphQLError(f'The first argument must be at most {max_page_size}')
+        start = int(arguments['after']) + 1 if arguments.get('after') else 0
+        page = items[start:start + first] if first is not None else items[start:]
+        nodes = [view(item) for item in page]
+        return {
+            'nodes': nodes,
+            'edges': [{'node': node, 'cursor': str(start + i)} for i, node in enumerate(nodes)],
+            'pageInfo': {
+                'hasNextPage': start + len(page) < len(items),
+                'hasPreviousPage': start > 0,
+                'startCursor': str(start) if page else None,
+                'endCursor': str(start + len(page) - 1) if page else None,
+            },
+        }
+
+    def search(self, entities, query_string, fields, default_fields, arguments):
+        res = []
+        clauses = search_clauses(query_string)
+        for entity in entities:
+            values = fields(entity)
+            if any(all(negated != term_matches(values.get(field, ()) if field else [v for f in default_fields for v in values.get(f, ())],
+                                               comparator, value, quoted)
+                       for negated, field, comparator, value, quoted in terms)
+                   for terms in clauses):
+                res.append(entity)
+        if sort_key := self.sort_keys.get(arguments.get('sortKey') or 'ID'):
+            res.sort(key=lambda entity: (entity.get(sort_key) is None, int(entity[sort_key]) if sort_key == 'number' else entity.get(sort_key)))
+        return res
+
+    def product_view(self, product):
+        if product is None:
+            return None
+        owner_view = self.owner_view(product)
+        return dict(owner_view, **{
+            '__typename': 'Product',
+            'id': product['id'],
+            'legacyResourceId': product['number'],
+            'title': product['title'],
+            'handle': product['handle'],
+            'descriptionHtml': product['descriptionHtml'],
+            'description': re.sub(r'<[^>]+>', '', product['descriptionHtml'] or ''),
+            'vendor': product['vendor'],
+            'productType': product['productType'],
+            'status': product['status'],
+            'tags': list(product['tags']),
+            'templateSuffix': product['templateSuffix'],
+            'createdAt': product['createdAt'],
+            'updatedAt': product['updatedAt'],
+            'totalInventory': sum(self.variant_quantity(self.variants[variant_id]) for variant_id in product['variant_ids']),
+            'options': lambda a: [{'id': f"gid://shopify/ProductOption/{product['number']}{i}", 'name': option['name'], 'position': i + 1,
+                                   'values': list(option['values']), 'optionValues': [{'name': value} for value in option['values']]}
+                                  for i, option in enumerate(product['options'])][:a.get('first')],
+            'variants': lambda a: self.connection([self.variants[i] for i in product['variant_ids']], a, self.variant_view),
+            'variantsCount': {'count': len(product['variant_ids']), 'precision': 'EXACT'},
+            'media': lambda a: self.connection([self.media[i] for i in product['media_ids']], a, self.media_view),
+            'mediaCount': {'count': len(product['media_ids']), 'precision': 'EXACT'},
+            'featuredMedia': self.media_view(self.media[product['media_ids'][0]]) if product['media_ids'] else None,
+        })
+
+    def variant_view(self, variant):
+        if variant is None:
+            return None
+        product = self.products[variant['product_id']]
+        return dict(self.owner_view(variant), **{
+            '__typename': 'ProductVariant',
+            'id': variant['id'],
+            'legacyResourceId': variant['number'],
+            'title': variant['title'],
+            'displayName': f"{product['title']} - {variant['title']}",
+            'sku': variant['sku'],
+            'barcode': variant['barcode'],
+            'price': variant['price'],
+            'compareAtPrice': variant['compareAtPrice'],
+            'taxable': variant['taxable'],
+            'position': variant['position'],
+            'selectedOptions': [dict(option) for option in variant['selectedOptions']],
+            'createdAt': variant['createdAt'],
+            'updatedAt': variant['updatedAt'],
+            'inventoryQuantity': self.variant_quantity(variant),
+            'product': lambda a: self.product_view(product),
+            'media': lambda a: self.connection([self.media[i] for i in variant['media_ids']], a, self.media_view),
+            'image': (self.media_view(self.media[variant['media_ids'][0]]) or {}).get('image') if variant['media_ids'] else None,
+            'inventoryItem': lambda a: self.inventory_item_view(self.inventory_items[variant['inventory_item_id']]),
+        })
+
+    def owner_view(self, owner):
+        def metafield(a):
+            namespace, key = a.get('namespace'), a['key']
+            if namespace is None and '.' in key:
+                namespace, key = key.rsplit('.', 1)
+            return self.metafield_view(self.metafields.get(self.metafield_ids.get((owner['id'], namespace, key))))
+
+        def metafields(a):
+            owned = [metafield for metafield in self.metafields.values() if metafield['owner_id'] == owner['id']
+                     and (not a.get('namespace') or metafield['namespace'] == a['namespace'])
+                     and (not a.get('keys') or f"{metafield['namespace']}.{metafield['key']}" in a['keys'])]
+            return self.connection(owned, a, self.metafield_view)
+        return {'metafield': metafield, 'metafields': metafields}
+
+    def metafield_view(self, metafield):
+        if metafield is None:
+            return None
+        return {
+            '__typename': 'Metafield',
+            'id': metafield['id'],
+            'namespace': metafield['namespace'],
+            'key': metafield['key'],
+            'value': metafield['value'],
+            'type': metafield['type'],
+            'jsonValue': self.json_value(metafield),
+            'createdAt': metafield['createdAt'],
+            'updatedAt': metafield['updatedAt'],
+            'owner': lambda a: self.node(metafield['owner_id']),
+        }
+
+    @staticmethod
+    def json_value(metafield):
+        try:
+            return json.loads(metafield['value']) if metafield['type'].startswith(('list.', 'json', 'rich_text')) else metafield['value']
+        except ValueError:
+            return metafield['value']
+
+    def media_status(self, media):
+        if media['failed']:
+            return 'FAILED'
+        return 'READY' if time.monotonic() >= media['ready_at'] else 'PROCESSING'
+
+    def media_view(self, media):
+        if media is None:
+            return None
+        status = self.media_status(media)
+        image = {'id': media['id'].replace(media['__typename'], 'ImageSource'), 'url': media['url'], 'altText': media['alt'],
+                 'width': 1000, 'height': 1000} if status == 'READY' and media['__typename'] == 'MediaImage' else None
+        errors = [{'code': 'MEDIA_UNAVAILABLE', 'details': 'the staged upload was never received', 'message': 'File could not be processed.'}] if media['failed'] else []
+        return {
+            '__typename': media['__typename'],
+            'id': media['id'],
+            'alt': media['alt'],
+            'mediaContentType': 'IMAGE',
+            'status': status,
+            'fileStatus': status,
+            'image': image,
+            'preview': {'image': image, 'status': status},
+            'url': media['url'] if status == 'READY' else None,
+            'mimeType': media['mime_type'],
+            'originalSource': {'url': media['source'], 'fileSize': media['file_size']},
+            'originalFileSize': media['file_size'],
+            'mediaErrors': errors,
+            'fileErrors': errors,
+            'mediaWarnings': [],
+            'createdAt': media['createdAt'],
+            'updatedAt': media['updatedAt'],
+        }
+
+    def variant_quantity(self, variant):
+        return sum(level['available'] for level in self.inventory_items[variant['inventory_item_id']]['levels'].values())
+
+    def inventory_item_view(self, item):
+        if item is None:
+            return None
+        variant = self.variants[item['variant_id']]
+        return {
+            '__typename': 'InventoryItem',
+            'id': item['id'],
+            'legacyResourceId': item['number'],
+            'sku': variant['sku'],
+            'tracked': item['tracked'],
+            'requiresShipping': True,
+            'createdAt': item['createdAt'],
+            'updatedAt': item['updatedAt'],
+            'variant': lambda a: self.variant_view(variant),
+            'inventoryLevels': lambda a: self.connection([(item, location_id) for location_id in item['levels']], a,
+                                                         lambda level: self.inventory_level_view(*level)),
+            'inventoryLevel': lambda a: self.inventory_level_view(item, a['locationId']) if a['locationId'] in item['levels'] else None,
+        }
+
+    def inventory_level_view(self, item, location_id):
+        level = item['levels'][location_id]
+        return {
+            '__typename': 'InventoryLevel',
+            'id': f"gid://shopify/InventoryLevel/{gid_number(location_id)}?inventory_item_id={item['number']}",
+            'isActive': True,
+            'quantities': lambda a: [{'name': name, 'quantity': level.get(name, 0)} for name in a.get('names') or ('available', 'on_hand')],
+            'item': lambda a: self.inventory_item_view(item),
+            'location': lambda a: self.location_view(self.locations[location_id]),
+        }
+
+    def location_view(self, location):
+        if location is None:
+            return None
+        return {'__typename': 'Location', 'id': location['id'], 'legacyResourceId': location['number'], 'name': location['name'],
+                'isActive': location['isActive'], 'fulfillsOnlineOrders': True}
+
+    def bulk_operation_view(self, operation):
+        if operation is None:
+            return None
+        status = operation['status']
+        if status == 'RUNNING' and time.monotonic() >= operation['ready_at']:
+            status = operation['status'] = 'COMPLETED'
+            operation['completedAt'] = timestamp()
+        progress = 1 if status == 'COMPLETED' else min(1, (time.monotonic() - operation['started']) / max(self.bulk_operation_seconds, 1e-9))
+        completed = status == 'COMPLETED' and operation['object_count']
+        return {
+            '__typename': 'BulkOperation',
+            'id': operation['id'],
+            'type': operation['type'],
+            'status': status,
+            'errorCode': None,
+            'query': operation['query'],
+            'objectCount': str(int(operation['object_count'] * progress)),
+            'rootObjectCount': str(int(operation['root_object_count'] * progress)),
+            'fileSize': str(len(self.bulk_results[operation['result_name']])) if completed else None,
+            'url': f"{self.base_url}/bulk/{operation['result_name']}" if completed else None,
+            'partialDataUrl': None,
+            'createdAt': operation['createdAt'],
+            'completedAt': operation.get('completedAt'),
+        }
+
+    def node(self, gid, resource=None):
+        if not isinstance(gid, str) or not gid.startswith('gid://shopify/'):
+            raise GraphQLError(f'Invalid global id \'{gid}\'')
+        gid_resource = gid.split('/')[3]
+        if resource and gid_resource != resource:
+            return None
+        table, view = {
+            'Product': (self.products, self.product_view),
+            'ProductVariant': (self.variants, self.variant_view),
+            'InventoryItem': (self.inventory_items, self.inventory_item_view),
+            'MediaImage': (self.media, self.media_view),
+            'GenericFile': (self.media, self.media_view),
+            'Location': (self.locations, self.location_view),
+            'Metafield': (self.metafields, self.metafield_view),
+            'MetafieldDefinition': (self.metafield_definitions, dict),
+            'BulkOperation': (self.bulk_operations, self.bulk_operation_view),
+        }.get(gid_resource, ({}, None))
+        return view(table[gid]) if gid in table else None
+
+    """ search fields """
+    def product_search_fields(self, product):
+        variants = [self.variants[variant_id] for variant_id in product['variant_ids']]
+        return {
+            'id': [product['number']],
+            'title': [product['title']],
+            'handle': [product['handle']],
+            'tag': product['tags'],
+            'status': [product['status']],
+            'vendor': [product['vendor']],
+            'product_type': [product['productType']],
+            'sku': [variant['sku'] for variant in variants],
+            'barcode': [variant['barcode'] for variant in variants],
+            'created_at': [product['createdAt']],
+            'updated_at': [product['updatedAt']],
+        }
+
+    def variant_search_fields(self, variant):
+        product = self.products[variant['product_id']]
+        return {
+            'id': [variant['number']],
+            'sku': [variant['sku']],
+            'title': [variant['title']],
+            'barcode': [variant['barcode']],
+            'product_id': [product['number']],
+            'product_status': [product['status']],
+            'tag': product['tags'],
+            'updated_at': [variant['updatedAt']],
+        }
+
+    def inventory_item_search_fields(self, item):
+        return {'id': [item['number']], 'sku': [self.variants[item['variant_id']]['sku']], 'updated_at': [item['updatedAt']]}
+
+    def file_search_fields(self, media):
+        return {
+            'id': [gid_number(media['id'])],
+            'filename': [media['filename']],
+            'alt': [media['alt']],
+            'media_type': ['IMAGE' if media['__typename'] == 'MediaImage' else 'GENERIC_FILE'],
+            'status': [self.media_status(media)],
+            'created_at': [media['createdAt']],
+            'updated_at': [media['updatedAt']],
+        }
+
+    """ roots """
+    def query_root(self):
+        return {
+            'products': lambda a: self.connection(self.search(self.products.values(), a.get('query'), self.product_search_fields,
+                                                              ('title', 'sku', 'tag', 'vendor'), a), a, self.product_view),
+            'productVariants': lambda a: self.connection(self.search(self.variants.values(), a.get('query'), self.variant_search_fields,
+                                                                     ('sku', 'title'), a), a, self.variant_view),
+            'inventoryItems': lambda a: self.connection(self.search(self.inventory_items.values(), a.get('query'), self.inventory_item_search_fields,
+                                                                    ('sku',), a), a, self.inventory_item_view),
+            'files': lambda a: self.connection(self.search(self.media.values(), a.get('query'), self.file_search_fields,
+                                                           ('filename', 'alt'), a), a, self.media_view),
+            'locations': lambda a: self.connection(self.search(self.locations.values(), a.get('query'),
+                                                               lambda location: {'name': [location['name']], 'id': [location['number']]},
+                                                               ('name',), a), a, self.location_view),
+            'metafieldDefinitions': lambda a: self.connection([definition for definition in self.metafield_definitions.values()
+                                                               if definition['ownerType'] == a.get('ownerType', 'PRODUCT')
+                                                               and a.get('namespace') in (None, definition['namespace'])
+                                                               and a.get('key') in (None, definition['key'])], a, dict),
+            'product': lambda a: self.node(a['id'], 'Product'),
+            'productVariant': lambda a: self.node(a['id'], 'ProductVariant'),
+            'inventoryItem': lambda a: self.node(a['id'], 'InventoryItem'),
+            'location': lambda a: self.node(a['id'], 'Location') if a.get('id') else self.location_view(next(iter(self.locations.values()))),
+            'node': lambda a: self.node(a['id']),
+            'nodes': lambda a: [self.node(gid) for gid in a['ids']],
+            'currentBulkOperation': lambda a: self.bulk_operation_view(next(
+                (operation for operation in reversed(list(self.bulk_operations.values())) if operation['type'] == a.get('type', 'QUERY')), None)),
+            'shop': {'__typename': 'Shop', 'id': 'gid://shopify/Shop/1', 'name': 'Fake Shop', 'myshopifyDomain': 'fake-shop.myshopify.com',
+                     'currencyCode': 'JPY'},
+        }
+
+    def mutation_root(self):
+        return {
+            'productSet': self.product_set,
+            'productUpdate': self.product_update,
+            'productDuplicate': self.product_duplicate,
+            'productOptionsDelete': self.product_options_delete,
+            'productCreateMedia': self.product_create_media,
+            'productDeleteMedia': self.product_delete_media,
+            'productVariantAppendMedia': self.product_variant_append_media,
+            'productVariantDetachMedia': self.product_variant_detach_media,
+            'productVariantsBulkUpdate': self.product_variants_bulk_update,
+            'productVariantsBulkCreate': self.product_variants_bulk_create,
+            'productVariantsBulkDelete': self.product_variants_bulk_delete,
+            'tagsAdd': lambda a: self.tags_change(a, add=True),
+            'tagsRemove': lambda a: self.tags_change(a, add=False),
+            'stagedUploadsCreate': self.staged_uploads_create,
+            'fileCreate': self.file_create,
+            'fileUpdate': self.file_update,
+            'fileDelete': self.file_delete,
+            'metafieldsSet': self.metafields_set,
+            'metafieldsDelete': self.metafields_delete,
+            'inventorySetQuantities': self.inventory_set_quantities,
+            'inventoryActivate': self.inventory_activate,
+            'inventoryBulkToggleActivation': self.inventory_bulk_toggle_activation,
+            'inventoryItemUpdate': self.inventory_item_update,
+            'bulkOperationRunQuery': self.bulk_operation_run_query,
+            'bulkOperationRunMutation': self.bulk_operation_run_mutation,
+            'bulkOperationCancel': self.bulk_operation_cancel,
+        }
+
+    """ products """
+    def unique_handle(self, handle, product_id=None):
+        handles = {product['handle'] for product in self.products.values() if product['id'] != product_id}
+        base = handle = re.sub(r'[^\w]+', '-', handle.lower()).strip('-') or 'product'
+        for i in itertools.count(1):
+            if handle not in handles:
+                return handle
+            handle = f'{base}-{i}'
+
+    @staticmethod
+    def tag_list(tags):
+        return [tag.strip() for tag in (tags.split(',') if isinstance(tags, str) else tags or []) if tag.strip()]
+
+    def update_product_fields(self, product, data):
+        for field in ('title', 'descriptionHtml', 'vendor', 'productType', 'status', 'templateSuffix'):
+            if field in data:
+                product[field] = data[field]
+        if 'tags' in data:
+            product['tags'] = sorted(set(self.tag_list(data['tags'])))
+        if data.get('handle'):
+            product['handle'] = data['handle']
+        product['updatedAt'] = timestamp()
+        errors = self.set_owner_metafields(product['id'], data.get('metafields') or [])
+        return errors
+
+    def new_product(self, title):
+        product_id = self.new_id('Product')
+        product = self.products[product_id] = {
+            'id': product_id, 'number': gid_number(product_id), 'title': title, 'handle': self.unique_handle(title),
+            'descriptionHtml': '', 'vendor': '', 'productType': '', 'status': 'ACTIVE', 'tags': [], 'templateSuffix': None,
+            'createdAt': timestamp(), 'updatedAt': timestamp(), 'options': [], 'variant_ids': [], 'media_ids': [],
+        }
+        return product
+
+    def product_set(self, a):
+        data = a['input']
+        if data.get('id'):
+            if not (product := self.products.get(data['id'])):
+                return {'product': None, 'productSetOperation': None, 'userErrors': [user_error(['input', 'id'], 'Product does not exist', 'PRODUCT_DOES_NOT_EXIST')]}
+        else:
+            if not data.get('title'):
+                return {'product': None, 'productSetOperation': None, 'userErrors': [user_error(['input', 'title'], "Title can't be blank", 'BLANK')]}
+            if data.get('handle') and any(p['handle'] == data['handle'] for p in self.products.values()):
+                return {'product': None, 'productSetOperation': None,
+                        'userErrors': [user_error(['input', 'handle'], f"Handle '{data['handle']}' already in use. Please provide a new handle.", 'HANDLE_NOT_UNIQUE')]}
+            product = self.new_product(data['title'])
+        errors = self.update_product_fields(product, data)
+        if 'productOptions' in data:
+            product['options'] = [{'name': option['name'], 'values': [value['name'] for value in option.get('values') or []]}
+                                  for option in data['productOptions']]
+        if 'variants' in data:
+            keep = []
+            for position, variant_input in enumerate(data['variants'], 1):
+                if variant_input.get('id') in self.variants:
+                    self.update_variant(self.variants[variant_input['id']], variant_input)
+                    keep.append(variant_input['id'])
+                else:
+                    keep.append(self.create_variant(product, dict(variant_input, position=variant_input.get('position', position)))['id'])
+            for variant_id in set(product['variant_ids']) - set(keep):
+                self.delete_variant(variant_id)
+            product['variant_ids'] = keep
+        elif not product['variant_ids']:
+            product['options'] = product['options'] or [{'name': 'Title', 'values': ['Default Title']}]
+            self.create_variant(product, {'optionValues': [{'optionName': 'Title', 'name': 'Default Title'}]})
+        return {'product': self.product_view(product), 'productSetOperation': None, 'userErrors': errors}
+
+    def product_update(self, a):
+        data = a.get('product') or a.get('input')
+        if not (product := self.products.get(data.get('id'))):
+            return {'product': None, 'userErrors': [user_error(['id'], 'Product does not exist')]}
+        errors = self.update_product_fields(product, data)
+        return {'product': self.product_view(product), 'userErrors': errors}
+
+    def product_duplicate(self, a):
+        """
+        the copy has the source's fields, options and variants, and copies of its media when includeImages is set.
+        """
+        if not (source := self.products.get(a['productId'])):
+            return {'newProduct': None, 'imageJob': None, 'userErrors': [user_error(['productId'], 'Product does not exist')]}
+        product = self.new_product(a['newTitle'])
+        product.update({field: source[field] for field in ('descriptionHtml', 'vendor', 'productType', 'templateSuffix')},
+                       status=a.get('newStatus') or source['status'], tags=list(source['tags']),
+                       options=[{'name': option['name'], 'values': list(option['values'])} for option in source['options']])
+        media_ids = {}
+        if a.get('includeImages'):
+            for media_id in source['media_ids']:
+                media = self.create_media(self.media[media_id]['source'], self.media[media_id]['alt'])
+                self.attach_media(product, media)
+                media_ids[media_id] = media['id']
+        for variant_id in source['variant_ids']:
+            variant = self.variants[variant_id]
+            duplicate = self.create_variant(product, {'sku': variant['sku'], 'price': variant['price'], 'compareAtPrice': variant['compareAtPrice'],
+                                                      'optionValues': [{'optionName': option['name'], 'name': option['value']}
+                                                                       for option in variant['selectedOptions']]})
+            duplicate['media_ids'] = [media_ids[media_id] for media_id in variant['media_ids'] if media_id in media_ids]
+        return {'newProduct': self.product_view(product), 'imageJob': None, 'userErrors': []}
+
+    def product_options_delete(self, a):
+        if not (product := self.products.get(a['productId'])):
+            return {'deletedOptionsIds': None, 'product': None, 'userErrors': [user_error(['productId'], 'Product does not exist')]}
+        positions = {f"gid://shopify/ProductOption/{product['number']}{i}": i for i in range(len(product['options']))}
+        if unknown := [option_id for option_id in a['options'] if option_id not in positions]:
+            return {'deletedOptionsIds': None, 'product': self.product_view(product),
+                    'userErrors': [user_error(['options'], f'Option does not exist: {unknown}', 'OPTION_DOES_NOT_EXIST')]}
+        names = {product['options'][positions[option_id]]['name'] for option_id in a['options']}
+        product['options'] = [option for option in product['options'] if option['name'] not in names]
+        for variant_id in product['variant_ids']:
+            variant = self.variants[variant_id]
+            variant['selectedOptions'] = [option for option in variant['selectedOptions'] if option['name'] not in names]
+            variant['title'] = ' / '.join(option['value'] for option in variant['selectedOptions']) or 'Default Title'
+        product['updatedAt'] = timestamp()
+        return {'deletedOptionsIds': a['options'], 'product': self.product_view(product), 'userErrors': []}
+
+    def tags_change(self, a, add):
+        if not (product := self.products.get(a['id'])):
+            return {'node': None, 'userErrors': [user_error(['id'], 'Product does not exist')]}
+        tags = set(self.tag_list(a['tags']))
+        product['tags'] = sorted(set(product['tags']) | tags if add else set(product['tags']) - tags)
+        product['updatedAt'] = timestamp()
+        return {'node': self.product_view(product), 'userErrors': []}
+
+    """ variants and inventory """
+    @staticmethod
+    def money(value):
+        return None if value in (None, '') else f'{float(value):.2f}'
+
+    def create_variant(self, product, data):
+        variant_id = self.new_id('ProductVariant')
+        item_id = self.new_id('InventoryItem')
+        first_location_id = next(iter(self.locations))
+        self.inventory_items[item_id] = {'id': item_id, 'number': gid_number(item_id), 'variant_id': variant_id,
+                                         'tracked': (data.get('inventoryItem') or {}).get('tracked', False),
+                                         'levels': {first_location_id: {'available': 0, 'on_hand': 0}},
+                                         'createdAt': timestamp(), 'updatedAt': timestamp()}
+        variant = self.variants[variant_id] = {
+            'id': variant_id, 'number': gid_number(variant_id), 'product_id': product['id'], 'title': 'Default Title',
+            'sku': None, 'barcode': None, 'price': '0.00', 'compareAtPrice': None, 'taxable': True,
+            'position': len(product['variant_ids']) + 1, 'selectedOptions': [], 'media_ids': [], 'inventory_item_id': item_id,
+            'createdAt': timestamp(), 'updatedAt': timestamp(),
+        }
+        product['variant_ids'].append(variant_id)
+        self.update_variant(variant, data)
+        for quantity in data.get('inventoryQuantities') or []:
+            level = self.inventory_items[item_id]['levels'].setdefault(quantity['locationId'], {'available': 0, 'on_hand': 0})
+            level['available'] = level['on_hand'] = quantity.get('quantity', quantity.get('availableQuantity', 0))
+        return variant
+
+    def update_variant(self, variant, data):
+        product = self.products[variant['product_id']]
+        for field in ('barcode', 'taxable', 'position'):
+            if field in data:
+                variant[field] = data[field]
+        if 'price' in data:
+            variant['price'] = self.money(data['price'])
+        if 'compareAtPrice' in data:
+            variant['compareAtPrice'] = self.money(data['compareAtPrice'])
+        if 'sku' in data or 'sku' in (data.get('inventoryItem') or {}):
+            variant['sku'] = data['sku'] if 'sku' in data else data['inventoryItem']['sku']
+        if 'tracked' in (data.get('inventoryItem') or {}):
+            self.inventory_items[variant['inventory_item_id']]['tracked'] = data['inventoryItem']['tracked']
+        if data.get('optionValues'):
+            variant['selectedOptions'] = [{'name': value.get('optionName'), 'value': value['name']} for value in data['optionValues']]
+            variant['title'] = ' / '.join(option['value'] for option in variant['selectedOptions'])
+            for option in variant['selectedOptions']:
+                if not (product_option := next((o for o in product['options'] if o['name'] == option['name']), None)):
+                    product_option = {'name': option['name'], 'values': []}
+                    product['options'].append(product_option)
+                if option['value'] not in product_option['values']:
+                    product_option['values'].append(option['value'])
+        if data.get('mediaId'):
+            variant['media_ids'] = [data['mediaId']]
+        variant['updatedAt'] = product['updatedAt'] = timestamp()
+
+    def delete_variant(self, variant_id):
+        variant = self.variants.pop(variant_id)
+        self.inventory_items.pop(variant['inventory_item_id'], None)
+        for metafield_id in [i for i, metafield in self.metafields.items() if metafield['owner_id'] == variant_id]:
+            self.delete_metafield(metafield_id)
+
+    def product_variants_bulk_update(self, a):
+        if not (product := self.products.get(a['productId'])):
+            return {'product': None, 'productVariants': None, 'userErrors': [user_error(['productId'], 'Product does not exist')]}
+        errors = [user_error(['variants', str(i), 'id'], 'Product variant does not exist', 'PRODUCT_VARIANT_DOES_NOT_EXIST')
+                  for i, data in enumerate(a['variants']) if data.get('id') not in product['variant_ids']]
+        if errors:
+            return {'product': self.product_view(product), 'productVariants': None, 'userErrors': errors}
+        for data in a['variants']:
+            self.update_variant(self.variants[data['id']], data)
+        return {'product': self.product_view(product), 'productVariants': [self.variant_view(self.variants[data['id']]) for data in a['variants']],
+                'userErrors': []}
+
+    def product_variants_bulk_create(self, a):
+        if not (product := self.products.get(a['productId'])):
+            return {'product': None, 'productVariants': None, 'userErrors': [user_error(['productId'], 'Product does not exist')]}
+        standalone = [variant_id for variant_id in product['variant_ids'] if self.variants[variant_id]['title'] == 'Default Title']
+        variants = [self.create_variant(product, data) for data in a['variants']]
+        if a.get('strategy') == 'REMOVE_STANDALONE_VARIANT' and standalone:
+            for variant_id in standalone:
+                product['variant_ids'].remove(variant_id)
+                self.delete_variant(variant_id)
+            product['options'] = [option for option in product['options'] if option['name'] != 'Title']
+        return {'product': self.product_view(product), 'productVariants': [self.variant_view(variant) for variant in variants], 'userErrors': []}
+
+    def product_variants_bulk_delete(self, a):
+        if not (product := self.products.get(a['productId'])):
+            return {'product': None, 'userErrors': [user_error(['productId'], 'Product does not exist')]}
+        for variant_id in a['variantsIds']:
+            if variant_id in product['variant_ids']:
+                product['variant_ids'].remove(variant_id)
+                self.delete_variant(variant_id)
+        return {'product': self.product_view(product), 'userErrors': []}
+
+    def inventory_set_quantities(self, a):
+        data = a['input']
+        name = data.get('name', 'available')
+        changes, errors = [], []
+        for i, quantity in enumerate(data['quantities']):
+            if not (item := self.inventory_items.get(quantity['inventoryItemId'])):
+                errors.append(user_error(['input', 'quantities', str(i), 'inventoryItemId'], 'The specified inventory item could not be found.', 'INVALID_INVENTORY_ITEM'))
+            elif not (level := item['levels'].get(quantity['locationId'])):
+                errors.append(user_error(['input', 'quantities', str(i), 'locationId'], 'The specified inventory item is not stocked at the location.',
+                                         'ITEM_NOT_STOCKED_AT_LOCATION'))
+            elif not data.get('ignoreCompareQuantity') and quantity.get('compareQuantity') not in (None, level[name]):
+                errors.append(user_error(['input', 'quantities', str(i), 'compareQuantity'], 'The compareQuantity value does not match persisted value.',
+                                         'COMPARE_QUANTITY_STALE'))
+            elif delta := quantity['quantity'] - level[name]:
+                changes.append((item, quantity['locationId'], level, delta))
+        if errors:
+            return {'inventoryAdjustmentGroup': None, 'userErrors': errors}
+        for item, location_id, level, delta in changes:
+            level[name] += delta
+            if name == 'available':
+                level['on_hand'] += delta
+            item['updatedAt'] = timestamp()
+        group = {
+            'id': self.new_id('InventoryAdjustmentGroup'),
+            'reason': data.get('reason'),
+            'referenceDocumentUri': data.get('referenceDocumentUri'),
+            'createdAt': timestamp(),
+            'changes': [{'name': name, 'delta': delta, 'quantityAfterChange': level[name],
+                         'item': self.inventory_item_view(item), 'location': self.location_view(self.locations[location_id])}
+                        for item, location_id, level, delta in changes],
+        } if changes else None
+        return {'inventoryAdjustmentGroup': group, 'userErrors': []}
+
+    def inventory_activate(self, a):
+        if not (item := self.inventory_items.get(a['inventoryItemId'])) or a['locationId'] not in self.locations:
+            return {'inventoryLevel': None, 'userErrors': [user_error(['inventoryItemId'], 'Inventory item or location not found')]}
+        level = item['levels'].setdefault(a['locationId'], {'available': 0, 'on_hand': 0})
+        if a.get('available') is not None:
+            level['available'] = level['on_hand'] = a['available']
+        return {'inventoryLevel': self.inventory_level_view(item, a['locationId']), 'userErrors': []}
+
+    def inventory_bulk_toggle_activation(self, a):
+        if not (item := self.inventory_items.get(a['inventoryItemId'])):
+            return {'inventoryItem': None, 'inventoryLevels': None,
+                    'userErrors': [user_error(['inventoryItemId'], 'The specified inventory item could not be found.', 'INVENTORY_ITEM_NOT_FOUND')]}
+        if errors := [user_error(['inventoryItemUpdates', str(i), 'locationId'], 'The specified location could not be found.', 'LOCATION_NOT_FOUND')
+                      for i, update in enumerate(a['inventoryItemUpdates']) if update['locationId'] not in self.locations]:
+            return {'inventoryItem': None, 'inventoryLevels': None, 'userErrors': errors}
+        for update in a['inventoryItemUpdates']:
+            if update['activate']:
+                item['levels'].setdefault(update['locationId'], {'available': 0, 'on_hand': 0})
+            else:
+                item['levels'].pop(update['locationId'], None)
+        return {'inventoryItem': self.inventory_item_view(item),
+                'inventoryLevels': [self.inventory_level_view(item, update['locationId']) for update in a['inventoryItemUpdates'] if update['activate']],
+                'userErrors': []}
+
+    def inventory_item_update(self, a):
+        if not (item := self.inventory_items.get(a['id'])):
+            return {'inventoryItem': None, 'userErrors': [user_error(['id'], 'Inventory item does not exist')]}
+        data = a.get('input') or {}
+        if 'tracked' in data:
+            item['tracked'] = data['tracked'] in (True, 'true')
+        if 'sku' in data:
+            self.variants[item['variant_id']]['sku'] = data['sku']
+        item['updatedAt'] = timestamp()
+        return {'inventoryItem': self.inventory_item_view(item), 'userErrors': []}
+
+    """ media and files """
+    def unique_filename(self, filename):
+        filenames = {media['filename'] for media in self.media.values()}
+        if filename not in filenames:
+            return filename
+        stem, dot, extension = filename.rpartition('.')
+        return f'{stem or extension}_{uuid.uuid4()}{dot}{extension if stem else ""}'
+
+    def staged_upload(self, source):
+        prefix = f'{self.base_url}/staged-uploads/'
+        return self.staged_uploads.get(source[len(prefix):]) if source.startswith(prefix) else None
+
+    def create_media(self, source, alt=None, content_type='IMAGE', filename=None):
+        upload = self.staged_upload(source)
+        filename = self.unique_filename(filename or (upload or {}).get('filename') or source.split('?', 1)[0].rsplit('/', 1)[-1])
+        media_id = self.new_id('MediaImage' if content_type == 'IMAGE' else 'GenericFile')
+        media = self.media[media_id] = {
+            '__typename': 'MediaImage' if content_type == 'IMAGE' else 'GenericFile',
+            'id': media_id, 'number': gid_number(media_id), 'alt': alt or '', 'filename': filename,
+            'url': f'{self.base_url}/cdn/shop/files/{filename}?v={int(time.time())}', 'source': source,
+            'file_size': len(upload['content']) if upload and upload['content'] is not None else None,
+            'mime_type': (upload or {}).get('mime_type') or 'image/jpeg',
+            'failed': source.startswith(f'{self.base_url}/staged-uploads/') and (not upload or upload['content'] is None),
+            'ready_at': time.monotonic() + self.media_processing_seconds,
+            'createdAt': timestamp(), 'updatedAt': timestamp(),
+        }
+        return media
+
+    def media_content(self, filename):
+        with self.lock:
+            for media in self.media.values():
+                if media['filename'] == filename and (upload := self.staged_upload(media['source'])):
+                    return upload['content']
+        return None
+
+    def attach_media(self, product, media):
+        if media['id'] not in product['media_ids']:
+            product['media_ids'].append(media['id'])
+            product['updatedAt'] = timestamp()
+
+    def product_create_media(self, a):
+        if not (product := self.products.get(a['productId'])):
+            return {'media': None, 'mediaUserErrors': [], 'userErrors': [user_error(['productId'], 'Product does not exist')], 'product': None}
+        medias = []
+        for data in a['media']:
+            media = self.create_media(data['originalSource'], data.get('alt'))
+            self.attach_media(product, media)
+            medias.append(media)
+        return {'media': [self.media_view(media) for media in medias], 'mediaUserErrors': [], 'userErrors': [], 'product': self.product_view(product)}
+
+    def product_delete_media(self, a):
+        if not (product := self.products.get(a['productId'])):
+            return {'deletedMediaIds': None, 'deletedProductImageIds': None, 'mediaUserErrors': [],
+                    'userErrors': [user_error(['productId'], 'Product does not exist')], 'product': None}
+        deleted = [media_id for media_id in a['mediaIds'] if media_id in product['media_ids']]
+        for media_id in deleted:
+            self.delete_media(media_id)
+        return {'deletedMediaIds': deleted, 'deletedProductImageIds': [], 'mediaUserErrors': [], 'userErrors': [],
+                'product': self.product_view(product)}
+
+    def delete_media(self, media_id):
+        self.media.pop(media_id, None)
+        for entity in itertools.chain(self.products.values(), self.variants.values()):
+            if media_id in entity['media_ids']:
+                entity['media_ids'].remove(media_id)
+
+    def product_variant_append_media(self, a):
+        if not (product := self.products.get(a['productId'])):
+            return {'product': None, 'productVariants': None, 'userErrors': [user_error(['productId'], 'Product does not exist')]}
+        errors = []
+        for i, variant_media in enumerate(a['variantMedia']):
+            if variant_media['variantId'] not in product['variant_ids']:
+                errors.append(user_error(['variantMedia', str(i), 'variantId'], 'Variant does not exist on the product', 'PRODUCT_VARIANT_DOES_NOT_EXIST_ON_PRODUCT'))
+            for media_id in variant_media['mediaIds']:
+                if media_id not in product['media_ids']:
+                    errors.append(user_error(['variantMedia', str(i), 'mediaIds'], 'Media does not exist on the product', 'MEDIA_DOES_NOT_EXIST_ON_PRODUCT'))
+                elif self.media_status(self.media[media_id]) != 'READY':
+                    errors.append(user_error(['variantMedia', str(i), 'mediaIds'], 'Non-ready media cannot be attached to variants.', 'NON_READY_MEDIA'))
+        if errors:
+            return {'product': self.product_view(product), 'productVariants': None, 'userErrors': errors}
+        for variant_media in a['variantMedia']:
+            variant = self.variants[variant_media['variantId']]
+            variant['media_ids'] = [media_id for media_id in variant['media_ids'] if media_id not in variant_media['mediaIds']] + variant_media['mediaIds']
+        return {'product': self.product_view(product), 'userErrors': [],
+                'productVariants': [self.variant_view(self.variants[variant_media['variantId']]) for variant_media in a['variantMedia']]}
+
+    def product_variant_detach_media(self, a):
+        if not (product := self.products.get(a['productId'])):
+            return {'product': None, 'productVariants': None, 'userErrors': [user_error(['productId'], 'Product does not exist')]}
+        for variant_media in a['variantMedia']:
+            if variant := self.variants.get(variant_media['variantId']):
+                variant['media_ids'] = [media_id for media_id in variant['media_ids'] if media_id not in variant_media['mediaIds']]
+        return {'product': self.product_view(product), 'userErrors': [],
+                'productVariants': [self.variant_view(self.variants.get(variant_media['variantId'])) for variant_media in a['variantMedia']]}
+
+    def staged_uploads_create(self, a):
+        targets = []
+        for data in a['input']:
+            key = f"tmp/{uuid.uuid4()}/{data['filename'].rsplit('/', 1)[-1]}"
+            self.staged_uploads[key] = {'filename': key.rsplit('/', 1)[-1], 'mime_type': data.get('mimeType'), 'resource': data.get('resource'), 'content': None}
+            targets.append({'url': f'{self.base_url}/staged-uploads', 'resourceUrl': f'{self.base_url}/staged-uploads/{key}',
+                            'parameters': [{'name': 'key', 'value': key}, {'name': 'Content-Type', 'value': data.get('mimeType') or ''}]})
+        return {'stagedTargets': targets, 'userErrors': []}
+
+    def receive_upload(self, key, content):
+        with self.lock:
+            if key not in self.staged_uploads:
+                return False
+            self.staged_uploads[key]['content'] = content
+            return True
+
+    def file_create(self, a):
+        medias = [self.create_media(data['originalSource'], data.get('alt'), data.get('contentType', 'IMAGE'), data.get('filename'))
+                  for data in a['files']]
+        return {'files': [self.media_view(media) for media in medias], 'userErrors': []}
+
+    def file_update(self, a):
+        errors = [user_error(['files', str(i), 'id'], 'File does not exist', 'FILE_DOES_NOT_EXIST')
+                  for i, data in enumerate(a['files']) if data['id'] not in self.media]
+        if errors:
+            return {'files': None, 'userErrors': errors}
+        for data in a['files']:
+            media = self.media[data['id']]
+            if 'alt' in data:
+                media['alt'] = data['alt']
+            if data.get('originalSource'):
+                replacement = self.create_media(data['originalSource'])
+                self.media.pop(replacement['id'])
+                media.update({key: replacement[key] for key in ('source', 'file_size', 'failed', 'ready_at', 'mime_type')},
+                             url=f"{self.base_url}/cdn/shop/files/{media['filename']}?v={int(time.time())}")
+            for product_id in data.get('referencesToAdd') or []:
+                if product := self.products.get(product_id):
+                    self.attach_media(product, media)
+            for product_id in data.get('referencesToRemove') or []:
+                if (product := self.products.get(product_id)) and media['id'] in product['media_ids']:
+                    product['media_ids'].remove(media['id'])
+            media['updatedAt'] = timestamp()
+        return {'files': [self.media_view(self.media[data['id']]) for data in a['files']], 'userErrors': []}
+
+    def file_delete(self, a):
+        deleted = [file_id for file_id in a['fileIds'] if file_id in self.media]
+        for file_id in deleted:
+            self.delete_media(file_id)
+        return {'deletedFileIds': deleted, 'userErrors': []}
+
+    """ metafields """
+    def set_owner_metafields(self, owner_id, metafields, field_prefix=('input', 'metafields')):
+        errors = []
+        definitions = {(d['namespace'], d['key']): d for d in self.metafield_definitions.values()}
+        for i, data in enumerate(metafields):
+            namespace = data.get('namespace') or '$app'
+            if not (type_name := data.get('type') or (definitions.get((namespace, data['key'])) or {}).get('type', {}).get('name')):
+                errors.append(user_error(list(field_prefix) + [str(i), 'type'], "Type can't be blank", 'BLANK'))
+            if data.get('value') is None:
+                errors.append(user_error(list(field_prefix) + [str(i), 'value'], "Value can't be blank", 'BLANK'))
+        if errors:
+            return errors
+        for data in metafields:
+            namespace = data.get('namespace') or '$app'
+            type_name = data.get('type') or definitions[(namespace, data['key'])]['type']['name']
+            key = (owner_id, namespace, data['key'])
+            if (metafield_id := self.metafield_ids.get(key)) is None:
+                metafield_id = self.metafield_ids[key] = self.new_id('Metafield')
+                self.metafields[metafield_id] = {'id': metafield_id, 'owner_id': owner_id, 'namespace': namespace, 'key': data['key'],
+                                                 'createdAt': timestamp()}
+            self.metafields[metafield_id].update(value=data['value'], type=type_name, updatedAt=timestamp())
+        return []
+
+    def metafields_set(self, a):
+        metafields = a['metafields']
+        if len(metafields) > 25:
+            return {'metafields': None, 'userErrors': [user_error(['metafields'], 'Exceeded the maximum metafields input limit of 25.', 'LESS_THAN_OR_EQUAL_TO')]}
+        if errors := [user_error(['metafields', str(i), 'ownerId'], 'Owner does not exist.', 'INVALID_VALUE')
+                      for i, data in enumerate(metafields) if self.node(data['ownerId']) is None]:
+            return {'metafields': None, 'userErrors': errors}
+        for i, data in enumerate(metafields):
+            if errors := self.set_owner_metafields(data['ownerId'], [data], ('metafields', str(i))):
+                return {'metafields': None, 'userErrors': errors}
+        return {'metafields': [self.metafield_view(self.metafields[self.metafield_ids[(data['ownerId'], data.get('namespace') or '$app', data['key'])]])
+                               for data in metafields], 'userErrors': []}
+
+    def delete_metafield(self, metafield_id):
+        metafield = self.metafields.pop(metafield_id)
+        self.metafield_ids.pop((metafield['owner_id'], metafield['namespace'], metafield['key']), None)
+
+    def metafields_delete(self, a):
+        deleted = []
+        for data in a['metafields']:
+            if (metafield_id := self.metafield_ids.get((data['ownerId'], data['namespace'], data['key']))) is not None:
+                self.delete_metafield(metafield_id)
+                deleted.append({'ownerId': data['ownerId'], 'namespace': data['namespace'], 'key': data['key']})
+            else:
+                deleted.append(None)
+        return {'deletedMetafields': deleted, 'userErrors': []}
+
+    """ bulk operations """
+    def running_bulk_operation(self, operation_type):
+        for operation in self.bulk_operations.values():
+            if operation['type'] == operation_type and self.bulk_operation_view(operation)['status'] == 'RUNNING':
+                return operation
+        return None
+
+    def new_bulk_operation(self, operation_type, query, lines, root_object_count):
+        operation_id = self.new_id('BulkOperation')
+        result_name = f'{gid_number(operation_id)}.jsonl'
+        self.bulk_results[result_name] = ''.join(json.dumps(line, ensure_ascii=False) + '\n' for line in lines).encode('utf-8')
+        operation = self.bulk_operations[operation_id] = {
+            'id': operation_id, 'type': operation_type, 'query': query, 'status': 'RUNNING', 'createdAt': timestamp(),
+            'started': time.monotonic(), 'ready_at': time.monotonic() + self.bulk_operation_seconds,
+            'object_count': len(lines), 'root_object_count': root_object_count, 'result_name': result_name,
+        }
+        return {'bulkOperation': self.bulk_operation_view(operation), 'userErrors': []}
+
+    @staticmethod
+    def bulk_query_lines(data):
+        """
+        the JSONL lines of a bulk query result: every node of a connection on its own line, children after their
+        parent with __parentId.
+        """
+        def connection_nodes(value):
+            return [edge['node'] for edge in value['edges']] if 'edges' in value else value['nodes']
+
+        def is_connection(value):
+            return isinstance(value, dict) and ('edges' in value or 'nodes' in value)
+
+        lines = []
+
+        def emit(node, parent_id):
+            line = {key: value for key, value in node.items() if not is_connection(value)}
+            if parent_id:
+                line['__parentId'] = parent_id
+            lines.append(line)
+            for value in node.values():
+                if is_connection(value):
+                    for child in connection_nodes(value):
+                        emit(child, node.get('id'))
+
+        (root,) = data.values()
+        roots = connection_nodes(root)
+        for node in roots:
+            emit(node, None)
+        return lines, len(roots)
+
+    def bulk_operation_run_query(self, a):
+        if self.running_bulk_operation('QUERY'):
+            return {'bulkOperation': None, 'userErrors': [user_error(None, 'A bulk query operation for this app and shop is already in progress.', 'OPERATION_IN_PROGRESS')]}
+        try:
+            document = parse(a['query'])
+            if len(document['operations'][0]['selections']) != 1:
+                raise GraphQLError('Bulk queries must contain exactly one top-level field.')
+            self.bulk = True
+            data = Executor(document, interfaces=self.interfaces).execute(self.query_root(), {})
+            lines, root_object_count = self.bulk_query_lines(data)
+        except (GraphQLError, KeyError, ValueError) as e:
+            return {'bulkOperation': None, 'userErrors': [user_error(['query'], f'Invalid bulk query: {e}', 'INVALID')]}
+        finally:
+            self.bulk = False
+        return self.new_bulk_operation('QUERY', a['query'], lines, root_object_count)
+
+    def bulk_operation_run_mutation(self, a):
+        if self.running_bulk_operation('MUTATION'):
+            return {'bulkOperation': None, 'userErrors': [user_error(None, 'A bulk mutation operation for this app and shop is already in progress.', 'OPERATION_IN_PROGRESS')]}
+        if not (upload := self.staged_uploads.get(a['stagedUploadPath'])) or upload['content'] is None:
+            return {'bulkOperation': None, 'userErrors': [user_error(['stagedUploadPath'], 'The JSONL file could not be found.', 'NO_SUCH_FILE')]}
+        try:
+            document = parse(a['mutation'])
+        except GraphQLError as e:
+            return {'bulkOperation': None, 'userErrors': [user_error(['mutation'], str(e), 'INVALID_MUTATION')]}
+        lines = []
+        for line_number, line in enumerate(upload['content'].decode('utf-8').splitlines()):
+            if not line.strip():
+                continue
+            try:
+                lines.append({'data': Executor(document, json.loads(line), interfaces=self.interfaces).execute({}, self.mutation_root()),
+                              '__lineNumber': line_number})
+            except (GraphQLError, KeyError, ValueError) as e:
+                lines.append({'errors': [{'message': str(e)}], '__lineNumber': line_number})
+        return self.new_bulk_operation('MUTATION', a['mutation'], lines, len(lines))
+
+    def bulk_operation_cancel(self, a):
+        if not (operation := self.bulk_operations.get(a['id'])):
+            return {'bulkOperation': None, 'userErrors': [user_error(['id'], 'Bulk operation does not exist')]}
+        if self.bulk_operation_view(operation)['status'] == 'RUNNING':
+            operation['status'] = 'CANCELED'
+        return {'bulkOperation': self.bulk_operation_view(operation), 'userErrors': []}
@@ -2,8 +2,6 @@ import io
 import os
 import re
 import shlex
-from googleapiclient.http import MediaIoBaseDownload
-from PIL import Image
 
 class GoogleDriveApiInterface:
     '''
@@ -41,6 +39,7 @@ class GoogleDriveApiInterface:
         return local_path
 
     def download_file_from_drive(self, file_id, destination_path):
+        from googleapiclient.http import MediaIoBaseDownload
         request = self.drive_service.files().get_media(fileId=file_id)
         fh = io.FileIO(destination_path, 'wb')
         downloader = MediaIoBaseDownload(fh, request)
@@ -50,6 +49,7 @@ class GoogleDriveApiInterface:
             self.logger.debug(f"Download {int(status.progress() * 100)}%.")
 
     def resize_image_to_limit(self, image_path, output_path, max_megapixels=20):
+        from PIL import Image
         with Image.open(image_path) as img:
             current_megapixels = (img.width * img.height) / 1_000_000
             if current_megapixels > max_megapixels:
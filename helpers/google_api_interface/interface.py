@@ -1,17 +1,38 @@
+import functools
 import logging
-import gspread
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 from helpers.google_api_interface.drive import GoogleDriveApiInterface
 from helpers.google_api_interface.sheets import GoogleSheetsApiInterface
 
 class GoogleApiInterface(GoogleDriveApiInterface, GoogleSheetsApiInterface):
+    """
+    the credentials and services are built on first use, so scripts that never touch Google skip the imports,
+    the credential file and the discovery documents.
+    """
     def __init__(self, google_credential_path, sheet_id=None):
         self.google_credential_path = google_credential_path
         self.scopes = ['https://www.googleapis.com/auth/drive', 'https://www.googleapis.com/auth/spreadsheets']
-        self.credentials = Credentials.from_service_account_file(self.google_credential_path, scopes=self.scopes)
-        self.drive_service = build('drive', 'v3', credentials=self.credentials)
-        self.sheets_service = build('sheets', 'v4', credentials=self.credentials)
-        self.gspread_client = gspread.authorize(self.credentials)
         self.sheet_id = sheet_id
         self.logger = logging.getLogger(__name__)
+
+    @functools.cached_property
+    def credentials(self):
+        from google.oauth2.service_account import Credentials
+        return Credentials.from_service_account_file(self.google_credential_path, scopes=self.scopes)
+
+    def build_service(self, name, version):
+        # static_discovery reads the discovery document shipped with googleapiclient instead of fetching it
+        from googleapiclient.discovery import build
+        return build(name, version, credentials=self.credentials, static_discovery=True, cache_discovery=False)
+
+    @functools.cached_property
+    def drive_service(self):
+        return self.build_service('drive', 'v3')
+
+    @functools.cached_property
+    def sheets_service(self):
+        return self.build_service('sheets', 'v4')
+
+    @functools.cached_property
+    def gspread_client(self):
+        import gspread
+        return gspread.authorize(self.credentials)
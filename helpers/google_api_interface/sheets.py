@@ -1,5 +1,4 @@
 import datetime
-import gspread
 
 class GoogleSheetsApiInterface:
     def to_products_list(self, sheet_id, sheet_title, start_row, product_attr_column_map,
@@ -63,7 +62,6 @@ class GoogleSheetsApiInterface:
 
     def get_richtext_link(self, spreadsheet_id, sheet_title, row, column):
         # Use the Google Sheets API directly for rich text data
-        from googleapiclient.discovery import build
         import string
         range_notation = f'{sheet_title}!{string.ascii_uppercase[column]}{row}'
         response = self.sheets_service.spreadsheets().get(
@@ -89,9 +87,10 @@ class GoogleSheetsApiInterface:
                                     .replace('?dmr=1&ec=wgc-drive-globalnav-goto', ''))
 
     def worksheet_rows(self, sheet_id, sheet_title):
+        from gspread.utils import ValueRenderOption
         sheet_index = self.get_sheet_index_by_title(sheet_id, sheet_title)
         worksheet = self.gspread_client.open_by_key(sheet_id).get_worksheet(sheet_index)
-        return worksheet.get_all_values(value_render_option=gspread.utils.ValueRenderOption.unformatted)
+        return worksheet.get_all_values(value_render_option=ValueRenderOption.unformatted)
 
     def get_variants_level_info(self, product_info, key='sku'):
         if key in product_info:
@@ -0,0 +1,133 @@
+"""
+OCR of product images, to find the detail images still in Korean and the model info images before they are uploaded.
+
+Each image is trimmed of its plain margins, scaled down to max_width and read in one Tesseract pass of all the
+languages, the images in a process pool. Texts are cached by the sha256 of the image file with the OCR settings,
+so a folder is only read once however often it is scanned, and renamed or copied images are not read again.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+default_cache_path = os.getenv('OCR_CACHE_PATH', os.path.expanduser('~/.cache/shopify_product_management/ocr.json'))
+default_lang = 'kor+eng'
+default_max_width = 1200
+korean_pattern = re.compile(r'[\uac00-\ud7a3]')
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def prepared_image(path, max_width=default_max_width):
+    """
+    the image in grayscale, cropped to what differs from its top left pixel and scaled down to max_width.
+    """
+    from PIL import Image, ImageChops
+    with Image.open(path) as img:
+        img.seek(0)
+        gray = img.convert('L')
+    if bbox := ImageChops.difference(gray, Image.new('L', gray.size, gray.getpixel((0, 0)))).getbbox():
+        gray = gray.crop(bbox)
+    if gray.width > max_width:
+        gray = gray.resize((max_width, max(1, round(gray.height * max_width / gray.width))), Image.LANCZOS)
+    return gray
+
+
+def ocr_text(path, lang=default_lang, max_width=default_max_width):
+    """
+    the text of the image, None when it can not be opened.
+    """
+    import pytesseract
+    from PIL import UnidentifiedImageError
+    try:
+        img = prepared_image(path, max_width)
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning(f'can not read {path}: {e}')
+        return None
+    return pytesseract.image_to_string(img, lang=lang)
+
+
+def classify(text):
+    """
+    'model_info', 'korean' or None.
+    """
+    if text is None:
+        return None
+    if 'model info' in text.lower():
+        return 'model_info'
+    if korean_pattern.search(text):
+        return 'korean'
+    return None
+
+
+def read_cache(cache_path):
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_cache(cache_path, cache):
+    """
+    written to a temporary file first, so an interrupted scan does not lose the texts of the previous ones.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(cache_path)), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def scan_images(paths, cache_path=default_cache_path, lang=default_lang, max_width=default_max_width, max_workers=None, ocr=ocr_text):
+    """
+    the OCR of every image, in the order of paths: [{'path', 'sha256', 'text', 'label'}], label as classify.
+    images not in the cache are read in a process pool, those that could not be read have text None and are not cached.
+    cache_path None disables the cache.
+    ocr(path, lang, max_width) reads one image, it has to be importable by the workers.
+    """
+    paths = list(paths)
+    cache = read_cache(cache_path) if cache_path else {}
+    keys = [f'{file_sha256(path)}:{lang}:{max_width}' for path in paths]
+    missing = {}
+    for path, key in zip(paths, keys):
+        if key not in cache:
+            missing.setdefault(key, path)
+    logger.info(f'{len(paths) - len(missing)} of {len(paths)} images found in the OCR cache')
+    if len(missing) <= 1:
+        texts = [ocr(path, lang, max_width) for path in missing.values()]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            texts = list(executor.map(ocr, missing.values(), [lang] * len(missing), [max_width] * len(missing)))
+    read = dict(zip(missing, texts))
+    cache.update((key, text) for key, text in read.items() if text is not None)
+    if missing and cache_path:
+        write_cache(cache_path, cache)
+    texts = [cache.get(key, read.get(key)) for key in keys]
+    return [{'path': path, 'sha256': key.split(':', 1)[0], 'text': text, 'label': classify(text)}
+            for path, key, text in zip(paths, keys, texts)]
+
+
+def ocr_image_filter(exclude=('korean', 'model_info'), **scan_kwargs):
+    """
+    a function of local paths returning those whose label is not in exclude, for
+    upload_and_assign_description_images_to_shopify's image_filter. scan_kwargs are passed to scan_images.
+    """
+    def image_filter(local_paths):
+        results = scan_images(local_paths, **scan_kwargs)
+        for res in results:
+            if res['label'] in exclude:
+                logger.info(f"skipping {res['path']}: {res['label']}")
+        return [res['path'] for res in results if res['label'] not in exclude]
+    return image_filter
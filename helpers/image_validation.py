@@ -0,0 +1,136 @@
+"""
+Local checks of images before they are staged to Shopify, which otherwise only reports a bad image as FAILED media
+after minutes of polling. What can be fixed is converted into a copy (CMYK to sRGB, PSD to JPEG, alpha flattened,
+oversized images scaled down) uploaded in place of the original, which is never modified. The rest is rejected up
+front with one report for the whole batch.
+"""
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+default_limits = {
+    'formats': ('JPEG', 'PNG', 'WEBP', 'GIF'),
+    'max_megapixels': 20,
+    'max_side': 4472,
+    'max_file_size': 20 * 1024 * 1024,
+    'max_frames': None,
+}
+jpeg_quality = 85
+
+
+def to_srgb(img):
+    from PIL import ImageCms
+    if img.mode == 'CMYK' and (icc_profile := img.info.get('icc_profile')):
+        try:
+            return ImageCms.profileToProfile(img, ImageCms.ImageCmsProfile(io.BytesIO(icc_profile)), ImageCms.createProfile('sRGB'), outputMode='RGB')
+        except (ImageCms.PyCMSError, OSError) as e:
+            logger.warning(f'falling back to a plain CMYK conversion: {e}')
+    return img.convert('RGB') if img.mode in ('CMYK', 'I;16', 'I', 'F', 'YCbCr', 'LAB', 'HSV') else img
+
+
+def flatten_alpha(img, background=(255, 255, 255)):
+    from PIL import Image
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        flattened = Image.new('RGB', img.size, background)
+        flattened.paste(img, mask=img.getchannel('A'))
+        return flattened
+    return img.convert('RGB') if img.mode != 'RGB' else img
+
+
+def validate_image(path, fix=True, limits=None, output_dir=None):
+    """
+    check one image against limits and, when fix is set, convert what can be converted into a copy of the same name
+    in a new directory under output_dir, the system temporary directory by default. path itself is left as it is.
+    returns a report: {'path', 'output_path', 'format', 'mode', 'size', 'frames', 'file_size', 'fixes', 'errors'}
+    """
+    from PIL import Image, UnidentifiedImageError
+    limits = dict(default_limits, **(limits or {}))
+    report = {'path': path, 'output_path': path, 'format': None, 'mode': None, 'size': None, 'frames': 1,
+              'file_size': os.path.getsize(path), 'fixes': [], 'errors': []}
+    try:
+        img = Image.open(path)
+    except (UnidentifiedImageError, OSError) as e:
+        report['errors'].append(f'not a readable image: {e}')
+        return report
+    except Image.DecompressionBombError as e:
+        report['errors'].append(str(e))
+        return report
+    with img:
+        report.update(format=img.format, mode=img.mode, size=img.size, frames=getattr(img, 'n_frames', 1))
+        animated = report['frames'] > 1
+        megapixels = img.width * img.height / 1_000_000
+        scale = min(1, (limits['max_megapixels'] / megapixels) ** .5, limits['max_side'] / max(img.size))
+        convert_format = img.format not in limits['formats']
+        needs_rgb = img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P')
+
+        if limits['max_frames'] and report['frames'] > limits['max_frames']:
+            report['errors'].append(f"{report['frames']} frames, more than {limits['max_frames']}")
+        if animated and (scale < 1 or convert_format or report['file_size'] > limits['max_file_size']):
+            report['errors'].append(f"animated {img.format} of {img.size[0]}x{img.size[1]}, {report['file_size']} bytes can not be converted")
+        if report['errors'] or not (scale < 1 or convert_format or needs_rgb or report['file_size'] > limits['max_file_size']):
+            return report
+        if not fix:
+            report['errors'].append('needs conversion: ' + ', '.join(problem for problem, found in [
+                (f'format {img.format}', convert_format), (f'mode {img.mode}', needs_rgb),
+                (f'{megapixels:.1f} megapixels', scale < 1), (f"{report['file_size']} bytes", report['file_size'] > limits['max_file_size'])] if found))
+            return report
+
+        img.load()
+        converted = to_srgb(img)
+        if converted is not img:
+            report['fixes'].append(f'{img.mode} to sRGB')
+        if scale < 1:
+            converted = converted.resize((int(img.width * scale), int(img.height * scale)), Image.LANCZOS)
+            report['fixes'].append(f'scaled to {converted.width}x{converted.height}')
+        save_format = 'JPEG' if convert_format else img.format
+        if save_format == 'JPEG' and converted.mode not in ('RGB', 'L'):
+            converted = flatten_alpha(converted)
+            report['fixes'].append('alpha flattened')
+        file_name = os.path.basename(path)
+        output_path = os.path.join(tempfile.mkdtemp(dir=output_dir, prefix='converted-'),
+                                   file_name if save_format == img.format else f"{file_name.rsplit('.', 1)[0]}.jpg")
+        if save_format != img.format:
+            report['fixes'].append(f'{img.format} to JPEG')
+
+    converted.save(output_path, format=save_format, **({'quality': jpeg_quality} if save_format == 'JPEG' else {}))
+    report.update(output_path=output_path, file_size=os.path.getsize(output_path))
+    if report['file_size'] > limits['max_file_size']:
+        report['errors'].append(f"{report['file_size']} bytes after conversion, more than {limits['max_file_size']}")
+    return report
+
+
+def validate_images(paths, fix=True, limits=None, max_workers=None, output_dir=None):
+    """
+    validate_image over paths in a process pool, reports in the order of paths.
+    """
+    if len(paths) <= 1:
+        return [validate_image(path, fix, limits, output_dir) for path in paths]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(validate_image, paths, [fix] * len(paths), [limits] * len(paths), [output_dir] * len(paths)))
+
+
+def validation_report(reports):
+    lines = []
+    for report in reports:
+        if report['errors']:
+            lines.append(f"REJECTED {report['path']}: {'; '.join(report['errors'])}")
+        elif report['fixes']:
+            lines.append(f"converted {report['path']} -> {report['output_path']}: {', '.join(report['fixes'])}")
+    return '\n'.join(lines)
+
+
+def validated_image_paths(paths, fix=True, limits=None, max_workers=None, output_dir=None):
+    """
+    the paths to upload in place of paths, converted copies under output_dir. raises with one report of every rejected image if any.
+    """
+    reports = validate_images(list(paths), fix, limits, max_workers, output_dir)
+    if text := validation_report(reports):
+        logger.info(f'image validation:\n{text}')
+    if rejected := [report for report in reports if report['errors']]:
+        raise RuntimeError(f'{len(rejected)} of {len(reports)} images rejected before upload:\n{validation_report(rejected)}')
+    return [report['output_path'] for report in reports]
@@ -0,0 +1,250 @@
+import json
+import os
+import tempfile
+import time
+import requests
+
+
+class BulkOperations:
+    """
+    Bulk operations: exports and mass updates processed by Shopify in the background, exchanging JSONL files.
+    Inherited by the ShopifyGraphqlClient class.
+    """
+    product_update_mutation = """
+    mutation call($input: ProductInput!) {
+        productUpdate(input: $input) {
+            product {
+                id
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """
+
+    product_variants_bulk_update_mutation = """
+    mutation call($productId: ID!, $variants: [ProductVariantsBulkInput!]!) {
+        productVariantsBulkUpdate(productId: $productId, variants: $variants) {
+            productVariants {
+                id
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """
+
+    metafields_set_mutation = """
+    mutation call($metafields: [MetafieldsSetInput!]!) {
+        metafieldsSet(metafields: $metafields) {
+            metafields {
+                id
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """
+
+    def generate_staged_upload_target_for_bulk_mutation(self, file_name):
+        query = """
+        mutation stagedUploadsCreate($input: [StagedUploadInput!]!) {
+            stagedUploadsCreate(input: $input) {
+                stagedTargets {
+                    url
+                    resourceUrl
+                    parameters {
+                        name
+                        value
+                    }
+                }
+                userErrors {
+                    field
+                    message
+                }
+            }
+        }
+        """
+        variables = {
+            "input": [{
+                "resource": "BULK_MUTATION_VARIABLES",
+                "filename": file_name,
+                "mimeType": "text/jsonl",
+                "httpMethod": "POST",
+            }]
+        }
+        res = self.run_query(query, variables)
+        if errors := res['stagedUploadsCreate']['userErrors']:
+            raise RuntimeError(f"Failed to generate a staged upload target: {errors}")
+        return res['stagedUploadsCreate']['stagedTargets'][0]
+
+    def write_bulk_mutation_variables(self, variables_list, local_path):
+        count = 0
+        with open(local_path, 'w', encoding='utf-8') as f:
+            for variables in variables_list:
+                f.write(json.dumps(variables, ensure_ascii=False))
+                f.write('\n')
+                count += 1
+        return count
+
+    def upload_bulk_mutation_variables(self, target, local_path):
+        payload = {param['name']: param['value'] for param in target['parameters']}
+        with open(local_path, 'rb') as f:
+            response = requests.post(target['url'], data=payload, files={'file': (os.path.basename(local_path), f)})
+        if response.status_code not in (200, 201, 204):
+            self.logger.error(f'!!! upload failed !!!\n\n{local_path}:\n{target}\n\n{response.text}\n\n')
+            response.raise_for_status()
+        return payload['key']
+
+    def bulk_operation_run_mutation(self, mutation, staged_upload_path):
+        query = """
+        mutation bulkOperationRunMutation($mutation: String!, $stagedUploadPath: String!) {
+            bulkOperationRunMutation(mutation: $mutation, stagedUploadPath: $stagedUploadPath) {
+                bulkOperation {
+                    id
+                    status
+                }
+                userErrors {
+                    field
+                    message
+                }
+            }
+        }
+        """
+        variables = {
+            'mutation': mutation,
+            'stagedUploadPath': staged_upload_path
+        }
+        res = self.run_query(query, variables)
+        if errors := res['bulkOperationRunMutation']['userErrors']:
+            raise RuntimeError(f"Failed to run the bulk mutation: {errors}")
+        return res['bulkOperationRunMutation']['bulkOperation']
+
+    def bulk_operation_run_query(self, bulk_query):
+        query = """
+        mutation bulkOperationRunQuery($query: String!) {
+            bulkOperationRunQuery(query: $query) {
+                bulkOperation {
+                    id
+                    status
+                }
+                userErrors {
+                    field
+                    message
+                }
+            }
+        }
+        """
+        res = self.run_query(query, {'query': bulk_query})
+        if errors := res['bulkOperationRunQuery']['userErrors']:
+            raise RuntimeError(f"Failed to run the bulk query: {errors}")
+        return res['bulkOperationRunQuery']['bulkOperation']
+
+    def bulk_operation_by_id(self, bulk_operation_id):
+        query = """
+        query bulkOperation($id: ID!) {
+            node(id: $id) {
+                ... on BulkOperation {
+                    id
+                    status
+                    errorCode
+                    objectCount
+                    url
+                    partialDataUrl
+                }
+            }
+        }
+        """
+        res = self.run_query(query, {'id': bulk_operation_id}, refresh=True)
+        return res['node']
+
+    # CANCELING is followed by CANCELED, and the operation still holds the shop's bulk slot until then
+    pending_statuses = ('CREATED', 'RUNNING', 'CANCELING')
+
+    def wait_for_bulk_operation_completion(self, bulk_operation_id, timeout_minutes=60, poll_interval=2):
+        max_attempts = int((timeout_minutes * 60) / poll_interval)
+        for _ in range(max_attempts):
+            bulk_operation = self.bulk_operation_by_id(bulk_operation_id)
+            if bulk_operation['status'] not in self.pending_statuses:
+                self.logger.info(f"Bulk operation {bulk_operation_id} {bulk_operation['status']}, {bulk_operation['objectCount']} objects.")
+                return bulk_operation
+            self.logger.info(f"Bulk operation still running, {bulk_operation['objectCount']} objects so far. Waiting...")
+            time.sleep(poll_interval)
+        raise TimeoutError(f'Timeout reached while waiting for bulk operation {bulk_operation_id}')
+
+    def bulk_operation_result_lines(self, url):
+        with requests.get(url, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def run_bulk_query(self, bulk_query, timeout_minutes=60):
+        """
+        yields the exported objects one JSONL line at a time, nested connection nodes come as separate lines with __parentId.
+        """
+        bulk_operation = self.bulk_operation_run_query(bulk_query)
+        bulk_operation = self.wait_for_bulk_operation_completion(bulk_operation['id'], timeout_minutes)
+        if bulk_operation['status'] != 'COMPLETED':
+            raise RuntimeError(f"Bulk query did not complete: {bulk_operation}")
+        if bulk_operation['url']:       # no url when nothing matched
+            yield from self.bulk_operation_result_lines(bulk_operation['url'])
+
+    def run_bulk_mutation(self, mutation, variables_list, timeout_minutes=60):
+        """
+        variables_list: the variables of the mutation, one per object.
+
+        returns a per-row report in the order of variables_list:
+        [{'line_number': 0, 'variables': {...}, 'success': True, 'errors': [], 'data': {...}}]
+        """
+        variables_list = list(variables_list)
+        with tempfile.TemporaryDirectory() as tempdir:
+            local_path = os.path.join(tempdir, 'bulk_op_vars.jsonl')
+            count = self.write_bulk_mutation_variables(variables_list, local_path)
+            target = self.generate_staged_upload_target_for_bulk_mutation(os.path.basename(local_path))
+            staged_upload_path = self.upload_bulk_mutation_variables(target, local_path)
+        self.logger.info(f'staged {count} rows for the bulk mutation')
+
+        bulk_operation = self.bulk_operation_run_mutation(mutation, staged_upload_path)
+        bulk_operation = self.wait_for_bulk_operation_completion(bulk_operation['id'], timeout_minutes)
+        if not (url := bulk_operation['url'] or bulk_operation['partialDataUrl']):
+            raise RuntimeError(f"Bulk mutation finished without results: {bulk_operation}")
+
+        report = [{'line_number': i, 'variables': variables, 'success': False, 'errors': ['no result'], 'data': None}
+                  for i, variables in enumerate(variables_list)]
+        for line in self.bulk_operation_result_lines(url):
+            row = report[line['__lineNumber']]
+            data = line.get('data') or {}
+            errors = line.get('errors', []) + [error for res in data.values() if res for error in res.get('userErrors', [])]
+            row.update(success=not errors, errors=errors, data=data)
+        failed = [row for row in report if not row['success']]
+        self.logger.info(f'bulk mutation completed: {len(report) - len(failed)} succeeded, {len(failed)} failed')
+        return report
+
+    def bulk_update_products(self, product_inputs):
+        """
+        product_inputs shape:
+        [{'id': 'gid://shopify/Product/123', 'tags': ['new', '25 SPRING']},
+         {'id': 'gid://shopify/Product/456', 'descriptionHtml': '<p>...</p>'}]
+        """
+        return self.run_bulk_mutation(self.product_update_mutation,
+                                      ({'input': dict(product_input, id=self.sanitize_id(product_input['id']))} for product_input in product_inputs))
+
+    def bulk_update_product_variants(self, product_id_variants_map):
+        """
+        product_id_variants_map shape:
+        {'gid://shopify/Product/123': [{'id': 'gid://shopify/ProductVariant/1', 'price': 23100}]}
+        """
+        return self.run_bulk_mutation(self.product_variants_bulk_update_mutation,
+                                      ({'productId': self.sanitize_id(product_id), 'variants': variants}
+                                       for product_id, variants in product_id_variants_map.items()))
+
+    def bulk_set_metafields(self, metafields, chunk_size=25):
+        return self.run_bulk_mutation(self.metafields_set_mutation,
+                                      ({'metafields': metafields[i:i + chunk_size]} for i in range(0, len(metafields), chunk_size)))
@@ -1,26 +1,45 @@
+import atexit
+import json
 import logging
+import time
 import requests
+from helpers.shopify_graphql_client.bulk_operations import BulkOperations
 from helpers.shopify_graphql_client.collection_queries import CollectionQueries
+from helpers.shopify_graphql_client.file_queries import FileQueries
+from helpers.shopify_graphql_client.instrumentation import Instrumentation, instrumentation_from_environment, operation_name
 from helpers.shopify_graphql_client.inventory_management import InventoryManagement
-from helpers.shopify_graphql_client.media_management import MediaManagement
+from helpers.shopify_graphql_client.media_management import MediaManagement, VariantMediaCache
 from helpers.shopify_graphql_client.metafields_management import MetafieldsManagement
+from helpers.shopify_graphql_client.price_management import PriceManagement
 from helpers.shopify_graphql_client.product_attributes_management import ProductAttributesManagement
 from helpers.shopify_graphql_client.product_create import ProductCreate
 from helpers.shopify_graphql_client.product_queries import ProductQueries
 from helpers.shopify_graphql_client.product_variants_to_products import ProductVariantsToProducts
+from helpers.shopify_graphql_client.query_cache import QueryCache
+from helpers.shopify_graphql_client.tag_management import TagManagement
 
-class ShopifyGraphqlClient(CollectionQueries,
+class ShopifyGraphqlClient(BulkOperations,
+                           CollectionQueries,
+                           FileQueries,
                            InventoryManagement,
                            MediaManagement,
+                           PriceManagement,
                            ProductAttributesManagement,
                            ProductCreate,
                            ProductQueries,
-                           ProductVariantsToProducts,MetafieldsManagement):
+                           ProductVariantsToProducts,MetafieldsManagement,
+                           TagManagement):
+    max_throttle_retries = 5
+
     def __init__(self, shop_name, access_token):
         self.logger = logging.getLogger(__name__)
         self.shop_name = shop_name
         self.access_token = access_token
         self.base_url = f"https://{shop_name}.myshopify.com/admin/api/2025-04/graphql.json"
+        self.catalog_mirror = None
+        self.variant_media_cache = VariantMediaCache()
+        self.query_cache = None
+        self.instrumentation = instrumentation_from_environment()
 
     def sanitize_id(self, identifier, prefix='Product'):
         if identifier.isnumeric():
@@ -31,7 +50,47 @@ class ShopifyGraphqlClient(CollectionQueries,
         else:
             raise ValueError(f"Invalid ID format: {identifier}")
 
-    def run_query(self, query, variables=None, method='post'):
+    def instrument(self, instrumentation=None, report_at_exit=True, top_n=10):
+        """
+        record every request of this client, in an in-memory summary unless an Instrumentation with sinks is given.
+        """
+        self.instrumentation = instrumentation or Instrumentation()
+        if report_at_exit:
+            atexit.register(self.instrumentation.close_and_print_report, top_n)
+        return self.instrumentation
+
+    def use_query_cache(self, ttl_seconds=300, max_entries=1000):
+        """
+        memoize identical reads for the rest of the run, dropping them when a mutation of this client touches them.
+        changes made elsewhere, in the admin or by another process, are only seen after ttl_seconds.
+        """
+        self.query_cache = QueryCache(ttl_seconds, max_entries)
+        return self.query_cache
+
+    def throttle_wait_seconds(self, res):
+        try:
+            cost = res['extensions']['cost']
+            throttle_status = cost['throttleStatus']
+            return max(.5, (cost['requestedQueryCost'] - throttle_status['currentlyAvailable']) / throttle_status['restoreRate'])
+        except (KeyError, TypeError, ZeroDivisionError):
+            return 1.
+
+    def run_query(self, query, variables=None, method='post', refresh=False):
+        """
+        refresh: for reads polling a status, always sent to shopify even with the query cache, which keeps the new result.
+        """
+        if not QueryCache.is_mutation(query):
+            if self.query_cache:
+                return self.query_cache.get_or_run(query, variables, lambda: self.send_query(query, variables), refresh)
+            return self.send_query(query, variables)
+        data = self.send_query(query, variables)
+        if self.query_cache:
+            self.query_cache.invalidate(query, variables, data)
+        if self.catalog_mirror:
+            self.catalog_mirror.invalidate(query, variables, data)
+        return data
+
+    def send_query(self, query, variables=None):
         headers = {
             "X-Shopify-Access-Token": self.access_token,
             "Content-Type": "application/json"
@@ -40,9 +99,38 @@ class ShopifyGraphqlClient(CollectionQueries,
             "query": query,
             "variables": variables
         }
-        response = requests.post(self.base_url, headers=headers, json=data)
-        res = response.json()
-        if errors := res.get('errors'):
+        body = json.dumps(data).encode('utf-8')
+        started = time.perf_counter()
+        retries = 0
+        throttle_wait = 0.
+        while True:
+            response = requests.post(self.base_url, headers=headers, data=body)
+            res = response.json()
+            errors = res.get('errors')
+            if not (errors and isinstance(errors, list) and retries < self.max_throttle_retries
+                    and any(isinstance(e, dict) and e.get('extensions', {}).get('code') == 'THROTTLED' for e in errors)):
+                break
+            wait = self.throttle_wait_seconds(res)
+            self.logger.info(f'throttled, retrying in {wait:.1f}s')
+            time.sleep(wait)
+            retries += 1
+            throttle_wait += wait
+        if self.instrumentation:
+            cost = res.get('extensions', {}).get('cost', {})
+            self.instrumentation.record({
+                'timestamp': time.time(),
+                'shop': self.shop_name,
+                'operation': operation_name(query),
+                'latency': time.perf_counter() - started,
+                'requested_cost': cost.get('requestedQueryCost'),
+                'actual_cost': cost.get('actualQueryCost'),
+                'throttle_wait': throttle_wait,
+                'retries': retries,
+                'request_bytes': len(body),
+                'response_bytes': len(response.content),
+                'error': str(errors) if errors else None,
+            })
+        if errors:
             raise RuntimeError(f'Error running the query: {errors}\n\n{query}\n\n{variables}')
         if warnings := [r.get('warnings') for r in res.get('extensions', {}).get('search', [])]:
             raise RuntimeError(f'Warning running the query: {warnings}\n\n{query}\n\n{variables}')
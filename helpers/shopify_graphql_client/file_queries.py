@@ -0,0 +1,208 @@
+import bisect
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from helpers.image_validation import validated_image_paths
+
+files_index_ttl_seconds = 60 * 60
+files_indexes = {}      # shop_name -> (FilesIndex, expires_at)
+
+
+class FilesIndex:
+    """
+    the shop's Files library by file name (the last part of the CDN URL), with the names kept sorted for prefix lookups.
+    """
+    def __init__(self):
+        self.files = {}
+        self.names = []
+
+    @staticmethod
+    def file_name(url):
+        return url.rsplit('?', 1)[0].rsplit('/', 1)[-1]
+
+    def add(self, node):
+        url = (node.get('image') or {}).get('url') or node.get('url')
+        if not url:     # still processing, indexed once it has a URL
+            return None
+        name = self.file_name(url)
+        if name not in self.files:
+            bisect.insort(self.names, name)
+        self.files[name] = {
+            'id': node['id'],
+            'file_name': name,
+            'url': url,
+            'alt': node.get('alt'),
+            'file_size': (node.get('originalSource') or {}).get('fileSize') or node.get('originalFileSize'),
+            'updated_at': node.get('updatedAt'),
+        }
+        return self.files[name]
+
+    def by_name(self, name):
+        return self.files.get(name)
+
+    def by_prefix(self, prefix):
+        res = []
+        for name in self.names[bisect.bisect_left(self.names, prefix):]:
+            if not name.startswith(prefix):
+                break
+            res.append(self.files[name])
+        return res
+
+
+class FileQueries:
+    """
+    Files library lookups through an index built once per shop. Inherited by the ShopifyGraphqlClient class.
+    """
+    file_fields = """
+        id
+        alt
+        updatedAt
+        ... on MediaImage {
+            image {
+                url
+            }
+            originalSource {
+                fileSize
+            }
+        }
+        ... on GenericFile {
+            url
+            originalFileSize
+        }
+    """
+
+    def files_index(self, refresh=False):
+        """
+        the Files library paginated once into a FilesIndex, cached per shop for files_index_ttl_seconds and
+        kept current by index_files after uploads.
+        """
+        if not refresh and (cached := files_indexes.get(self.shop_name)) and cached[1] > time.monotonic():
+            return cached[0]
+        query = """
+        query filesIndex($after: String) {
+            files(first: 250, after: $after) {
+                nodes {%s}
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+        """ % self.file_fields
+        index = FilesIndex()
+        variables = {'after': None}
+        while True:
+            res = self.run_query(query, variables)['files']
+            for node in res['nodes']:
+                index.add(node)
+            if not res['pageInfo']['hasNextPage']:
+                break
+            variables['after'] = res['pageInfo']['endCursor']
+        self.logger.info(f'indexed {len(index.files)} files of {self.shop_name}')
+        files_indexes[self.shop_name] = (index, time.monotonic() + files_index_ttl_seconds)
+        return index
+
+    def index_files(self, file_ids):
+        """
+        add or refresh the given files in the shop's index, if it has been built, with one nodes query per 250 files.
+        """
+        if not (cached := files_indexes.get(self.shop_name)):
+            return None
+        query = """
+        query filesByIds($ids: [ID!]!) {
+            nodes(ids: $ids) {
+                ... on File {%s}
+            }
+        }
+        """ % self.file_fields
+        for i in range(0, len(file_ids), 250):
+            for node in self.run_query(query, {'ids': file_ids[i:i + 250]})['nodes']:
+                if node:
+                    cached[0].add(node)
+        return cached[0]
+
+    def file_by_file_name(self, file_name):
+        return self.files_index().by_name(file_name)
+
+    def files_by_file_name_prefix(self, prefix):
+        return self.files_index().by_prefix(prefix)
+
+    def create_files(self, local_paths, alts=None, max_workers=10):
+        """
+        upload local images concurrently and register them in the Files library with one fileCreate.
+        returns the new file IDs in the order of local_paths, the files are still processing.
+        images are validated first, and converted copies uploaded where needed, so shopify does not fail them after the upload.
+        """
+        with tempfile.TemporaryDirectory(prefix='validated-images-') as converted_dir:
+            local_paths = validated_image_paths(local_paths, output_dir=converted_dir)
+            file_names = [local_path.rsplit('/', 1)[-1] for local_path in local_paths]
+            mime_types = [f'image/{local_path.rsplit('.', 1)[-1].lower()}' for local_path in local_paths]
+            staged_targets = self.generate_staged_upload_targets(file_names, mime_types)
+            self.logger.info(f'generated staged upload targets: {len(staged_targets)}')
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(self.upload_image, staged_targets, local_paths, mime_types))
+        query = """
+        mutation fileCreate($files: [FileCreateInput!]!) {
+            fileCreate(files: $files) {
+                files {
+                    id
+                    fileStatus
+                }
+                userErrors {
+                    field
+                    message
+                    code
+                }
+            }
+        }
+        """
+        variables = {
+            'files': [{
+                'originalSource': target['resourceUrl'],
+                'alt': alt,
+                'contentType': 'IMAGE',
+            } for target, alt in zip(staged_targets, alts or file_names)]
+        }
+        res = self.run_query(query, variables)
+        if errors := res['fileCreate']['userErrors']:
+            raise RuntimeError(f"Failed to create files: {errors}")
+        return [file['id'] for file in res['fileCreate']['files']]
+
+    def wait_for_files_ready(self, file_ids, timeout_minutes=10, poll_interval=.5):
+        """
+        poll just the given files until all are READY, returns their nodes in the order of file_ids and indexes them.
+        """
+        query = """
+        query filesStatus($ids: [ID!]!) {
+            nodes(ids: $ids) {
+                ... on File {
+                    fileStatus
+                    fileErrors {
+                        code
+                        details
+                        message
+                    }%s
+                }
+            }
+        }
+        """ % self.file_fields
+        ready = {}
+        pending = list(file_ids)
+        for _ in range(int((timeout_minutes * 60) / poll_interval)):
+            for i in range(0, len(pending), 250):
+                chunk = pending[i:i + 250]
+                for file_id, node in zip(chunk, self.run_query(query, {'ids': chunk}, refresh=True)['nodes']):
+                    if not node:
+                        raise RuntimeError(f'File {file_id} does not exist, it was deleted or the ID is not a file')
+                    if node['fileStatus'] == 'FAILED':
+                        raise RuntimeError(f"File processing failed for {node['id']}: {node['fileErrors']}")
+                    if node['fileStatus'] == 'READY':
+                        ready[node['id']] = node
+            if not (pending := [file_id for file_id in file_ids if file_id not in ready]):
+                if cached := files_indexes.get(self.shop_name):
+                    for node in ready.values():
+                        cached[0].add(node)
+                return [ready[file_id] for file_id in file_ids]
+            self.logger.info(f'{len(pending)} files still processing. Waiting...')
+            time.sleep(poll_interval)
+        raise TimeoutError(f'Timeout reached while waiting for files {pending}')
@@ -0,0 +1,208 @@
+"""
+Per-operation request metrics of the GraphQL client: latency, query cost, throttle waits, retries and payload sizes,
+forwarded to pluggable sinks and summarized in a report of the slowest and most expensive operations.
+
+Set SHOPIFY_GRAPHQL_PROFILE_DIR to profile any script without editing it: every client of the process records into one
+Instrumentation writing a JSONL trace and an OpenMetrics file there, and the report is printed at exit.
+"""
+import atexit
+import functools
+import json
+import math
+import os
+import re
+import threading
+import time
+
+latency_buckets = (.05, .1, .25, .5, 1, 2.5, 5, 10, math.inf)
+operation_expression = re.compile(r'^\s*(?:(query|mutation)\s*(\w*)[^{]*)?\{\s*(\w+)', re.DOTALL)
+
+
+@functools.lru_cache(maxsize=1024)
+def operation_name(query):
+    """
+    the operation name of a query document, 'query:<first field>' or 'mutation:<first field>' for anonymous ones.
+    """
+    if not (match := operation_expression.match(query)):
+        return 'unknown'
+    operation_type, name, first_field = match.groups()
+    return name or f"{operation_type or 'query'}:{first_field}"
+
+
+class OperationStats:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = []
+        self.bucket_counts = [0] * len(latency_buckets)
+        self.requested_cost = 0
+        self.actual_cost = 0
+        self.throttle_wait = 0.
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def add(self, event):
+        self.calls += 1
+        self.errors += bool(event['error'])
+        self.retries += event['retries']
+        self.latencies.append(event['latency'])
+        self.bucket_counts[next(i for i, bound in enumerate(latency_buckets) if event['latency'] <= bound)] += 1
+        self.requested_cost += event['requested_cost'] or 0
+        self.actual_cost += event['actual_cost'] or 0
+        self.throttle_wait += event['throttle_wait']
+        self.request_bytes += event['request_bytes']
+        self.response_bytes += event['response_bytes']
+
+    def percentile(self, p):
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else 0
+
+    def row(self):
+        return {
+            'operation': self.name,
+            'calls': self.calls,
+            'errors': self.errors,
+            'retries': self.retries,
+            'total_s': round(sum(self.latencies), 3),
+            'mean_ms': round(1000 * sum(self.latencies) / self.calls, 1) if self.calls else 0,
+            'p95_ms': round(1000 * self.percentile(.95), 1),
+            'requested_cost': self.requested_cost,
+            'actual_cost': self.actual_cost,
+            'throttle_wait_s': round(self.throttle_wait, 3),
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+        }
+
+
+class JsonlTraceSink:
+    """
+    one JSON line per request.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def record(self, event):
+        with self.lock:
+            self.file.write(json.dumps(event, ensure_ascii=False) + '\n')
+            self.file.flush()
+
+    def close(self, instrumentation):
+        self.file.close()
+
+
+class OpenMetricsSink:
+    """
+    the per-operation totals and latency histograms as an OpenMetrics text file, written on close.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def record(self, event):
+        pass
+
+    def close(self, instrumentation):
+        lines = []
+        for metric, metric_type, help_text in [('shopify_graphql_request_seconds', 'histogram', 'request latency'),
+                                               ('shopify_graphql_requests', 'counter', 'requests'),
+                                               ('shopify_graphql_errors', 'counter', 'failed requests'),
+                                               ('shopify_graphql_retries', 'counter', 'throttled retries'),
+                                               ('shopify_graphql_actual_cost', 'counter', 'actual query cost'),
+                                               ('shopify_graphql_requested_cost', 'counter', 'requested query cost'),
+                                               ('shopify_graphql_throttle_wait_seconds', 'counter', 'time waited on throttling'),
+                                               ('shopify_graphql_request_bytes', 'counter', 'request payload bytes'),
+                                               ('shopify_graphql_response_bytes', 'counter', 'response payload bytes')]:
+            lines.append(f'# TYPE {metric} {metric_type}')
+            lines.append(f'# HELP {metric} {help_text}')
+            for stats in instrumentation.operations.values():
+                label = f'operation="{stats.name}"'
+                if metric_type == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(latency_buckets, stats.bucket_counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{label},le="{"+Inf" if bound == math.inf else bound}"}} {cumulative}')
+                    lines.append(f'{metric}_count{{{label}}} {stats.calls}')
+                    lines.append(f'{metric}_sum{{{label}}} {sum(stats.latencies)}')
+                else:
+                    value = {'shopify_graphql_requests': stats.calls,
+                             'shopify_graphql_errors': stats.errors,
+                             'shopify_graphql_retries': stats.retries,
+                             'shopify_graphql_actual_cost': stats.actual_cost,
+                             'shopify_graphql_requested_cost': stats.requested_cost,
+                             'shopify_graphql_throttle_wait_seconds': stats.throttle_wait,
+                             'shopify_graphql_request_bytes': stats.request_bytes,
+                             'shopify_graphql_response_bytes': stats.response_bytes}[metric]
+                    lines.append(f'{metric}_total{{{label}}} {value}')
+        lines.append('# EOF')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+class Instrumentation:
+    """
+    in-memory per-operation summary, also forwarding every request event to the sinks.
+    """
+    def __init__(self, sinks=None):
+        self.sinks = list(sinks or [])
+        self.operations = {}
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def record(self, event):
+        with self.lock:
+            if (stats := self.operations.get(event['operation'])) is None:
+                stats = self.operations[event['operation']] = OperationStats(event['operation'])
+            stats.add(event)
+        for sink in self.sinks:
+            sink.record(event)
+
+    def summary(self, sort_key='total_s'):
+        with self.lock:
+            rows = [stats.row() for stats in self.operations.values()]
+        return sorted(rows, key=lambda row: row[sort_key], reverse=True)
+
+    def report(self, top_n=10):
+        columns = ['operation', 'calls', 'errors', 'retries', 'total_s', 'mean_ms', 'p95_ms', 'actual_cost', 'throttle_wait_s', 'response_bytes']
+        lines = []
+        for title, sort_key in [('slowest operations', 'total_s'), ('most expensive operations', 'actual_cost')]:
+            rows = self.summary(sort_key)[:top_n]
+            widths = [max([len(column)] + [len(str(row[column])) for row in rows]) for column in columns]
+            lines.append(f'{title} (top {top_n}):')
+            lines.append('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+            lines.extend('  '.join(str(row[column]).ljust(width) for column, width in zip(columns, widths)) for row in rows)
+            lines.append('')
+        return '\n'.join(lines)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for sink in self.sinks:
+            sink.close(self)
+
+    def close_and_print_report(self, top_n=10):
+        self.close()
+        if self.operations:
+            print(self.report(top_n))
+
+
+process_instrumentation = None
+
+
+def instrumentation_from_environment():
+    """
+    the process-wide Instrumentation when SHOPIFY_GRAPHQL_PROFILE_DIR is set, created on first use.
+    """
+    global process_instrumentation
+    if not (profile_dir := os.environ.get('SHOPIFY_GRAPHQL_PROFILE_DIR')):
+        return None
+    if process_instrumentation is None:
+        os.makedirs(profile_dir, exist_ok=True)
+        run_id = time.strftime('%Y%m%d-%H%M%S')
+        process_instrumentation = Instrumentation([JsonlTraceSink(os.path.join(profile_dir, f'graphql-trace-{run_id}.jsonl')),
+                                                   OpenMetricsSink(os.path.join(profile_dir, f'graphql-metrics-{run_id}.txt'))])
+        atexit.register(process_instrumentation.close_and_print_report)
+    return process_instrumentation
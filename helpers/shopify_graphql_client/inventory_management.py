@@ -1,32 +1,162 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+location_registry_ttl_seconds = 60 * 60
+location_registries = {}        # shop_name -> ({name: location_id}, expires_at)
+
+
 class InventoryManagement:
     """
     This class provides methods to manage inventory in a Shopify store. Inherited by the ShopifyGraphqlClient class.
     """
 
     """ inventory management """
-    def location_id_by_name(self, name):
+    def location_ids_by_name(self, refresh=False):
+        """
+        {name: location_id} of all the shop's locations, read once and cached per shop for location_registry_ttl_seconds.
+        """
+        if not refresh and (cached := location_registries.get(self.shop_name)) and cached[1] > time.monotonic():
+            return cached[0]
         query = '''
-        {
-            locations(first:10, query:"name:%s") {
+        query locations($after: String) {
+            locations(first: 250, after: $after) {
                 nodes {
                     id
+                    name
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
                 }
             }
         }
-        ''' % name
-        res = self.run_query(query)
-        res = res['locations']['nodes']
-        assert len(res) == 1, f'{"Multiple" if res else "No"} locations found for {name}: {res}'
-        return res[0]['id']
+        '''
+        variables = {'after': None}
+        res = {}
+        while True:
+            locations = self.run_query(query, variables)['locations']
+            res.update({node['name']: node['id'] for node in locations['nodes']})
+            if not locations['pageInfo']['hasNextPage']:
+                break
+            variables['after'] = locations['pageInfo']['endCursor']
+        location_registries[self.shop_name] = (res, time.monotonic() + location_registry_ttl_seconds)
+        return res
+
+    def location_id_by_name(self, name):
+        location_ids = self.location_ids_by_name()
+        if name not in location_ids:        # added since the registry was loaded
+            location_ids = self.location_ids_by_name(refresh=True)
+        assert name in location_ids, f'No locations found for {name}: {sorted(location_ids)}'
+        return location_ids[name]
 
     def enable_and_activate_inventory(self, sku, location_names):
         inventory_item_id = self.inventory_item_id_by_sku(sku)
         ress = [self.enable_inventory_tracking(inventory_item_id)]
-        for location_name in location_names:
-            ress.append(self.activate_inventory_item(inventory_item_id,
-                                                     self.location_id_by_name(location_name)))
+        if location_names:
+            ress += self.activate_inventory_items([inventory_item_id], [self.location_id_by_name(name) for name in location_names])[0]
         return ress
 
+    def enable_and_activate_inventories(self, skus, location_names, batch_size=25, max_workers=4):
+        """
+        track the inventory of all the skus and stock them at all the locations, in a handful of requests: one
+        productVariantsBulkUpdate per product and one inventoryBulkToggleActivation per item, batch_size of each aliased in a request.
+        returns {sku: inventory_item_id}.
+        """
+        variants = self.variants_by_skus(skus)
+        untracked = {}
+        for variant in variants.values():
+            if not variant['inventoryItem']['tracked']:
+                untracked.setdefault(variant['product']['id'], []).append(variant['id'])
+        product_batches = [list(untracked.items())[i:i + batch_size] for i in range(0, len(untracked), batch_size)]
+        inventory_item_ids = [variant['inventoryItem']['id'] for variant in variants.values()]
+        item_batches = [inventory_item_ids[i:i + batch_size] for i in range(0, len(inventory_item_ids), batch_size)] if location_names else []
+        location_ids = [self.location_id_by_name(name) for name in location_names]
+        self.logger.info(f'tracking {sum(map(len, untracked.values()))} variants and activating {len(inventory_item_ids) if location_names else 0} '
+                         f'items at {len(location_ids)} locations in {len(product_batches) + len(item_batches)} requests')
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(self.track_variants_inventory, product_batches))
+            list(executor.map(lambda batch: self.activate_inventory_items(batch, location_ids), item_batches))
+        return {sku: variant['inventoryItem']['id'] for sku, variant in variants.items()}
+
+    def variants_by_skus(self, skus, batch_size=50):
+        """
+        {sku: variant with its product and inventory item}, batch_size skus ORed in each search.
+        """
+        query = """
+        query variantsBySkus($query_string: String, $after: String) {
+            productVariants(first: 250, query: $query_string, after: $after) {
+                nodes {
+                    id
+                    sku
+                    product {
+                        id
+                    }
+                    inventoryItem {
+                        id
+                        tracked
+                    }
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+        """
+        found = {sku: [] for sku in skus}
+        for i in range(0, len(skus), batch_size):
+            variables = {'query_string': ' OR '.join(f"sku:'{sku}'" for sku in skus[i:i + batch_size]), 'after': None}
+            while True:
+                variants = self.run_query(query, variables)['productVariants']
+                for node in variants['nodes']:
+                    if node['sku'] in found:        # the search is tokenized, other skus can match too
+                        found[node['sku']].append(node)
+                if not variants['pageInfo']['hasNextPage']:
+                    break
+                variables['after'] = variants['pageInfo']['endCursor']
+        if invalid := {sku: nodes for sku, nodes in found.items() if len(nodes) != 1}:
+            raise RuntimeError(f'No or multiple variants found for skus: {invalid}')
+        return {sku: nodes[0] for sku, nodes in found.items()}
+
+    def track_variants_inventory(self, variant_ids_by_product_id):
+        """
+        variant_ids_by_product_id: [(product_id, [variant_id])], a productVariantsBulkUpdate of each product aliased in one request.
+        """
+        declarations = []
+        fields = []
+        variables = {}
+        for i, (product_id, variant_ids) in enumerate(variant_ids_by_product_id):
+            declarations.append(f'$product{i}: ID!, $variants{i}: [ProductVariantsBulkInput!]!')
+            variables[f'product{i}'] = product_id
+            variables[f'variants{i}'] = [{'id': variant_id, 'inventoryItem': {'tracked': True}} for variant_id in variant_ids]
+            fields.append(f'product{i}: productVariantsBulkUpdate(productId: $product{i}, variants: $variants{i}) {{ userErrors {{ field message }} }}')
+        query = 'mutation trackVariantsInventory(%s) {\n%s\n}' % (', '.join(declarations), '\n'.join(fields))
+        res = self.run_query(query, variables)
+        if errors := [error for r in res.values() for error in r['userErrors']]:
+            raise RuntimeError(f"Failed to enable inventory tracking: {errors}")
+        return res
+
+    def activate_inventory_items(self, inventory_item_ids, location_ids):
+        """
+        stock every item at every location, an inventoryBulkToggleActivation of each item aliased in one request.
+        returns the inventory levels of each item.
+        """
+        declarations = ['$updates: [InventoryBulkToggleActivationInput!]!']
+        fields = []
+        variables = {'updates': [{'locationId': location_id, 'activate': True} for location_id in location_ids]}
+        for i, inventory_item_id in enumerate(inventory_item_ids):
+            declarations.append(f'$item{i}: ID!')
+            variables[f'item{i}'] = inventory_item_id
+            fields.append(f'''item{i}: inventoryBulkToggleActivation(inventoryItemId: $item{i}, inventoryItemUpdates: $updates) {{
+                inventoryLevels {{ id location {{ id }} }}
+                userErrors {{ field message code }}
+            }}''')
+        query = 'mutation activateInventoryItems(%s) {\n%s\n}' % (', '.join(declarations), '\n'.join(fields))
+        res = self.run_query(query, variables)
+        if errors := [error for r in res.values() for error in r['userErrors']]:
+            raise RuntimeError(f'Failed to activate inventory items: {errors}')
+        return [res[f'item{i}']['inventoryLevels'] for i in range(len(inventory_item_ids))]
+
     def enable_inventory_tracking(self, inventory_item_id):
         query = """
         mutation inventoryItemUpdate($id: ID!) {
@@ -142,3 +272,47 @@ class InventoryManagement:
         if not updates:
             self.logger.info(f'no updates found after updating inventory of {sku} to {quantity}')
         return updates
+
+    def set_inventory_quantities_by_skus_and_location_id(self, sku_quantity_map, location_id, batch_size=250):
+        """
+        set the available quantity of every sku at the location: the skus resolved with variants_by_skus and batch_size
+        quantities set in each inventorySetQuantities.
+        returns the changes of all the batches, the skus whose quantity did not change have none.
+        """
+        variants = self.variants_by_skus(list(sku_quantity_map))
+        quantities = [{'inventoryItemId': variants[sku]['inventoryItem']['id'], 'locationId': location_id, 'quantity': quantity}
+                      for sku, quantity in sku_quantity_map.items()]
+        query = '''
+        mutation inventorySetQuantities($quantities: [InventoryQuantityInput!]!) {
+            inventorySetQuantities(
+                input: {name: "available", ignoreCompareQuantity: true, reason: "correction", quantities: $quantities}
+            ) {
+                inventoryAdjustmentGroup {
+                    id
+                    changes {
+                        name
+                        delta
+                        quantityAfterChange
+                        item {
+                            id
+                        }
+                    }
+                    reason
+                }
+                userErrors {
+                    message
+                    code
+                    field
+                }
+            }
+        }
+        '''
+        changes = []
+        for i in range(0, len(quantities), batch_size):
+            res = self.run_query(query, {'quantities': quantities[i:i + batch_size]})
+            if res['inventorySetQuantities']['userErrors']:
+                raise RuntimeError(f"Error updating inventory quantities: {res['inventorySetQuantities']['userErrors']}")
+            if updates := res['inventorySetQuantities']['inventoryAdjustmentGroup']:
+                changes += updates['changes']
+        self.logger.info(f'set the quantities of {len(quantities)} skus in {-(-len(quantities) // batch_size)} requests, {len(changes)} changed')
+        return changes
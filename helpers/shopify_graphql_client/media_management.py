@@ -1,7 +1,10 @@
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+import tempfile
 import time
 import statistics
+from helpers.image_validation import validated_image_paths
+from helpers.shopify_graphql_client.file_queries import files_indexes
 
 def is_evenly_spaced_stddev(lst, max_stddev=1.0):
     if len(lst) < 3:
@@ -10,8 +13,87 @@ def is_evenly_spaced_stddev(lst, max_stddev=1.0):
     return statistics.stdev(diffs) <= max_stddev
 
 
+def variant_media_ranges(all_medias, variants):
+    """
+    {variant_id: (start, end)} positions of each variant's media in all_medias (sorted by position),
+    a variant's media running from its first media up to the first media of the next variant.
+    """
+    positions = {media['id']: i for i, media in enumerate(all_medias)}
+    variant_starts = {variant['id']: positions[variant['media']['nodes'][0]['id']] for variant in variants}
+    # can have multiple variants for the same media e.g. size variations
+    starts = sorted(set(variant_starts.values()) | {len(all_medias)})
+    assert is_evenly_spaced_stddev(starts), f"media start positions are not evenly spaced: {starts}"
+    ends = dict(zip(starts, starts[1:]))
+    return {variant_id: (start, ends[start]) for variant_id, start in variant_starts.items()}
+
+
+class VariantMediaCache:
+    """
+    media of products and the media slice of each of their variants, with the products indexed by variant ID and SKU
+    so every variant of a product is answered from one read. mutations touching a product's media invalidate it
+    once they return, and reads started before an invalidation are not kept, as they may predate the mutation.
+    """
+    def __init__(self):
+        self.products = {}          # product_id -> {'medias': [...], 'variant_ranges': {variant_id: (start, end)}, 'variant_ids_by_sku': {...}}
+        self.product_ids = {}       # variant_id or sku -> product_id
+        self.generation = 0
+
+    def add(self, product, generation=None):
+        """
+        generation: self.generation when the read was sent, the product is only cached if nothing was invalidated since.
+        """
+        variants = product['variants']['nodes']
+        medias = product['media']['nodes']
+        product_media = {'medias': medias,
+                         'variant_ranges': variant_media_ranges(medias, variants),
+                         'variant_ids_by_sku': {variant['sku']: variant['id'] for variant in variants if variant['sku']}}
+        if generation is not None and generation != self.generation:
+            return product_media
+        self.products[product['id']] = product_media
+        for variant in variants:
+            self.product_ids[variant['id']] = product['id']
+            if variant['sku']:
+                self.product_ids[variant['sku']] = product['id']
+        return product_media
+
+    def get(self, variant_id_or_sku):
+        return self.products.get(self.product_ids.get(variant_id_or_sku))
+
+    def invalidate(self, product_id):
+        self.generation += 1
+        self.products.pop(product_id, None)
+
+
 class MediaManagement:
-    def medias_by_product_id(self, product_id):
+    variant_media_product_fields = """
+        id
+        media(first: 100) {
+            nodes {
+                id
+                alt
+                ... on MediaImage {
+                    image{
+                        url
+                    }
+                }
+                mediaContentType
+                status
+            }
+        }
+        variants(first: 100) {
+            nodes {
+                id
+                sku
+                media(first: 1) {
+                    nodes {
+                        id
+                    }
+                }
+            }
+        }
+    """
+
+    def medias_by_product_id(self, product_id, refresh=False):
         query = """
         query ProductMediaStatusByID($productId: ID!) {
             product(id: $productId) {
@@ -41,31 +123,55 @@ class MediaManagement:
         }
         """
         variables = {"productId": self.sanitize_id(product_id)}
-        res = self.run_query(query, variables)
+        res = self.run_query(query, variables, refresh=refresh)
         return res['product']['media']['nodes']
 
+    def variant_media_by_variant_id(self, variant_id):
+        if not (product_media := self.variant_media_cache.get(variant_id)):
+            query = """
+            query variantMedia($variantId: ID!) {
+                productVariant(id: $variantId) {
+                    product {%s}
+                }
+            }
+            """ % self.variant_media_product_fields
+            generation = self.variant_media_cache.generation
+            res = self.run_query(query, {'variantId': variant_id})
+            assert res['productVariant'], f'No variant found for {variant_id}'
+            product_media = self.variant_media_cache.add(res['productVariant']['product'], generation)
+        return product_media
+
+    def variant_media_by_sku(self, sku):
+        if not (product_media := self.variant_media_cache.get(sku)):
+            query = """
+            query variantMediaBySku($query_string: String!) {
+                productVariants(first: 10, query: $query_string) {
+                    nodes {
+                        product {%s}
+                    }
+                }
+            }
+            """ % self.variant_media_product_fields
+            generation = self.variant_media_cache.generation
+            res = self.run_query(query, {'query_string': f"sku:'{sku}'"})['productVariants']['nodes']
+            assert len(res) == 1, f"{'Multiple' if res else 'No'} variants found for {sku}"
+            product_media = self.variant_media_cache.add(res[0]['product'], generation)
+        return product_media
+
     def medias_by_variant_id(self, variant_id):
-        product_id = self.product_id_by_variant_id(variant_id)
-        all_medias = self.medias_by_product_id(product_id)      # sorted by position
-        all_media_ids = [m['id'] for m in all_medias]
-        all_variants = self.product_variants_by_product_id(product_id)
-        # assert all(check_rohseoul_media(variant['sku'], variant['media']['nodes']) for variant in all_variants), f'suspicious media found in variants of {product_id}: {all_variants}'
-        target_variant = [v for v in all_variants if v['id'] == variant_id]
-        assert len(target_variant) == 1, f"{'No' if not target_variant else 'Multiple'} target variants: target_variants"
-        target_variant = target_variant[0]
-        # if not target_variant['media']['nodes']:
-        #     variant = self.variant_by_variant_id(variant_id)
-        #     return [media for media in all_medias if variant['sku'] in media['image']['url']]
-        target_media_start_position = all_media_ids.index(target_variant['media']['nodes'][0]['id'])
-
-        # can have multiple variants for the same media e.g. size variations
-        all_media_start_positions = sorted(set([all_media_ids.index(variant['media']['nodes'][0]['id']) for variant in all_variants] + [len(all_medias)]))
-        assert is_evenly_spaced_stddev(all_media_start_positions), f"media start positions are not evenly spaced: {all_media_start_positions}"
-        target_media_end_position = all_media_start_positions[all_media_start_positions.index(target_media_start_position) + 1]
-        return all_medias[target_media_start_position:target_media_end_position]
+        """
+        the media of the variant: from its first media up to the first media of the next variant, sorted by position.
+        one query per product, the other variants of the product are then answered from the cache.
+        """
+        variant_id = self.sanitize_id(variant_id, 'ProductVariant')
+        product_media = self.variant_media_by_variant_id(variant_id)
+        start, end = product_media['variant_ranges'][variant_id]
+        return product_media['medias'][start:end]
 
     def medias_by_sku(self, sku):
-        return self.medias_by_variant_id(self.variant_id_by_sku(sku))
+        product_media = self.variant_media_by_sku(sku)
+        start, end = product_media['variant_ranges'][product_media['variant_ids_by_sku'][sku]]
+        return product_media['medias'][start:end]
 
     def media_by_product_id_by_file_name(self, product_id, name):
         medias = self.medias_by_product_id(self.sanitize_id(product_id))
@@ -74,6 +180,8 @@ class MediaManagement:
                 return media
 
     def file_id_by_file_name(self, file_name):
+        if (cached := files_indexes.get(self.shop_name)) and (file := cached[0].by_name(file_name)):
+            return file['id']
         query = '''
 
         query {
@@ -130,6 +238,7 @@ class MediaManagement:
         }
 
         res = self.run_query(mutation_query, variables)
+        self.variant_media_cache.invalidate(self.sanitize_id(product_id))
 
         self.logger.debug("Initial media status:")
         self.logger.debug(res)
@@ -155,6 +264,12 @@ class MediaManagement:
         for variant in variants:
             if len(variant['media']['nodes']) > 0:
                 self.detach_variant_media(product_id, variant['id'], variant['media']['nodes'][0]['id'])
+        return self.append_variant_media(product_id, {variant_id: media_id for variant_id in variant_ids})
+
+    def append_variant_media(self, product_id, variant_media):
+        """
+        variant_media: {variant_id: media_id}, all in one productVariantAppendMedia.
+        """
         query = """
         mutation productVariantAppendMedia($productId: ID!, $variantMedia: [ProductVariantAppendMediaInput!]!) {
             productVariantAppendMedia(productId: $productId, variantMedia: $variantMedia) {
@@ -173,9 +288,40 @@ class MediaManagement:
         """
         variables = {
             "productId": product_id,
-            "variantMedia": [{"variantId": vid, "mediaIds": [media_id]} for vid in variant_ids]
+            "variantMedia": [{"variantId": vid, "mediaIds": [media_id]} for vid, media_id in variant_media.items()]
         }
-        return self.run_query(query, variables)
+        res = self.run_query(query, variables)
+        self.variant_media_cache.invalidate(self.sanitize_id(product_id))
+        return res
+
+    def add_file_references(self, file_ids, product_id):
+        """
+        attach existing files (e.g. another product's media) to a product by reference, nothing is copied or processed again.
+        """
+        query = """
+        mutation fileUpdate($files: [FileUpdateInput!]!) {
+            fileUpdate(files: $files) {
+                files {
+                    id
+                    fileStatus
+                }
+                userErrors {
+                    field
+                    message
+                    code
+                }
+            }
+        }
+        """
+        product_id = self.sanitize_id(product_id)
+        variables = {
+            "files": [{"id": file_id, "referencesToAdd": [product_id]} for file_id in file_ids]
+        }
+        res = self.run_query(query, variables)
+        self.variant_media_cache.invalidate(product_id)
+        if res['fileUpdate']['userErrors']:
+            raise RuntimeError(f"Failed to add file references to {product_id}: {res['fileUpdate']['userErrors']}")
+        return res
 
     def remove_product_media_by_product_id(self, product_id, media_ids=None):
         product_id = self.sanitize_id(product_id)
@@ -209,6 +355,7 @@ class MediaManagement:
             "mediaIds": media_ids
         }
         res = self.run_query(query, variables)
+        self.variant_media_cache.invalidate(product_id)
         self.logger.info(f'Initial media status for deletion:\n{res}')
         status = self.wait_for_media_processing_completion(product_id)
         if not status:
@@ -244,7 +391,9 @@ class MediaManagement:
                 "mediaIds": [media_id]
             }]
         }
-        return self.run_query(query, variables)
+        res = self.run_query(query, variables)
+        self.variant_media_cache.invalidate(self.sanitize_id(product_id))
+        return res
 
     def generate_staged_upload_targets(self, file_names, mime_types):
         query = """
@@ -277,12 +426,14 @@ class MediaManagement:
         return res['stagedUploadsCreate']['stagedTargets']
 
     def upload_and_assign_images_to_product(self, product_id, local_paths, remove_existings=True):
-        file_names = [local_path.rsplit('/', 1)[-1] for local_path in local_paths]
-        mime_types = [f'image/{local_path.rsplit('.', 1)[-1].lower()}' for local_path in local_paths]
-        staged_targets = self.generate_staged_upload_targets(file_names, mime_types)
-        self.logger.info(f'generated staged upload targets: {len(staged_targets)}')
         ress = []
-        ress.append(self.upload_images_to_shopify_parallel(staged_targets, local_paths, mime_types))
+        with tempfile.TemporaryDirectory(prefix='validated-images-') as converted_dir:
+            local_paths = validated_image_paths(local_paths, output_dir=converted_dir)
+            file_names = [local_path.rsplit('/', 1)[-1] for local_path in local_paths]
+            mime_types = [f'image/{local_path.rsplit('.', 1)[-1].lower()}' for local_path in local_paths]
+            staged_targets = self.generate_staged_upload_targets(file_names, mime_types)
+            self.logger.info(f'generated staged upload targets: {len(staged_targets)}')
+            ress.append(self.upload_images_to_shopify_parallel(staged_targets, local_paths, mime_types))
         if remove_existings:
             ress.append(self.remove_product_media_by_product_id(product_id))
         ress.append(self.assign_images_to_product([target['resourceUrl'] for target in staged_targets],
@@ -343,7 +494,7 @@ class MediaManagement:
         attempts = 0
 
         while attempts < max_attempts:
-            media_nodes = self.medias_by_product_id(self.sanitize_id(product_id))
+            media_nodes = self.medias_by_product_id(self.sanitize_id(product_id), refresh=True)
             processing_items = [node for node in media_nodes if node['status'] == "PROCESSING"]
             failed_items = [node for node in media_nodes if node['status'] == "FAILED"]
 
@@ -373,7 +524,9 @@ class MediaManagement:
 
     def _replace_image_files_with_staging(self, staged_targets, local_paths):
         filenames = [self.sanitize_image_name(path.rsplit('/', 1)[-1]) for path in local_paths]
-        file_ids = [self.file_id_by_file_name(filename) for filename in filenames]
+        index = self.files_index()
+        assert not (missing := [filename for filename in filenames if not index.by_name(filename)]), f'No files found for {missing}'
+        file_ids = [index.by_name(filename)['id'] for filename in filenames]
         resource_urls = [target['resourceUrl'] for target in staged_targets]
         query = """
         mutation FileUpdate($input: [FileUpdateInput!]!) {
@@ -401,4 +554,5 @@ class MediaManagement:
         res = self.run_query(query, variables)
         if res['fileUpdate']['userErrors']:
             raise RuntimeError(f"Failed to assign images to product: {res['fileUpdate']['userErrors']}")
+        self.index_files(file_ids)
         return res['fileUpdate']
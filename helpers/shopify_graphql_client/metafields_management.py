@@ -1,4 +1,9 @@
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+metafield_definitions_ttl_seconds = 60 * 60
+metafield_definitions_cache = {}     # (shop_name, owner_type) -> (definitions, expires_at)
 
 class MetafieldsManagement:
     """
@@ -41,12 +46,59 @@ class MetafieldsManagement:
         res = self.run_query(query, variables)
         return res
 
+    def metafields_set(self, metafields, chunk_size=25, max_workers=5):
+        """
+        metafields shape:
+        [{'ownerId': 'gid://shopify/Product/123', 'namespace': 'custom', 'key': 'size_table_html', 'value': '<table>...'}]
+
+        metafieldsSet takes up to 25 metafields across owners per call, the chunks are sent concurrently.
+        returns the IDs of the metafields set, in the order given.
+        """
+        query = """
+        mutation metafieldsSet($metafields: [MetafieldsSetInput!]!) {
+            metafieldsSet(metafields: $metafields) {
+                metafields {
+                    id
+                }
+                userErrors {
+                    field
+                    message
+                    code
+                }
+            }
+        }
+        """
+        def set_chunk(chunk):
+            res = self.run_query(query, {'metafields': chunk})
+            if errors := res['metafieldsSet']['userErrors']:
+                raise RuntimeError(f"Failed to set metafields: {errors}")
+            return [metafield['id'] for metafield in res['metafieldsSet']['metafields']]
+
+        chunks = [metafields[i:i + chunk_size] for i in range(0, len(metafields), chunk_size)]
+        self.logger.info(f'setting {len(metafields)} metafields in {len(chunks)} requests')
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return [metafield_id for ids in executor.map(set_chunk, chunks) for metafield_id in ids]
+
+    def update_products_metafield(self, product_id_value_map, metafield_namespace, metafield_key, metafield_type=None):
+        metafields = [{'ownerId': self.sanitize_id(product_id),
+                       'namespace': metafield_namespace,
+                       'key': metafield_key,
+                       'value': value} for product_id, value in product_id_value_map.items()]
+        if metafield_type:
+            for metafield in metafields:
+                metafield['type'] = metafield_type
+        return self.metafields_set(metafields)
+
     def update_variation_value_metafield(self, product_id, variation_value):
         return self.update_product_metafield(product_id, 'custom', 'variation_value', variation_value)
 
     def update_variation_products_metafield(self, product_id, variation_product_ids):
         return self.update_product_metafield(product_id, 'custom', 'variation_products', json.dumps(variation_product_ids))
 
+    def update_variation_products_metafields(self, variation_product_ids):
+        return self.update_products_metafield({product_id: json.dumps(variation_product_ids) for product_id in variation_product_ids},
+                                              'custom', 'variation_products')
+
     def update_product_description_metafield(self, product_id, desc):
         return self.update_product_metafield(product_id, 'custom', 'product_description', json.dumps(desc))
 
@@ -56,20 +108,49 @@ class MetafieldsManagement:
     def update_size_table_html_metafield(self, product_id, html_text):
         return self.update_product_metafield(product_id, 'custom', 'size_table_html', html_text)
 
-    def metafield_id_by_namespace_and_key(self, namespace, key, owner_type='PRODUCT'):
+    def update_size_table_html_metafields(self, product_id_html_text_map):
+        return self.update_products_metafield(product_id_html_text_map, 'custom', 'size_table_html')
+
+    def metafield_definitions(self, owner_type='PRODUCT'):
+        """
+        all metafield definitions of the owner type keyed by (namespace, key), cached per shop for metafield_definitions_ttl_seconds.
+        """
+        cache_key = (self.shop_name, owner_type)
+        if (cached := metafield_definitions_cache.get(cache_key)) and cached[1] > time.monotonic():
+            return cached[0]
         query = '''
-        query {
-            metafieldDefinitions(first:10, ownerType:%s, namespace:"%s", key:"%s") {
+        query MetafieldDefinitions($ownerType: MetafieldOwnerType!, $after: String) {
+            metafieldDefinitions(first: 250, ownerType: $ownerType, after: $after) {
                 nodes {
                     id
+                    namespace
+                    key
+                    type {
+                        name
+                    }
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
                 }
             }
         }
-        ''' % (owner_type, namespace, key)
-        res = self.run_query(query)
-        res = res['metafieldDefinitions']['nodes']
-        assert len(res) == 1, f'{"Multiple" if res else "No"} metafields found for {namespace}:{key}: {res}'
-        return res[0]['id']
+        '''
+        definitions = {}
+        variables = {'ownerType': owner_type, 'after': None}
+        while True:
+            res = self.run_query(query, variables)['metafieldDefinitions']
+            definitions.update({(node['namespace'], node['key']): node for node in res['nodes']})
+            if not res['pageInfo']['hasNextPage']:
+                break
+            variables['after'] = res['pageInfo']['endCursor']
+        metafield_definitions_cache[cache_key] = (definitions, time.monotonic() + metafield_definitions_ttl_seconds)
+        return definitions
+
+    def metafield_id_by_namespace_and_key(self, namespace, key, owner_type='PRODUCT'):
+        definition = self.metafield_definitions(owner_type).get((namespace, key))
+        assert definition, f'No metafields found for {namespace}:{key}'
+        return definition['id']
 
     def product_metafield_value_by_product_id(self, product_id, namespace='custom', key='product_description'):
         query = '''
@@ -89,6 +170,36 @@ class MetafieldsManagement:
         res = self.run_query(query, variables)
         return res['product']['metafieldValue']['value']
 
+    def metafield_values_by_owner_ids(self, owner_ids, namespace_keys, chunk_size=None):
+        """
+        values of the given (namespace, key) pairs for many owners, fetched through nodes(ids:) in chunks.
+        returns {owner_id: {(namespace, key): value or None}}
+        """
+        aliases = {f'metafield{i}': namespace_key for i, namespace_key in enumerate(namespace_keys)}
+        query = '''
+        query MetafieldValuesByOwnerIds($ids: [ID!]!) {
+            nodes(ids: $ids) {
+                id
+                ... on HasMetafields {
+                    %s
+                }
+            }
+        }
+        ''' % '\n'.join(f'{alias}: metafield(namespace: "{namespace}", key: "{key}") {{ value }}'
+                          for alias, (namespace, key) in aliases.items())
+        # nodes takes up to 250 ids, keep each request within the 1000 points query cost limit
+        chunk_size = chunk_size or min(250, 1000 // (1 + len(aliases)))
+        res = {}
+        for i in range(0, len(owner_ids), chunk_size):
+            nodes = self.run_query(query, {'ids': owner_ids[i:i + chunk_size]})['nodes']
+            for node in filter(None, nodes):
+                res[node['id']] = {namespace_key: (node.get(alias) or {}).get('value') for alias, namespace_key in aliases.items()}
+        return res
+
+    def product_metafield_values_by_product_ids(self, product_ids, namespace='custom', key='product_description'):
+        res = self.metafield_values_by_owner_ids([self.sanitize_id(product_id) for product_id in product_ids], [(namespace, key)])
+        return {product_id: values[(namespace, key)] for product_id, values in res.items()}
+
     def convert_rich_text_to_html(self, json_value):
         def render_node(node):
             node_type = node.get("type")
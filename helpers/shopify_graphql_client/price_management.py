@@ -0,0 +1,144 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def to_price(values):
+    """
+    sheet or store prices ('¥23,100', '23100.00', 23100, '') as floats, blanks as NaN.
+    """
+    import pandas as pd
+    return pd.to_numeric(pd.Series(values, dtype=object).astype(str).str.replace(r'[^\d.\-]', '', regex=True), errors='coerce')
+
+
+class PriceManagement:
+    """
+    Variant price sync: the store's prices in bulk, diffed against a sheet and written back per product.
+    Inherited by the ShopifyGraphqlClient class.
+    """
+    price_columns = ['price', 'compare_at_price']
+
+    def variant_prices(self, query_string=None):
+        """
+        [{'variant_id', 'sku', 'price', 'compare_at_price', 'product_id', 'title', 'status'}] of all variants matching the query, paginated.
+        """
+        query = """
+        query variantPrices($query_string: String, $after: String) {
+            productVariants(first: 250, query: $query_string, after: $after) {
+                nodes {
+                    id
+                    sku
+                    price
+                    compareAtPrice
+                    product {
+                        id
+                        title
+                        status
+                    }
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+        """
+        variables = {'query_string': query_string, 'after': None}
+        res = []
+        while True:
+            variants = self.run_query(query, variables)['productVariants']
+            res.extend({'variant_id': node['id'],
+                        'sku': node['sku'],
+                        'price': node['price'],
+                        'compare_at_price': node['compareAtPrice'],
+                        'product_id': node['product']['id'],
+                        'title': node['product']['title'],
+                        'status': node['product']['status']} for node in variants['nodes'])
+            if not variants['pageInfo']['hasNextPage']:
+                break
+            variables['after'] = variants['pageInfo']['endCursor']
+        self.logger.info(f'loaded prices of {len(res)} variants')
+        return res
+
+    def price_diff(self, sheet_prices, store_prices=None, on='sku'):
+        """
+        sheet_prices: rows (or a DataFrame) with the `on` column and 'price', optionally 'compare_at_price'.
+        a column missing from the sheet is not compared, a blank sheet value is expected to be blank in the store.
+
+        returns a DataFrame of the store variants whose prices differ from the sheet, with 'price_expected' and 'compare_at_price_expected'.
+        """
+        import pandas as pd
+        sheet = pd.DataFrame(sheet_prices)
+        store = pd.DataFrame(store_prices if store_prices is not None else self.variant_prices(),
+                             columns=['variant_id', 'sku', 'price', 'compare_at_price', 'product_id', 'title', 'status'])
+        columns = [column for column in self.price_columns if column in sheet.columns]
+        assert columns, f'no price columns in the sheet: {list(sheet.columns)}'
+
+        sheet[on] = sheet[on].astype(str).str.strip()
+        sheet = sheet[sheet[on] != '']
+        if duplicated := sheet[on][sheet[on].duplicated()].tolist():
+            raise RuntimeError(f'Duplicated {on} in the sheet: {duplicated}')
+        for column in columns:
+            sheet[column] = to_price(sheet[column]).values
+            store[column] = to_price(store[column]).values
+
+        merged = store.merge(sheet[[on] + columns], on=on, how='inner', suffixes=('', '_expected'))
+        if unmatched := sorted(set(sheet[on]) - set(merged[on])):
+            self.logger.warning(f'{len(unmatched)} {on}s in the sheet not found in the store: {unmatched}')
+        changed = pd.Series(False, index=merged.index)
+        for column in columns:
+            current, expected = merged[column], merged[f'{column}_expected']
+            changed |= ~((current == expected) | (current.isna() & expected.isna()))
+        res = merged[changed].reset_index(drop=True)
+        self.logger.info(f'{len(res)} of {len(merged)} matched variants have different prices')
+        return res
+
+    def update_variant_prices(self, product_id, variants):
+        """
+        variants: [{'id': 'gid://shopify/ProductVariant/1', 'price': '23100.00', 'compareAtPrice': None}]
+        """
+        query = """
+        mutation productVariantsBulkUpdate($productId: ID!, $variants: [ProductVariantsBulkInput!]!) {
+            productVariantsBulkUpdate(productId: $productId, variants: $variants) {
+                productVariants {
+                    id
+                    price
+                    compareAtPrice
+                }
+                userErrors {
+                    field
+                    message
+                }
+            }
+        }
+        """
+        variables = {
+            'productId': self.sanitize_id(product_id),
+            'variants': variants
+        }
+        res = self.run_query(query, variables)
+        if errors := res['productVariantsBulkUpdate']['userErrors']:
+            raise RuntimeError(f"Failed to update the variant prices of {product_id}: {errors}")
+        return res['productVariantsBulkUpdate']['productVariants']
+
+    def apply_price_diff(self, diff, max_workers=5):
+        """
+        write the expected prices of a price_diff result, one productVariantsBulkUpdate per product.
+        """
+        def format_price(value):
+            return None if value != value else f'{value:.2f}'       # NaN clears compare-at
+
+        product_id_variants_map = {}
+        for row in diff.to_dict('records'):
+            variant = {'id': row['variant_id']}
+            if 'price_expected' in row:
+                if row['price_expected'] != row['price_expected']:
+                    self.logger.warning(f"no price in the sheet for {row['sku']} ({row['title']}), leaving its price as is")
+                else:
+                    variant['price'] = format_price(row['price_expected'])
+            if 'compare_at_price_expected' in row:
+                variant['compareAtPrice'] = format_price(row['compare_at_price_expected'])
+            if len(variant) > 1:
+                product_id_variants_map.setdefault(row['product_id'], []).append(variant)
+
+        self.logger.info(f'updating prices of {sum(map(len, product_id_variants_map.values()))} variants in {len(product_id_variants_map)} products')
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda item: self.update_variant_prices(*item), product_id_variants_map.items()))
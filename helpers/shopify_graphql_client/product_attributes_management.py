@@ -1,3 +1,6 @@
+from helpers.shopify_graphql_client.file_queries import FilesIndex
+
+
 class ProductAttributesManagement:
     """
     Product attributes management queries. Inherited by the ShopifyGraphqlClient class.
@@ -56,20 +59,23 @@ class ProductAttributesManagement:
     def update_product_theme_template(self, product_id, template_suffix):
         return self.update_product_attribute(product_id, 'templateSuffix', template_suffix)
 
-    def upload_and_assign_description_images_to_shopify(self, product_id, local_paths, dummy_product_id, shopify_url_prefix):
+    def upload_and_assign_description_images_to_shopify(self, product_id, local_paths, dummy_product_id, shopify_url_prefix, image_filter=None):
         """
-        upload images to shopify, generate HTML consists of the links of uploaded files and assign it to the product description.
-        in order to keep the uploaded images, they are assigned to a dummy product.
+        upload images to the Files library, wait for just those files and assign HTML consisting of their links to the product description.
+        files live on their own, so dummy_product_id is ignored, it stays only so the positional callers keep working.
+        image_filter(local_paths) returns the paths to upload, e.g. helpers.image_ocr.ocr_image_filter() to leave out untranslated images.
         """
+        # a PSD in a description folder is the layered source of a translated JPEG exported next to it, which is the
+        # image to show, so PSDs are left out rather than converted by create_files
         local_paths = [local_path for local_path in local_paths if not local_path.endswith('.psd')]
-        mime_types = [f'image/{local_path.rsplit('.', 1)[-1].lower()}' for local_path in local_paths]
-        staged_targets = self.generate_staged_upload_targets(local_paths, mime_types)
-        self.logger.info(f'generated staged upload targets: {len(staged_targets)}')
-        self.upload_images_to_shopify(staged_targets, local_paths, mime_types)
-        description = '\n'.join(self.image_htmlfragment_in_description(local_path.rsplit('/', 1)[-1], i, shopify_url_prefix) for i, local_path in enumerate(local_paths))
-        self.assign_images_to_product([target['resourceUrl'] for target in staged_targets],
-                                       alts=[local_path.rsplit('/', 1)[-1] for local_path in local_paths],
-                                       product_id=dummy_product_id)
+        if image_filter:
+            local_paths = image_filter(local_paths)
+        file_ids = self.create_files(local_paths)
+        files = self.wait_for_files_ready(file_ids)
+        self.logger.info(f'uploaded {len(files)} description images')
+        # the file names shopify settled on, which differ from the local ones when a name was taken
+        description = '\n'.join(self.image_htmlfragment_in_description(FilesIndex.file_name(file['image']['url']), i, shopify_url_prefix)
+                                for i, file in enumerate(files))
         return self.update_product_description(product_id, description)
 
     def sanitize_image_name(self, image_name):
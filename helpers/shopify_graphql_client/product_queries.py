@@ -1,82 +1,160 @@
-class ProductQueries:
+import functools
+
+# the fields products_by_query selects for each profile, the ID lookups only need the ids
+product_field_profiles = {
+    'ids': """
+        id
+    """,
+    'summary': """
+        id
+        title
+        handle
+        status
+        vendor
+        productType
+        tags
+    """,
+    'pricing': """
+        id
+        title
+        handle
+        variants (first:10) {
+            nodes {
+                id
+                sku
+                price
+                compareAtPrice
+            }
+        }
+    """,
+    'full': """
+        id
+        title
+        handle
+        tags
+        metafields (first:10) {
+            nodes {
+                id
+                namespace
+                key
+                value
+            }
+        }
+        variants (first:10) {
+            nodes {
+                id
+                title
+                sku
+                price
+                selectedOptions {
+                    name
+                    value
+                }
+            }
+        }
+    """,
+}
+
+
+# products a page of each profile, to keep each request within the 1000 points query cost limit
+product_profile_page_sizes = {
+    'ids': 100,
+    'summary': 100,
+    'pricing': 50,
+    'full': 25,
+}
+
+
+@functools.lru_cache(maxsize=128)
+def products_query(profile, additional_fields=()):
     """
-    A class to handle GraphQL queries related to products in Shopify, inherited by the ShopifyGraphqlClient class.
+    the products_by_query document of a profile plus additional_fields, built once per combination.
     """
-    def products_by_query(self, query_string, additional_fields=None):
-        query = """
-        query productsByQuery($query_string: String!) {
-            products(first: 100, query: $query_string, sortKey: TITLE) {
-                nodes {
-                    id
-                    title
-                    handle
-                    tags%s
-                    metafields (first:10) {
-                        nodes {
-                            id
-                            namespace
-                            key
-                            value
-                        }
-                    }
-                    variants (first:10) {
-                        nodes {
-                            id
-                            title
-                            sku
-                            price
-                            selectedOptions {
-                                name
-                                value
-                            }
-                        }
-                    }
-                }
+    return """
+    query productsByQuery($query_string: String!, $after: String) {
+        products(first: %d, query: $query_string, sortKey: TITLE, after: $after) {
+            nodes {%s%s
+            }
+            pageInfo {
+                hasNextPage
+                endCursor
             }
         }
-        """ % (f"\n{'\n'.join(additional_fields)}" if additional_fields else '')
+    }
+    """ % (product_profile_page_sizes[profile], product_field_profiles[profile].rstrip(), ''.join(f'\n{field}' for field in additional_fields))
+
+
+class ProductQueries:
+    """
+    A class to handle GraphQL queries related to products in Shopify, inherited by the ShopifyGraphqlClient class.
+    """
+    def use_catalog_mirror(self, db_path=None, sync=True):
+        """
+        answer product reads from a local catalog mirror where it can, falling back to shopify for anything else.
+        products this client mutates are read again before the next read from the mirror, changes made in the admin
+        or by other processes are only seen after the next sync.
+        """
+        from helpers.catalog_mirror import CatalogMirror
+        self.catalog_mirror = CatalogMirror(self.shop_name, db_path)
+        if sync:
+            self.catalog_mirror.sync(self)
+        return self.catalog_mirror
+
+    def products_by_query(self, query_string, additional_fields=None, profile='full'):
+        """
+        profile: the fields of each product, one of product_field_profiles.
+        """
+        if self.catalog_mirror and (res := self.catalog_mirror.refresh(self).products_by_query(query_string, additional_fields, profile)) is not None:
+            return res
         variables = {
-            "query_string": query_string
+            "query_string": query_string,
+            "after": None
         }
-        res = self.run_query(query, variables)
-        res = res['products']['nodes']
-        assert len(res) < 100, f"Too many products found for {query_string}: {len(res)}"
-        return res
-
-    def product_by_query(self, query_string, additional_fields=None):
-        products = self.products_by_query(query_string, additional_fields)
+        query = products_query(profile, tuple(additional_fields or ()))
+        res = []
+        while True:
+            page = self.run_query(query, variables)['products']
+            res += page['nodes']
+            assert len(res) < 100, f"Too many products found for {query_string}: {len(res)}"
+            if not page['pageInfo']['hasNextPage']:
+                return res
+            variables['after'] = page['pageInfo']['endCursor']
+
+    def product_by_query(self, query_string, additional_fields=None, profile='full'):
+        products = self.products_by_query(query_string, additional_fields, profile)
         if len(products) != 1:
             raise RuntimeError(f"{'Multiple' if products else 'No'} products found for {query_string}: {products}")
         return products[0]
 
-    def product_by_id(self, identifier, additional_fields=None):
-        return self.products_by_query(f"id:'{identifier.rsplit('/', 1)[-1]}'", additional_fields)[0]
+    def product_by_id(self, identifier, additional_fields=None, profile='full'):
+        return self.products_by_query(f"id:'{identifier.rsplit('/', 1)[-1]}'", additional_fields, profile)[0]
 
-    def products_by_title(self, title, additional_fields=None):
-        return self.products_by_query(f"title:'{title.replace("'", "\\'")}'", additional_fields)
+    def products_by_title(self, title, additional_fields=None, profile='full'):
+        return self.products_by_query(f"title:'{title.replace("'", "\\'")}'", additional_fields, profile)
 
     def product_ids_by_title(self, title):
-        res = self.products_by_title(title)
+        res = self.products_by_title(title, profile='ids')
         return [r['id'] for r in res]
 
-    def product_by_title(self, title, additional_fields=None):
-        return self.product_by_query(f"title:'{title.replace("'", "\\'")}'", additional_fields)
+    def product_by_title(self, title, additional_fields=None, profile='full'):
+        return self.product_by_query(f"title:'{title.replace("'", "\\'")}'", additional_fields, profile)
 
     def product_id_by_title(self, title):
-        return self.product_by_title(title)['id']
+        return self.product_by_title(title, profile='ids')['id']
 
-    def product_by_handle(self, handle, additional_fields=None):
-        return self.product_by_query(f"handle:'{handle}'", additional_fields)
+    def product_by_handle(self, handle, additional_fields=None, profile='full'):
+        return self.product_by_query(f"handle:'{handle}'", additional_fields, profile)
 
     def product_id_by_handle(self, handle):
-        return self.product_by_handle(handle)['id']
+        return self.product_by_handle(handle, profile='ids')['id']
 
-    def products_by_tag(self, tag, additional_fields=None):
-        return self.products_by_query(f"tag:'{tag}'", additional_fields)
+    def products_by_tag(self, tag, additional_fields=None, profile='full'):
+        return self.products_by_query(f"tag:'{tag}'", additional_fields, profile)
 
     def product_variants_by_product_id(self, product_id):
         product_id = self.sanitize_id(product_id)
         product_id = product_id.rsplit('/', 1)[-1]
+        # media (first:40) keeps the query within the 1000 points query cost limit
         query = """
         {
             productVariants(first:10, query: "product_id:%s") {
@@ -85,7 +163,7 @@ class ProductQueries:
                 title
                 displayName
                 sku
-                media (first:50){
+                media (first:40){
                 nodes{
                     id
                     ... on MediaImage {
@@ -129,6 +207,8 @@ class ProductQueries:
         return res['nodes'][0]['product']['id']
 
     def variant_by_sku(self, sku):
+        if self.catalog_mirror:
+            return {'nodes': self.catalog_mirror.refresh(self).variants_by_sku(sku)}
         query = """
         {
         productVariants(first: 10, query: "sku:'%s'") {
@@ -1,38 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+from helpers.shopify_graphql_client.media_management import variant_media_ranges
+
+
 class ProductVariantsToProducts:
     """
     Defines workflow and required queries to convert product variants to standalone products. Inherited by the ShopifyGraphqlClient class.
     """
-    def product_variants_to_products(self, product_title, option_name='カラー', new_status='DRAFT'):
+    def product_variants_to_products(self, product_title, option_name='カラー', new_status='DRAFT', max_workers=4, reuse_media=True):
+        """
+        reuse_media: duplicate without images and attach each colour's existing media by reference,
+        instead of copying every image into every new product and deleting the other colours'.
+        """
         product = self.product_by_title(product_title)
-        product_id = product['id']
-        product_handle = product['handle']
-        variants = self.product_variants_by_product_id(product_id)
-        color_options = set([so['value'] for v in variants for so in v['selectedOptions'] if so['name'] == option_name])
+        plans = self.variants_to_products_plan(product, option_name)
+        self.logger.info(f"converting {product_title} into {len(plans)} products: {[plan['option_value'] for plan in plans]}")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            new_product_ids = list(executor.map(lambda plan: self.variant_product_from_plan(product['id'], product_title, plan, option_name, new_status, reuse_media),
+                                                plans))
+        self.update_variation_products_metafields(new_product_ids)
+        return new_product_ids
 
-        new_product_ids = []
-        for color_option in color_options:
-            res = self.duplicate_product(product_id, product_title, True, new_status)
-            new_product = res['productDuplicate']['newProduct']
-            new_product_id = new_product['id']
-            self.logger.info(f"Duplicated product ID: {new_product_id}")
-            new_product_ids.append(new_product_id)
-            new_product_handle = '-'.join([product_handle, '-'.join(color_option.lower().split(' '))])
-            color_option_id = [o['id'] for o in new_product['options'] if o['name']==option_name]
-            assert len(color_option_id) == 1, f"{'Multiple' if color_option_id else 'No'} option {option_name} for {new_product_id}"
-            color_option_id = color_option_id[0]
-            new_variants = new_product['variants']['nodes']
-            variant_ids_to_keep = [v['id'] for v in new_variants if any(so['name']==option_name and so['value']==color_option for so in v['selectedOptions'])]
-            variant_ids_to_remove = [v['id'] for v in new_variants if v['id'] not in variant_ids_to_keep]
+    def variants_to_products_plan(self, product, option_name):
+        """
+        one entry per option value, worked out from a single read of the source variants and media:
+        the handle of the new product, the source media it keeps and the first media of each of its variants, by variant title.
+        """
+        variants = self.product_variants_by_product_id(product['id'])
+        medias = self.medias_by_product_id(product['id'])
+        media_ranges = variant_media_ranges(medias, variants)
+        plans = {}
+        for variant in variants:
+            for option_value in [so['value'] for so in variant['selectedOptions'] if so['name'] == option_name]:
+                plan = plans.setdefault(option_value, {
+                    'option_value': option_value,
+                    'handle': '-'.join([product['handle'], '-'.join(option_value.lower().split(' '))]),
+                    'media_count': len(medias),
+                    'media_positions': set(),
+                    'variant_media': {},
+                })
+                start, end = media_ranges[variant['id']]
+                plan['media_positions'].update(range(start, end))
+                plan['variant_media'][variant['title']] = medias[start]['id']
+        for plan in plans.values():
+            plan['media_ids'] = [medias[i]['id'] for i in sorted(plan['media_positions'])]
+        return list(plans.values())
 
-            self._remove_unrelated_medias(new_product_id, variant_ids_to_keep)
-            self.remove_product_variants(new_product_id, variant_ids_to_remove)
-            self.delete_product_options(new_product_id, [color_option_id])
-            self.update_product_handle(new_product_id, new_product_handle)
-            self.update_variation_value_metafield(new_product_id, color_option)
-            self.update_product_theme_template(new_product_id, 'variants-as-products')
+    def variant_product_from_plan(self, product_id, product_title, plan, option_name, new_status='DRAFT', reuse_media=True):
+        option_value = plan['option_value']
+        res = self.duplicate_product(product_id, product_title, not reuse_media, new_status)
+        new_product = res['productDuplicate']['newProduct']
+        new_product_id = new_product['id']
+        self.logger.info(f"Duplicated product ID: {new_product_id} for {option_value}")
+        option_id = [o['id'] for o in new_product['options'] if o['name'] == option_name]
+        assert len(option_id) == 1, f"{'Multiple' if option_id else 'No'} option {option_name} for {new_product_id}"
+        new_variants = new_product['variants']['nodes']
+        variant_ids_to_remove = [v['id'] for v in new_variants
+                                 if not any(so['name'] == option_name and so['value'] == option_value for so in v['selectedOptions'])]
 
-        for new_product_id in new_product_ids:
-            self.update_variation_products_metafield(new_product_id, new_product_ids)
+        if reuse_media:
+            self.add_file_references(plan['media_ids'], new_product_id)
+            if not self.wait_for_media_processing_completion(new_product_id):
+                raise RuntimeError(f"Error attaching media to {new_product_id}")
+            self.append_variant_media(new_product_id, {v['id']: plan['variant_media'][v['title']] for v in new_variants
+                                                       if v['id'] not in variant_ids_to_remove})
+        else:
+            new_medias = self.medias_by_product_id(new_product_id)      # same order as the source
+            assert len(new_medias) == plan['media_count'], f"{new_product_id} has {len(new_medias)} media, expected {plan['media_count']}"
+            if media_ids_to_remove := [m['id'] for i, m in enumerate(new_medias) if i not in plan['media_positions']]:
+                self.remove_product_media_by_product_id(new_product_id, media_ids_to_remove)
+        self.remove_product_variants(new_product_id, variant_ids_to_remove)
+        self.delete_product_options(new_product_id, option_id)
+        self.update_variant_product(new_product_id, plan['handle'], option_value)
+        return new_product_id
+
+    def update_variant_product(self, product_id, handle, variation_value, template_suffix='variants-as-products'):
+        """
+        handle, theme template and variation_value metafield of a product converted from a variant, in one productUpdate.
+        """
+        query = """
+        mutation productUpdate($input: ProductInput!) {
+            productUpdate(input: $input) {
+                product {
+                    id
+                    handle
+                    templateSuffix
+                }
+                userErrors {
+                    field
+                    message
+                }
+            }
+        }
+        """
+        variables = {
+            "input": {
+                "id": self.sanitize_id(product_id),
+                "handle": handle,
+                "templateSuffix": template_suffix,
+                "metafields": [{"namespace": "custom", "key": "variation_value", "value": variation_value}]
+            }
+        }
+        res = self.run_query(query, variables)
+        if res['productUpdate']['userErrors']:
+            raise RuntimeError(f"Failed to update the variant product: {res['productUpdate']['userErrors']}")
+        return res
 
     def duplicate_product(self, product_id, new_title, include_images=False, new_status='DRAFT'):
         query = """
@@ -84,12 +155,6 @@ class ProductVariantsToProducts:
             raise RuntimeError(f"Failed to duplicate the product: {res['productDuplicate']['userErrors']}")
         return res
 
-    def _remove_unrelated_medias(self, product_id, variant_ids_to_keep):
-        all_medias = self.medias_by_product_id(product_id)
-        keep_medias = self.medias_by_variant_id(variant_ids_to_keep[0])
-        media_ids_to_remove = [m['id'] for m in all_medias if m['id'] not in [km['id'] for km in keep_medias]]
-        self.remove_product_media_by_product_id(product_id, media_ids_to_remove)
-
     def remove_product_variants(self, product_id, variant_ids):
         query = """
         mutation bulkDeleteProductVariants($productId: ID!, $variantsIds: [ID!]!) {
@@ -0,0 +1,131 @@
+"""
+Read-through memoization of the GraphQL client's queries within a run.
+
+Results are keyed by the query with its whitespace collapsed and the variables, kept for ttl_seconds in an LRU of
+max_entries, and dropped when a mutation touches one of the GIDs they contain or were asked with. Search reads
+(a query: argument) are also dropped by mutations touching their resource type, since a change can add a match,
+and so are reads that found nothing. Concurrent callers of the same read share one request.
+"""
+import collections
+import copy
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+gid_expression = re.compile(r'gid://shopify/\w+/[^\s"\\?]+')
+mutation_expression = re.compile(r'^\s*mutation\b')
+search_expression = re.compile(r'\bquery\s*:')
+
+
+def gids(value):
+    return {match.group(0) for match in gid_expression.finditer(json.dumps(value))}
+
+
+def gid_type(gid):
+    return gid.split('/')[3]
+
+
+class CacheEntry:
+    def __init__(self, data, gids, search, expires_at):
+        self.data = data
+        self.gids = gids
+        self.types = {gid_type(gid) for gid in gids}
+        self.search = search
+        self.expires_at = expires_at
+
+
+class QueryCache:
+    """
+    unmodified_gid_types: resources the client's mutations only reference, e.g. the location of inventoryActivate,
+    so a cached location lookup survives the inventory changes made at it.
+    """
+    unmodified_gid_types = frozenset({'Location'})
+    # mutations whose changes cannot be read from their variables and payload
+    clearing_mutations = ('bulkOperationRunMutation',)
+
+    def __init__(self, ttl_seconds=300, max_entries=1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.in_flight = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(query, variables):
+        return ' '.join(query.split()), json.dumps(variables, sort_keys=True, default=str)
+
+    @staticmethod
+    def is_mutation(query):
+        return bool(mutation_expression.match(query))
+
+    def get_or_run(self, query, variables, run, refresh=False):
+        """
+        the cached data of the read, or run() shared with every concurrent caller of the same read.
+        refresh runs it regardless and replaces the cached data.
+        """
+        key = self.key(query, variables)
+        leader = False
+        with self.lock:
+            if not refresh and (entry := self.entries.get(key)) and entry.expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry.data)
+            if not refresh and (future := self.in_flight.get(key)):
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                future = Future()
+                self.in_flight.setdefault(key, future)
+                generation = self.generation
+                leader = True
+        if not leader:
+            return copy.deepcopy(future.result())
+        try:
+            data = run()
+        except BaseException as e:
+            with self.lock:
+                if self.in_flight.get(key) is future:
+                    del self.in_flight[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            if self.in_flight.get(key) is future:
+                del self.in_flight[key]
+            if generation == self.generation:      # no mutation while it ran, otherwise it may already be stale
+                self.entries[key] = CacheEntry(data, gids([query, variables, data]), bool(search_expression.search(query)),
+                                               time.monotonic() + self.ttl_seconds)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        future.set_result(data)
+        return copy.deepcopy(data)
+
+    def invalidate(self, query, variables, data):
+        """
+        drop the reads a mutation may have changed, from the GIDs of its variables and payload.
+        """
+        touched = {gid for gid in gids([query, variables, data]) if gid_type(gid) not in self.unmodified_gid_types}
+        types = {gid_type(gid) for gid in touched}
+        with self.lock:
+            self.generation += 1
+            if any(name in query for name in self.clearing_mutations):
+                self.entries.clear()
+                return
+            for key in [key for key, entry in self.entries.items()
+                        if entry.gids & touched or (entry.search and (entry.types & types or not entry.gids))]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced}
@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TagManagement:
+    """
+    Product tag index and diff-based tag updates with tagsAdd/tagsRemove. Inherited by the ShopifyGraphqlClient class.
+    """
+    def products_tags(self, query_string=None):
+        """
+        {product_id: {'title': ..., 'tags': [...]}} of all products matching the query (all products by default), paginated.
+        """
+        if self.catalog_mirror and (product_ids := self.catalog_mirror.refresh(self).product_ids_by_query(query_string)) is not None:
+            return {product['id']: {'title': product['title'], 'tags': product['tags']}
+                    for product in map(self.catalog_mirror.product_by_id, product_ids)}
+        query = """
+        query productsTags($query_string: String, $after: String) {
+            products(first: 250, query: $query_string, after: $after) {
+                nodes {
+                    id
+                    title
+                    tags
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+        """
+        variables = {'query_string': query_string, 'after': None}
+        res = {}
+        while True:
+            products = self.run_query(query, variables)['products']
+            res.update({node['id']: {'title': node['title'], 'tags': node['tags']} for node in products['nodes']})
+            if not products['pageInfo']['hasNextPage']:
+                break
+            variables['after'] = products['pageInfo']['endCursor']
+        self.logger.info(f'scanned tags of {len(res)} products')
+        return res
+
+    def tag_index(self, products_tags):
+        index = {}
+        for product_id, product in products_tags.items():
+            for tag in product['tags']:
+                index.setdefault(tag, set()).add(product_id)
+        return index
+
+    def tag_remapping_plan(self, tags_mapping, products_tags=None):
+        """
+        tags_mapping: {old tag: new tag}, a falsy new tag removes the old tag without a replacement.
+        returns {product_id: {'add': [...], 'remove': [...]}} for the products that need any change.
+        """
+        products_tags = products_tags if products_tags is not None else self.products_tags()
+        index = self.tag_index(products_tags)
+        plan = {}
+        for old_tag, new_tag in tags_mapping.items():
+            if old_tag == new_tag:
+                continue
+            for product_id in index.get(old_tag, ()):
+                changes = plan.setdefault(product_id, {'add': set(), 'remove': set()})
+                changes['remove'].add(old_tag)
+                if new_tag:
+                    changes['add'].add(new_tag)
+        res = {}
+        for product_id, changes in plan.items():
+            current_tags = set(products_tags[product_id]['tags'])
+            remove = changes['remove'] - changes['add']
+            # shopify matches tags case-insensitively, so a tag differing only in case from a removed one is re-added after the removal
+            removed_lower = {tag.lower() for tag in remove}
+            add = {tag for tag in changes['add'] if tag not in current_tags or tag.lower() in removed_lower}
+            if add or remove:
+                res[product_id] = {'add': sorted(add), 'remove': sorted(remove)}
+        return res
+
+    def update_tags_batch(self, tag_changes):
+        """
+        tag_changes: [(product_id, tags_to_add, tags_to_remove)]
+        all in one request of aliased mutations, run in order so each product's removal lands before its additions.
+        """
+        declarations = []
+        fields = []
+        variables = {}
+        for i, (product_id, add, remove) in enumerate(tag_changes):
+            declarations.append(f'$id{i}: ID!')
+            variables[f'id{i}'] = self.sanitize_id(product_id)
+            for operation, alias, tags in [('tagsRemove', 'remove', remove), ('tagsAdd', 'add', add)]:
+                if tags:
+                    declarations.append(f'${alias}{i}: [String!]!')
+                    variables[f'{alias}{i}'] = list(tags)
+                    fields.append(f'{alias}{i}: {operation}(id: $id{i}, tags: ${alias}{i}) {{ userErrors {{ field message }} }}')
+        query = 'mutation updateTags(%s) {\n%s\n}' % (', '.join(declarations), '\n'.join(fields))
+        res = self.run_query(query, variables)
+        if errors := [error for r in res.values() for error in r['userErrors']]:
+            raise RuntimeError(f"Failed to update the tags: {errors}")
+        return res
+
+    def apply_tag_changes(self, plan, batch_size=10, max_workers=5):
+        tag_changes = [(product_id, changes['add'], changes['remove']) for product_id, changes in plan.items()]
+        batches = [tag_changes[i:i + batch_size] for i in range(0, len(tag_changes), batch_size)]
+        self.logger.info(f'updating tags of {len(tag_changes)} products in {len(batches)} requests')
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.update_tags_batch, batches))
+
+    def tags_add(self, product_id, tags):
+        return self.update_tags_batch([(product_id, tags, [])])
+
+    def tags_remove(self, product_id, tags):
+        return self.update_tags_batch([(product_id, [], tags)])
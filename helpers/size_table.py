@@ -0,0 +1,232 @@
+import functools
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+def compact_table_html(headers, rows):
+    return ''.join(['<table><thead><tr>',
+                    ''.join(f'<th>{header}</th>' for header in headers),
+                    '</tr></thead><tbody>',
+                    ''.join('<tr>' + ''.join(f'<td>{value}</td>' for value in row) + '</tr>' for row in rows),
+                    '</tbody></table>'])
+
+
+def bordered_table_html(headers, rows):
+    return ''.join(['\n<table border="1" style="border-collapse: collapse; text-align: left;">\n  <thead>\n    <tr>',
+                    ''.join(f'\n      <th>{header}</th>' for header in headers),
+                    '\n    </tr>\n  </thead>\n  <tbody>',
+                    ''.join('\n    <tr>' + ''.join(f'\n      <td>{value}</td>' for value in row) + '\n    </tr>' for row in rows),
+                    '\n  </tbody>\n</table>'])
+
+
+class SizeTableGrammar:
+    """
+    A size text format: tells whether a text is written in it, parses it into headers and rows and renders the HTML.
+    """
+    name = None
+    renderer = staticmethod(compact_table_html)
+
+    def matches(self, source):
+        raise NotImplementedError
+
+    def parse(self, source):
+        raise NotImplementedError
+
+    def render(self, source):
+        headers, rows = self.parse(source)
+        return self.renderer(headers, rows)
+
+
+class SlashPairsGrammar(SizeTableGrammar):
+    """
+    着丈 84 / 肩幅 50
+    袖丈 60
+    """
+    name = 'slash_pairs'
+    separator_expression = re.compile('[\n/]')
+    pair_expression = re.compile(r'\S+ \S+')
+
+    def matches(self, source):
+        return all(self.pair_expression.fullmatch(kv_pair.strip()) for kv_pair in self.separator_expression.split(source))
+
+    def parse(self, source):
+        kv_pairs = [kv_pair.strip().split(' ') for kv_pair in self.separator_expression.split(source)]
+        if any(len(kv_pair) != 2 for kv_pair in kv_pairs):
+            raise ValueError(f'Invalid size text format: {source}')
+        headers, values = zip(*kv_pairs)
+        return headers, [values]
+
+
+class MeasurementLinesGrammar(SizeTableGrammar):
+    """
+    Width(cm) 30
+    Height(cm) 20
+    350g
+    """
+    name = 'measurement_lines'
+    line_expression = re.compile(r'(?:.*\S )?\S+')
+
+    def lines(self, source):
+        return [line for line in map(str.strip, source.split('\n')) if line]
+
+    def matches(self, source):
+        lines = self.lines(source)
+        return bool(lines) and all(self.line_expression.fullmatch(line) for line in lines)
+
+    def parse(self, source):
+        kv_pairs = [line.rsplit(' ', 1) for line in self.lines(source)]
+        kv_pairs = [pair if len(pair) == 2 else ['Weight', pair[0]] for pair in kv_pairs]
+        return [header.replace(')', '') for header, _ in kv_pairs], [[value for _, value in kv_pairs]]
+
+
+class BracketedSizesGrammar(SizeTableGrammar):
+    """
+    [0] 着丈 84 / 肩幅 xxx / 袖丈 yyy
+    [1] 着丈 90 / 肩幅 xxx / 袖丈 yyy
+    """
+    name = 'bracketed_sizes'
+    renderer = staticmethod(bordered_table_html)
+    size_expression = re.compile(r"\[(\w+)\]\s+(.*)")
+
+    def matches(self, source):
+        return all(self.size_expression.match(line.strip()) for line in source.strip().split('\n'))
+
+    def parse(self, source):
+        headers = ['Size']
+        rows = []
+        for line in source.strip().split('\n'):
+            match = self.size_expression.match(line.strip())
+            if not match:
+                raise RuntimeError(f"Invalid size text format: {line}")
+            row_values = [match.group(1)]
+            for header_value in match.group(2).split(' / '):
+                header, value = header_value.split(' ')
+                if header.strip() not in headers:
+                    headers.append(header.strip())
+                row_values.append(value.strip())
+            rows.append(row_values)
+        return headers, rows
+
+
+class SizeDictGrammar(SizeTableGrammar):
+    """
+    {'S': '高さ：10\\n直径：8', 'L': '高さ：12\\n直径：9'}, passed around as a tuple of items once cached.
+    """
+    name = 'size_dict'
+    renderer = staticmethod(bordered_table_html)
+
+    def matches(self, source):
+        return isinstance(source, (dict, tuple))
+
+    def parse(self, source):
+        headers = ['Size']
+        rows = []
+        for size, size_text in dict(source).items():
+            row_values = [size]
+            for header_value in size_text.split('\n'):
+                header, value = header_value.split('：')
+                if header.strip() not in headers:
+                    headers.append(header.strip())
+                row_values.append(value.strip())
+            rows.append(row_values)
+        return headers, rows
+
+
+class SizeChartGrammar(SizeTableGrammar):
+    """
+    Free-form size charts: one or more tables, each introduced by a header line, followed by notes.
+
+    サイズ  着丈  胸囲
+    S  60  50
+    M  62  52
+    ※ 平置き採寸です
+    """
+    name = 'size_chart'
+    table_expression = re.compile(r"(.*\n)((?:[\S\d]+\s+[\d\.\sm]*\n)+)$", re.MULTILINE)
+    header_separator_expression = re.compile(r'\s{2,}')
+    value_separator_expression = re.compile(r'\s+')
+
+    def matches(self, source):
+        return isinstance(source, str)
+
+    @staticmethod
+    def is_digit(s):
+        try:
+            float(s.replace('mm', ''))
+            return True
+        except ValueError:
+            return False
+
+    def convert_to_html_table(self, header_text, rows_text):
+        category = ''
+        headers = self.header_separator_expression.split(header_text.strip())
+        rows = [r.strip() for r in rows_text.split('\n') if r.strip()]
+        first_row_values = self.value_separator_expression.split(rows[0])
+        values_length = len([v for v in first_row_values[1:] if self.is_digit(v)])
+
+        if len(headers) > values_length:
+            assert len(headers) == values_length + 1, 'length of the headers and row values does not agree'
+            category = headers[0]
+            headers = headers[1:]
+
+        if len(headers) < len(first_row_values):
+            headers = [""] + headers
+
+        table_html = ''.join(["<table border='1'><thead><tr>",
+                              ''.join(f"<th>{header}</th>" for header in headers),
+                              "</tr></thead><tbody>",
+                              ''.join("<tr>" + ''.join(f"<td>{value}</td>" for value in self.value_separator_expression.split(row.strip())) + "</tr>" for row in rows),
+                              "</tbody></table>"])
+        return category, table_html
+
+    def render(self, source):
+        text = '\n'.join(p.strip() for p in source.replace('　', '  ').split('\n')) + '\n'
+        table_matches = self.table_expression.findall(text)
+        remaining_text = self.table_expression.sub("", text).strip()
+        paragraphs = [p.strip() for p in remaining_text.split("\n") if p.strip()]
+
+        res = []
+        for match in table_matches:
+            try:
+                category, table_html = self.convert_to_html_table(match[0], match[1])
+            except AssertionError as e:
+                logger.error(f"!!!! Error: {e}")
+                continue
+            header = f'<h4>{category}</h4>' if len(table_matches) > 1 else ''
+            res.append(f"{header}{table_html}\n\n")
+        for paragraph in paragraphs:
+            if paragraph := paragraph.split():
+                res.append(f"<p>{' '.join(paragraph)}</p>\n")
+        return ''.join(res)
+
+
+# in the order auto-detection tries them, size_chart being the catch-all
+grammars = {grammar.name: grammar for grammar in [SizeDictGrammar(),
+                                                  BracketedSizesGrammar(),
+                                                  SlashPairsGrammar(),
+                                                  MeasurementLinesGrammar(),
+                                                  SizeChartGrammar()]}
+
+
+def detect_format(source):
+    for grammar in grammars.values():
+        if grammar.matches(source):
+            return grammar.name
+    raise ValueError(f'Unknown size text format: {source}')
+
+
+@functools.lru_cache(maxsize=4096)
+def _size_table_html(source, size_format):
+    return grammars[size_format or detect_format(source)].render(source)
+
+
+def size_table_html(source, size_format=None):
+    """
+    render a size text as HTML, detecting the format unless given.
+    results are cached by the input text, so the same size text across a batch is parsed once.
+    """
+    if isinstance(source, dict):
+        source = tuple(source.items())
+    return _size_table_html(source, size_format)
@@ -1,7 +1,7 @@
 import logging
-import re
 import string
 import utils
+from helpers.size_table import size_table_html
 
 logging.basicConfig(level=logging.INFO)
 
@@ -31,18 +31,7 @@ def product_info_lists_from_sheet(gai:utils.Client, sheet_id, sheet_name):
                                 option1_attrs, option2_attrs)
 
 def get_size_table_html(size_text):
-    lines = list(filter(None, map(str.strip, size_text.split('\n'))))
-    kv_pairs = [line.rsplit(' ', 1) for line in lines]
-    kv_pairs = [pair if len(pair) == 2 else ['Weight', pair[0]] for pair in kv_pairs]
-    headers, values = zip(*kv_pairs)
-    res = '<table><thead><tr>'
-    for header in headers:
-        res += f'<th>{header.replace(')', '')}</th>'
-    res += '</tr></thead><tbody><tr>'
-    for value in values:
-        res += f'<td>{value}</td>'
-    res += '</tr></tbody></table>'
-    return res
+    return size_table_html(size_text, 'measurement_lines')
 
 def get_description_html(sgc:utils.Client, description, material, size_text, made_in):
     product_care = '''革表面に跡や汚れなどが残る場合がありますが、天然皮革の特徴である不良ではございませんのでご了承ください。また、時間経過により金属の装飾や革の色が変化する場合がございますが、製品の欠陥ではありません。あらかじめご了承ください。
@@ -65,7 +54,7 @@ def create_a_product(sgc:utils.Client, product_info, vendor, description_html_ma
                              handle=product_info['handle'],
                              description_html=description_html,
                              vendor=vendor, tags=tags, option_lists=options)
-    res2 = [sgc.enable_and_activate_inventory(variant_info['sku'], []) for variant_info in product_info['options']]
+    res2 = sgc.enable_and_activate_inventories([variant_info['sku'] for variant_info in product_info['options']], [])
     return (res, res2)
 
 def create_products(sgc:utils.Client, product_info_list, vendor):
@@ -4,6 +4,7 @@ import utils
 import re
 
 IMAGES_LOCAL_DIR = '/Users/taro/Downloads/rawrowr20250418/'
+# ignored by upload_and_assign_description_images_to_shopify, still passed as its positional dummy_product_id
 DUMMY_PRODUCT = 'gid://shopify/Product/8773753700593'
 SHOPIFY_FILE_URL_PREFIX = 'https://cdn.shopify.com/s/files/1/0726/9187/6081/'
 
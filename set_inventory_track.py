@@ -13,12 +13,11 @@ def main():
     location_names = ['Archivépke Warehouse', 'Envycube Warehouse']
     aw_location_id = client.location_id_by_name(location_names[0])
 
-    for row in rows[2:]:
-        sku = row[string.ascii_lowercase.index('e')]
+    sku_quantity_map = {row[string.ascii_lowercase.index('e')]: int(row[string.ascii_lowercase.index('m')]) for row in rows[2:]}
+    res = client.enable_and_activate_inventories(list(sku_quantity_map), location_names)
+    pprint.pprint(res)
+    for sku, quantity in sku_quantity_map.items():
         print(sku)
-        res = client.enable_and_activate_inventory(sku, location_names)
-        pprint.pprint(res)
-        quantity = int(row[string.ascii_lowercase.index('m')])
         res = client.set_inventory_quantity_by_sku_and_location_id(sku, aw_location_id, quantity)
         pprint.pprint(res)
 
@@ -0,0 +1,195 @@
+"""
+Run the same job on several shops at once, one worker process per shop.
+
+    python shop_jobs.py tag-audit rohseoul kumej gbhjapan
+    python shop_jobs.py tag-remap all --param mapping_path=tags_mapping.json --param dry_run=true
+    python shop_jobs.py stock-sync kumej archive-epke --param sheet_title=25ss --param sku_column=E --param quantity_column=M \
+        --param start_row=3 --param location_name='Shop location'
+    python shop_jobs.py mymodule:my_job rohseoul kumej      # any function taking (client, **params)
+
+Each worker builds its own client with utils.client, so every shop spends its own throttle budget and the total wall
+time is that of the slowest shop. Log lines of the workers are streamed prefixed with their shop, and a table of the
+status, time, requests and query cost of every shop is printed at the end.
+"""
+import importlib
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import string
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+shop_names = ['rohseoul', 'kumej', 'gbhjapan', 'alvanas', 'rawrowr', 'archive-epke', 'apricot-studios']
+jobs = {}
+
+
+def job(name):
+    def register(func):
+        jobs[name] = func
+        return func
+    return register
+
+
+def column_index(column):
+    return string.ascii_uppercase.index(column.upper()) if isinstance(column, str) else column
+
+
+@job('tag-audit')
+def tag_audit(client):
+    products_tags = client.products_tags()
+    return {'products': len(products_tags), 'tags': len(client.tag_index(products_tags))}
+
+
+@job('tag-remap')
+def tag_remap(client, mapping_path, dry_run=False):
+    """
+    mapping_path: a JSON file of {old tag: new tag}, as in update_tags.py.
+    """
+    with open(mapping_path, encoding='utf-8') as f:
+        tags_mapping = json.load(f)
+    plan = client.tag_remapping_plan(tags_mapping)
+    if not dry_run:
+        client.apply_tag_changes(plan)
+    return {'products_changed': len(plan), 'dry_run': dry_run}
+
+
+@job('price-audit')
+def price_audit(client, sheet_title, key_column, price_column, start_row, on='sku', sheet_id=None):
+    rows = client.worksheet_rows(sheet_id or client.sheet_id, sheet_title)
+    sheet_prices = [{on: row[column_index(key_column)], 'price': row[column_index(price_column)]} for row in rows[start_row:]]
+    diff = client.price_diff(sheet_prices, on=on)
+    return {'checked': len(sheet_prices), 'different': len(diff)}
+
+
+@job('stock-sync')
+def stock_sync(client, sheet_title, sku_column, quantity_column, start_row, location_name, sheet_id=None):
+    """
+    set the available quantity of every sku of the sheet at the location, as set_inventory_quantity.py does.
+    """
+    rows = client.worksheet_rows(sheet_id or client.sheet_id, sheet_title)
+    sku_quantity_map = {}
+    for row in rows[start_row:]:
+        if sku := row[column_index(sku_column)].strip():
+            assert sku not in sku_quantity_map, f'same sku found in multiple rows!!: {row}'
+            sku_quantity_map[sku] = int(row[column_index(quantity_column)])
+    location_id = client.location_id_by_name(location_name)
+    changes = client.set_inventory_quantities_by_skus_and_location_id(sku_quantity_map, location_id)
+    return {'skus': len(sku_quantity_map), 'updated': len(changes)}
+
+
+def resolve_job(name):
+    """
+    a registered job, or 'module:function' imported in the worker.
+    """
+    if name in jobs:
+        return jobs[name]
+    module_name, _, func_name = name.partition(':')
+    assert func_name, f'unknown job {name}, expected one of {sorted(jobs)} or module:function'
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def default_client(shop_name):
+    import utils
+    return utils.client(shop_name)
+
+
+class ShopFilter(logging.Filter):
+    def __init__(self, shop_name):
+        super().__init__()
+        self.shop_name = shop_name
+
+    def filter(self, record):
+        record.shop = self.shop_name
+        return True
+
+
+def run_shop(job_name, shop_name, params, log_queue, client_factory):
+    """
+    the job for one shop in a worker process, its logs sent to log_queue tagged with the shop.
+    """
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.handlers[0].addFilter(ShopFilter(shop_name))
+    root.setLevel(logging.INFO)
+    started = time.perf_counter()
+    res = {'shop': shop_name, 'status': 'ok', 'result': None, 'error': None}
+    instrumentation = None
+    try:
+        client = client_factory(shop_name)
+        instrumentation = client.instrument(report_at_exit=False)
+        res['result'] = resolve_job(job_name)(client, **params)
+    except Exception as e:
+        logging.getLogger(__name__).error(traceback.format_exc())
+        res.update(status='error', error=f'{type(e).__name__}: {e}')
+    operations = instrumentation.summary() if instrumentation else []
+    res.update(seconds=round(time.perf_counter() - started, 2),
+               requests=sum(row['calls'] for row in operations),
+               actual_cost=sum(row['actual_cost'] for row in operations),
+               throttle_wait_s=round(sum(row['throttle_wait_s'] for row in operations), 2))
+    return res
+
+
+def run_job(job_name, shops, params=None, max_workers=None, client_factory=default_client):
+    """
+    run the job on every shop in parallel worker processes, returning one result row per shop in the order given.
+    client_factory(shop_name) builds the client in the worker, it has to be importable by the worker.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('[%(shop)s] %(levelname)s %(name)s: %(message)s'))
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager:
+        log_queue = manager.Queue()
+        listener = logging.handlers.QueueListener(log_queue, handler)
+        listener.start()
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers or len(shops), mp_context=context) as executor:
+                futures = {executor.submit(run_shop, job_name, shop_name, params or {}, log_queue, client_factory): shop_name
+                           for shop_name in shops}
+                results = {}
+                for future in as_completed(futures):
+                    results[futures[future]] = res = future.result()
+                    logger.info(f"{res['shop']} finished {res['status']} in {res['seconds']}s")
+        finally:
+            listener.stop()
+    return [results[shop_name] for shop_name in shops]
+
+
+def results_table(results):
+    columns = ['shop', 'status', 'seconds', 'requests', 'actual_cost', 'throttle_wait_s', 'result']
+    rows = [[str(res['error'] if column == 'result' and res['error'] else res[column]) for column in columns] for res in results]
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+    return '\n'.join('  '.join(value.ljust(width) for value, width in zip(row, widths)) for row in [columns] + rows)
+
+
+def parse_param(text):
+    key, _, value = text.partition('=')
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Run a job on several shops in parallel.')
+    parser.add_argument('job', help=f"one of {', '.join(sorted(jobs))}, or module:function")
+    parser.add_argument('shops', nargs='+', help=f"shop names, or all for {', '.join(shop_names)}")
+    parser.add_argument('--param', action='append', default=[], type=parse_param, help='key=value passed to the job, values parsed as JSON when they are')
+    parser.add_argument('--max-workers', type=int)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    shops = shop_names if args.shops == ['all'] else args.shops
+    started = time.perf_counter()
+    results = run_job(args.job, shops, dict(args.param), args.max_workers)
+    print(results_table(results))
+    print(f'{len(shops)} shops in {time.perf_counter() - started:.1f}s')
+    if any(res['status'] != 'ok' for res in results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
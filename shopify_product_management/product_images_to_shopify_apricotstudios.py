@@ -71,6 +71,7 @@ def main():
     IMAGES_LOCAL_DIR = '/Users/taro/Downloads/apricotstudios_20250304/'
     GSPREAD_ID = '1yVzpgcrgNR7WxUYfotEnhYFMbc79l1O4rl9CamB2Kqo'
     SHEET_TITLE = 'Products Master'
+    # ignored by upload_and_assign_description_images_to_shopify, still passed as its positional dummy_product_id
     DUMMY_PRODUCT = 'gid://shopify/Product/9032277197056'
 
     sgc = ShopifyGraphqlClient(SHOPNAME, ACCESS_TOKEN)
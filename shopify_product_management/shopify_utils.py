@@ -23,6 +23,7 @@ def update_product_description(shop_name, access_token, product_id, desc):
 def update_product_handle(shop_name, access_token, product_id, handle):
     return update_product_attribute(shop_name, access_token, product_id, 'handle', handle)
 
+# dummy_product_id is ignored, kept so the positional arguments of existing callers still line up
 def upload_and_assign_description_images_to_shopify(shop_name, access_token, product_id, local_paths, dummy_product_id, shopify_url_prefix):
     return ShopifyGraphqlClient(shop_name, access_token).upload_and_assign_description_images_to_shopify(product_id, local_paths, dummy_product_id, shopify_url_prefix)
 
@@ -213,13 +214,13 @@ def product_by_title(shop_name, access_token, title):
     return product_by_query(shop_name, access_token, f"title:'{title}'")
 
 def product_id_by_title(shop_name, access_token, title):
-    return product_by_title(shop_name, access_token, title)['id']
+    return ShopifyGraphqlClient(shop_name, access_token).product_id_by_title(title)
 
 def product_by_handle(shop_name, access_token, handle):
     return product_by_query(shop_name, access_token, f"handle:'{handle}'")
 
 def product_id_by_handle(shop_name, access_token, handle):
-    return product_by_handle(shop_name, access_token, handle)['id']
+    return ShopifyGraphqlClient(shop_name, access_token).product_id_by_handle(handle)
 
 def medias_by_product_id(shop_name, access_token, product_id):
     return ShopifyGraphqlClient(shop_name, access_token).medias_by_product_id(product_id)
@@ -0,0 +1,78 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from helpers.shopify_graphql_client.client import ShopifyGraphqlClient
+
+
+def bulk_operation(status, url=None, partial_data_url=None):
+    return {'node': {'id': 'gid://shopify/BulkOperation/1', 'status': status, 'errorCode': None, 'objectCount': '2',
+                     'url': url, 'partialDataUrl': partial_data_url}}
+
+
+def result_response(lines):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.iter_lines.return_value = [json.dumps(line).encode() for line in lines]
+    return response
+
+
+def staged_responses():
+    return [
+        {'stagedUploadsCreate': {'stagedTargets': [{'url': 'https://upload', 'resourceUrl': None,
+                                                    'parameters': [{'name': 'key', 'value': 'tmp/bulk_op_vars.jsonl'}]}],
+                                 'userErrors': []}},
+        {'bulkOperationRunMutation': {'bulkOperation': {'id': 'gid://shopify/BulkOperation/1', 'status': 'CREATED'}, 'userErrors': []}},
+    ]
+
+
+@patch('helpers.shopify_graphql_client.bulk_operations.time.sleep')
+@patch('helpers.shopify_graphql_client.bulk_operations.requests')
+@patch.object(ShopifyGraphqlClient, 'run_query')
+class TestBulkOperations(unittest.TestCase):
+
+    def setUp(self):
+        self.sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        self.product_inputs = [{'id': f'gid://shopify/Product/{i}', 'tags': ['new']} for i in range(3)]
+
+    def test_report_per_line_number(self, mock_run_query, mock_requests, mock_sleep):
+        mock_requests.post.return_value.status_code = 201
+        mock_run_query.side_effect = staged_responses() + [bulk_operation('RUNNING'), bulk_operation('COMPLETED', url='https://results')]
+        mock_requests.get.return_value = result_response([
+            {'data': {'productUpdate': {'product': None, 'userErrors': [{'field': ['tags'], 'message': 'invalid'}]}}, '__lineNumber': 2},
+            {'data': {'productUpdate': {'product': {'id': 'gid://shopify/Product/0'}, 'userErrors': []}}, '__lineNumber': 0},
+        ])
+        report = self.sgc.bulk_update_products(self.product_inputs)
+
+        self.assertEqual([row['line_number'] for row in report], [0, 1, 2])
+        self.assertEqual([row['success'] for row in report], [True, False, False])
+        self.assertEqual(report[1]['errors'], ['no result'])
+        self.assertEqual(report[2]['errors'], [{'field': ['tags'], 'message': 'invalid'}])
+        self.assertEqual(report[0]['variables'], {'input': self.product_inputs[0]})
+        self.assertEqual(mock_requests.get.call_args.args[0], 'https://results')
+
+    def test_failed_operation_reports_partial_results(self, mock_run_query, mock_requests, mock_sleep):
+        mock_requests.post.return_value.status_code = 201
+        mock_run_query.side_effect = staged_responses() + [bulk_operation('FAILED', partial_data_url='https://partial')]
+        mock_requests.get.return_value = result_response([
+            {'data': {'productUpdate': {'product': {'id': 'gid://shopify/Product/1'}, 'userErrors': []}}, '__lineNumber': 1},
+        ])
+        report = self.sgc.bulk_update_products(self.product_inputs)
+
+        self.assertEqual([row['success'] for row in report], [False, True, False])
+        self.assertEqual(mock_requests.get.call_args.args[0], 'https://partial')
+
+    def test_failed_operation_without_results_raises(self, mock_run_query, mock_requests, mock_sleep):
+        mock_requests.post.return_value.status_code = 201
+        mock_run_query.side_effect = staged_responses() + [bulk_operation('FAILED')]
+        with self.assertRaises(RuntimeError):
+            self.sgc.bulk_update_products(self.product_inputs)
+
+    def test_canceling_polled_until_canceled(self, mock_run_query, mock_requests, mock_sleep):
+        mock_run_query.side_effect = [bulk_operation('CANCELING'), bulk_operation('CANCELING'), bulk_operation('CANCELED')]
+        res = self.sgc.wait_for_bulk_operation_completion('gid://shopify/BulkOperation/1')
+        self.assertEqual(res['status'], 'CANCELED')
+        self.assertEqual(mock_run_query.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
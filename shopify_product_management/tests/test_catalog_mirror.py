@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import patch
+from helpers import catalog_mirror
+from helpers.fake_shopify import FakeShopifyServer, FakeShopifyStore
+from helpers.fake_shopify.graphql import requested_cost
+from helpers.shopify_graphql_client.client import ShopifyGraphqlClient
+
+
+def bulk_export_lines():
+    return iter([
+        {'id': 'gid://shopify/Product/1', 'title': "Medium Mug Bag", 'handle': 'medium-mug-bag', 'status': 'ACTIVE', 'vendor': 'rohseoul',
+         'productType': '', 'descriptionHtml': '<p>bag</p>', 'templateSuffix': None, 'updatedAt': '2025-04-01T00:00:00Z',
+         'tags': ['new', 'BAG'], 'options': [{'name': 'カラー', 'position': 1, 'values': ['Black']}]},
+        {'id': 'gid://shopify/ProductVariant/11', 'position': 1, 'title': 'Black', 'sku': 'RS-MUG-BLK', 'price': '23100', 'compareAtPrice': None,
+         'inventoryItem': {'id': 'gid://shopify/InventoryItem/111'}, 'selectedOptions': [{'name': 'カラー', 'value': 'Black'}],
+         '__parentId': 'gid://shopify/Product/1'},
+        {'id': 'gid://shopify/MediaImage/12', 'alt': 'b1', 'mediaContentType': 'IMAGE', 'status': 'READY',
+         'image': {'url': 'https://cdn.shopify.com/b1.jpg'}, '__parentId': 'gid://shopify/Product/1'},
+        {'id': 'gid://shopify/Metafield/13', 'namespace': 'custom', 'key': 'size_table_html', 'type': 'multi_line_text_field',
+         'value': '<table></table>', '__parentId': 'gid://shopify/Product/1'},
+        {'id': 'gid://shopify/Product/2', 'title': "Pulpy bag", 'handle': 'pulpy-bag', 'status': 'DRAFT', 'vendor': 'rohseoul',
+         'productType': '', 'descriptionHtml': '', 'templateSuffix': None, 'updatedAt': '2025-04-02T00:00:00Z',
+         'tags': ['BAG'], 'options': []},
+    ])
+
+
+class TestCatalogMirror(unittest.TestCase):
+
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    @patch.object(ShopifyGraphqlClient, 'run_bulk_query')
+    def test_products_by_query_from_mirror(self, mock_run_bulk_query, mock_run_query):
+        mock_run_bulk_query.return_value = bulk_export_lines()
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        mirror = sgc.use_catalog_mirror(':memory:')
+
+        self.assertEqual(mirror.last_updated_at(), '2025-04-02T00:00:00Z')
+        self.assertEqual(sgc.product_id_by_title('medium mug bag'), 'gid://shopify/Product/1')
+        self.assertEqual([p['id'] for p in sgc.products_by_tag('BAG')], ['gid://shopify/Product/1', 'gid://shopify/Product/2'])
+        self.assertEqual(sgc.product_by_query("title:Medium* status:active", additional_fields=['status'])['status'], 'ACTIVE')
+        product = sgc.product_by_handle('medium-mug-bag')
+        self.assertEqual(product['variants']['nodes'][0]['selectedOptions'], [{'name': 'カラー', 'value': 'Black'}])
+        self.assertEqual(product['metafields']['nodes'][0]['value'], '<table></table>')
+        self.assertEqual(sgc.product_id_by_sku('RS-MUG-BLK'), 'gid://shopify/Product/1')
+        mock_run_query.assert_not_called()
+
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    @patch.object(ShopifyGraphqlClient, 'run_bulk_query')
+    def test_profiles_from_mirror(self, mock_run_bulk_query, mock_run_query):
+        mock_run_bulk_query.return_value = bulk_export_lines()
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        sgc.use_catalog_mirror(':memory:')
+
+        self.assertEqual(sgc.product_by_id('gid://shopify/Product/1', profile='ids'), {'id': 'gid://shopify/Product/1'})
+        self.assertEqual(sgc.products_by_tag('BAG', profile='summary')[1],
+                         {'id': 'gid://shopify/Product/2', 'title': 'Pulpy bag', 'handle': 'pulpy-bag', 'status': 'DRAFT',
+                          'vendor': 'rohseoul', 'productType': '', 'tags': ['BAG']})
+        self.assertEqual(sgc.product_by_handle('medium-mug-bag', profile='pricing')['variants']['nodes'],
+                         [{'id': 'gid://shopify/ProductVariant/11', 'sku': 'RS-MUG-BLK', 'price': '23100', 'compareAtPrice': None}])
+        self.assertEqual(set(sgc.product_by_id('gid://shopify/Product/1')), {'id', 'title', 'handle', 'tags', 'metafields', 'variants'})
+        mock_run_query.assert_not_called()
+
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    @patch.object(ShopifyGraphqlClient, 'run_bulk_query')
+    def test_unsupported_query_falls_back_to_shopify(self, mock_run_bulk_query, mock_run_query):
+        mock_run_bulk_query.return_value = bulk_export_lines()
+        mock_run_query.return_value = {'products': {'nodes': [], 'pageInfo': {'hasNextPage': False, 'endCursor': None}}}
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        sgc.use_catalog_mirror(':memory:')
+
+        self.assertEqual(sgc.products_by_query("vendor:rohseoul"), [])
+        mock_run_query.assert_called_once()
+
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    @patch.object(ShopifyGraphqlClient, 'run_bulk_query')
+    def test_sync_includes_the_last_second(self, mock_run_bulk_query, mock_run_query):
+        mock_run_bulk_query.side_effect = [bulk_export_lines(), iter([])]
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        sgc.use_catalog_mirror(':memory:').sync(sgc)
+        self.assertIn('products(query: "updated_at:>=\'2025-04-02T00:00:00Z\'")', mock_run_bulk_query.call_args.args[0])
+        mock_run_query.assert_not_called()
+
+    def test_refresh_within_query_cost_limit(self):
+        ids = [f'gid://shopify/Product/{i}' for i in range(catalog_mirror.refresh_chunk_size)]
+        self.assertLessEqual(requested_cost(catalog_mirror.products_by_ids_query, {'ids': ids}), 1000)
+
+    def test_refresh_syncs_products_too_large_to_read_by_id(self):
+        server = FakeShopifyServer(FakeShopifyStore(media_processing_seconds=0, bulk_operation_seconds=0)).start()
+        self.addCleanup(server.stop)
+        product_id = server.store.seed(products=1, variants_per_product=2, media_per_product=60)[0]
+        sgc = server.client()
+        mirror = sgc.use_catalog_mirror(':memory:')
+        self.addCleanup(mirror.close)
+
+        sgc.tags_add(product_id, ['large'])
+        product = sgc.products_by_tag('large')[0]
+        self.assertEqual(mirror.connection.execute('SELECT COUNT(*) FROM media WHERE product_id = ?', (product_id,)).fetchone()[0], 60)
+        self.assertEqual(len(product['variants']['nodes']), 2)
+
+    def test_own_mutations_seen_by_mirror_reads(self):
+        server = FakeShopifyServer(FakeShopifyStore(media_processing_seconds=0, bulk_operation_seconds=0)).start()
+        self.addCleanup(server.stop)
+        server.store.seed(products=3, variants_per_product=2)
+        sgc = server.client()
+        mirror = sgc.use_catalog_mirror(':memory:')
+        self.addCleanup(mirror.close)
+        product_id = sgc.product_id_by_title('Product 00000')
+
+        sgc.tags_add(product_id, ['mirrored'])
+        self.assertEqual([p['id'] for p in sgc.products_by_tag('mirrored')], [product_id])
+        created = sgc.product_create('New', '', 'Vendor', [], option_lists=[[{'Color': 'Black'}, 100, 'NEW-BLK']])
+        self.assertEqual(sgc.product_id_by_sku('NEW-BLK'), created['id'])
+        requests = server.requests
+        sgc.product_id_by_title('Product 00001')
+        self.assertEqual(server.requests, requests)
+
+
+if __name__ == '__main__':
+    unittest.main()
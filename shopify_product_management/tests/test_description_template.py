@@ -0,0 +1,42 @@
+import gc
+import unittest
+import weakref
+from unittest.mock import patch
+from helpers.description_template import DescriptionTemplate, compiled_template, escape_html
+
+
+class TestDescriptionTemplate(unittest.TestCase):
+
+    def test_escape_html(self):
+        result = escape_html('<b>Tom & Jerry\'s "bag"</b>\nline')
+        self.assertEqual(result, '&lt;b&gt;Tom &amp; Jerry&#039;s &quot;bag&quot;&lt;/b&gt;<br>line')
+
+    def test_render_keeps_unknown_placeholders(self):
+        template = DescriptionTemplate('<p>${DESCRIPTION}</p><td>${MATERIAL}</td>')
+        self.assertEqual(template.render(DESCRIPTION='desc'), '<p>desc</p><td>${MATERIAL}</td>')
+
+    def test_get_description_html_by_shop(self):
+        from helpers.shopify_graphql_client import ShopifyGraphqlClient
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        result = sgc.get_description_html('desc & more', 'care', 'cotton', '着丈 84 / 肩幅 50', 'Korea')
+        self.assertIn('<p>desc &amp; more</p>', result)
+        self.assertIn('<table><thead><tr><th>着丈</th><th>肩幅</th></tr></thead><tbody><tr><td>84</td><td>50</td></tr></tbody></table>', result)
+        self.assertNotIn('${', result)
+        self.assertIs(compiled_template('alvana'), compiled_template('alvana'))
+
+    def test_size_tables_memoized_without_keeping_clients(self):
+        from helpers.shopify_graphql_client import ShopifyGraphqlClient
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        client_ref = weakref.ref(sgc)
+        html = sgc.get_description_html('desc', 'care', 'cotton', '着丈 85 / 肩幅 51', 'Korea')
+        del sgc
+        gc.collect()
+        self.assertIsNone(client_ref())
+        other = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        with patch('helpers.shopify_graphql_client.product_create.size_table_html') as mock_size_table_html:
+            self.assertEqual(other.get_description_html('desc', 'care', 'cotton', '着丈 85 / 肩幅 51', 'Korea'), html)
+        mock_size_table_html.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from helpers import dropbox_utils
+
+
+def zip_bytes(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+class SharedLinkHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body, etag = self.server.links[self.path.split('?', 1)[0]]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestDropboxUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), SharedLinkHandler)
+        self.server.links = {
+            '/main': (zip_bytes({'2.jpg': b'main2', '1.jpg': b'main1', '__MACOSX/._1.jpg': b'', '../escape.jpg': b'x'}), '"v1"'),
+            '/detail': (zip_bytes({'detail.jpg': b'detail'}), '"v1"'),
+            '/sku': (zip_bytes({'black.jpg': b'black'}), '"v1"'),
+        }
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.tmp = tempfile.TemporaryDirectory()
+        self.product_dir = os.path.join(self.tmp.name, 'product')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_direct_link(self):
+        self.assertEqual(dropbox_utils.direct_link('https://www.dropbox.com/scl/fo/abc?rlkey=k&dl=0'), 'https://www.dropbox.com/scl/fo/abc?rlkey=k&dl=1')
+
+    def test_download_files_in_parallel_and_skip_unchanged_links(self):
+        res = dropbox_utils.download_files(self.product_dir, f'{self.url}/main?dl=0', f'{self.url}/detail?dl=0', {'SKU-BLK': f'{self.url}/sku?dl=0'})
+        self.assertEqual([os.path.basename(path) for path in res['product_main']], ['product_main_00_1.jpg', 'product_main_01_2.jpg'])
+        self.assertEqual([os.path.basename(path) for path in res['SKU-BLK']], ['SKU-BLK_00_black.jpg'])
+        self.assertEqual(sorted(name for name in os.listdir(self.product_dir) if name.startswith('.')), [dropbox_utils.manifest_name])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'escape.jpg')))
+
+        modified = os.path.getmtime(res['product_details'][0])
+        self.server.links['/sku'] = (zip_bytes({'black.jpg': b'black2'}), '"v2"')
+        again = dropbox_utils.download_files(self.product_dir, f'{self.url}/main?dl=0', f'{self.url}/detail?dl=0', {'SKU-BLK': f'{self.url}/sku?dl=0'})
+        self.assertEqual(again, res)
+        self.assertEqual(os.path.getmtime(res['product_details'][0]), modified)
+        with open(again['SKU-BLK'][0], 'rb') as f:
+            self.assertEqual(f.read(), b'black2')
+
+    def test_link_shared_by_several_skus(self):
+        links = {'SKU-BLK': f'{self.url}/sku?dl=0', 'SKU-IVR': f'{self.url}/sku?dl=0'}
+        res = dropbox_utils.download_files(self.product_dir, f'{self.url}/main?dl=0', f'{self.url}/main?dl=0', links)
+        self.assertEqual(res['product_main'], [path.replace('product_details', 'product_main') for path in res['product_details']])
+        self.assertEqual([os.path.basename(path) for path in res['SKU-IVR']], ['SKU-IVR_00_black.jpg'])
+
+        self.server.links['/sku'] = (zip_bytes({'black.jpg': b'black2'}), '"v2"')
+        again = dropbox_utils.download_files(self.product_dir, f'{self.url}/main?dl=0', f'{self.url}/main?dl=0', links)
+        self.assertEqual(again, res)
+        for path in sum(again.values(), []):
+            self.assertTrue(os.path.exists(path), path)
+        for prefix in links:
+            with open(again[prefix][0], 'rb') as f:
+                self.assertEqual(f.read(), b'black2')
+        self.assertEqual(set(dropbox_utils.read_manifest(self.product_dir)[f'{self.url}/sku?dl=0']), set(links))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from helpers.fake_shopify import FakeShopifyServer, FakeShopifyStore
+
+
+class TestFakeShopify(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeShopifyServer(FakeShopifyStore(media_processing_seconds=.1, bulk_operation_seconds=0),
+                                        maximum_available=100000, restore_rate=100000).start()
+        self.server.store.seed(products=3, variants_per_product=2)
+        self.client = self.server.client()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_client_round_trip(self):
+        product = self.client.product_create('New', '<p>new</p>', 'Vendor', ['new'],
+                                             option_lists=[[{'Color': 'Black'}, 100, 'NEW-BLK'], [{'Color': 'Red'}, 100, 'NEW-RED']])
+        self.assertEqual(self.client.product_id_by_sku('NEW-RED'), product['id'])
+        self.assertEqual([v['sku'] for v in self.client.product_by_title('New')['variants']['nodes']], ['NEW-BLK', 'NEW-RED'])
+
+        self.client.metafields_set([{'ownerId': product['id'], 'namespace': 'custom', 'key': 'size_table_html', 'value': '<table></table>'}])
+        self.assertEqual(self.client.metafield_values_by_owner_ids([product['id']], [('custom', 'size_table_html')]),
+                         {product['id']: {('custom', 'size_table_html'): '<table></table>'}})
+
+        location_id = self.client.location_id_by_name('Main Warehouse')
+        changes = self.client.set_inventory_quantity_by_sku_and_location_id('NEW-RED', location_id, 5)['changes']
+        self.assertEqual(changes, [{'name': 'available', 'delta': 5, 'quantityAfterChange': 5}])
+
+    def test_bulk_operations(self):
+        lines = list(self.client.run_bulk_query('{ products { edges { node { id variants { edges { node { sku } } } } } } }'))
+        self.assertEqual(len(lines), 9)
+        self.assertEqual(lines[1], {'sku': 'SKU00000-1', '__parentId': lines[0]['id']})
+
+        report = self.client.bulk_update_products([{'id': lines[0]['id'], 'tags': ['bulk']}])
+        self.assertTrue(report[0]['success'])
+        self.assertEqual(self.client.products_by_tag('bulk')[0]['id'], lines[0]['id'])
+
+    def test_throttled_requests_are_retried(self):
+        self.server.bucket.maximum_available, self.server.bucket.available, self.server.bucket.restore_rate = 30, 0, 50
+        self.assertTrue(self.client.variant_id_by_sku('SKU00000-1'))
+        self.assertEqual((self.server.requests, self.server.throttled), (2, 1))
+
+    def test_queries_over_the_max_cost_are_rejected(self):
+        available = self.server.bucket.status()['currentlyAvailable']
+        with self.assertRaisesRegex(RuntimeError, 'MAX_COST_EXCEEDED'):
+            self.client.run_query('{ products(first: 100) { nodes { id variants(first: 100) { nodes { id } } } } }')
+        self.assertGreaterEqual(self.server.bucket.status()['currentlyAvailable'], available)
+        self.server.bucket.maximum_available, self.server.bucket.available = 30, 30
+        self.assertFalse(self.server.bucket.take(40))
+        self.assertEqual(self.server.bucket.available, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
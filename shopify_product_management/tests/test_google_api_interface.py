@@ -0,0 +1,22 @@
+import subprocess
+import sys
+import unittest
+from helpers.client import Client
+
+
+class TestGoogleApiInterface(unittest.TestCase):
+
+    def test_services_are_built_on_first_use(self):
+        client = Client('shop', 'token', '/nonexistent/credential.json', sheet_id='sheet')
+        self.assertEqual(client.sheet_id, 'sheet')
+        with self.assertRaises(FileNotFoundError):
+            client.drive_service
+
+    def test_import_skips_google_and_image_libraries(self):
+        code = 'import sys, helpers.client; print(sorted(m for m in ("gspread", "googleapiclient", "google.oauth2", "PIL") if m in sys.modules))'
+        res = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(res.stdout.strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import unittest
+from PIL import Image, ImageDraw
+from helpers.image_ocr import ocr_image_filter, prepared_image, scan_images
+
+texts = {'model': 'MODEL INFO\n170cm', 'korean': '사이즈 안내', 'translated': 'サイズ'}
+
+
+def fake_ocr(path, lang, max_width):
+    """
+    stands in for Tesseract in the workers, recording each image it reads next to it.
+    """
+    img = prepared_image(path, max_width)
+    with open(os.path.join(os.path.dirname(path), 'ocr_calls'), 'a') as f:
+        f.write(f'{os.path.basename(path)} {img.width}x{img.height}\n')
+    return texts[os.path.basename(path).split('_')[0]]
+
+
+class TestImageOcr(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.cache_path = self.path('cache/ocr.json')
+        for i, name in enumerate(['model_00.jpg', 'korean_01.jpg', 'translated_02.jpg']):
+            img = Image.new('RGB', (3000, 1000), 'white')
+            ImageDraw.Draw(img).rectangle((500, 200 + i, 2500, 800), fill='black')
+            img.save(self.path(name))
+
+    def path(self, name):
+        return os.path.join(self.tempdir.name, name)
+
+    def calls(self):
+        if not os.path.exists(self.path('ocr_calls')):
+            return []
+        with open(self.path('ocr_calls')) as f:
+            return f.read().split('\n')[:-1]
+
+    def test_margins_cropped_and_scaled_down(self):
+        self.assertEqual(prepared_image(self.path('model_00.jpg'), 1000).size[0], 1000)
+        self.assertLess(prepared_image(self.path('model_00.jpg'), 1000).size[1], 310)
+
+    def test_images_read_once_by_content(self):
+        paths = [self.path(name) for name in ['model_00.jpg', 'korean_01.jpg', 'translated_02.jpg']]
+        res = scan_images(paths, self.cache_path, ocr=fake_ocr, max_workers=2)
+        self.assertEqual([r['label'] for r in res], ['model_info', 'korean', None])
+        self.assertEqual(len(self.calls()), 3)
+
+        shutil.copy(self.path('korean_01.jpg'), self.path('korean_copy.jpg'))
+        again = scan_images(paths + [self.path('korean_copy.jpg')], self.cache_path, ocr=fake_ocr)
+        self.assertEqual([r['label'] for r in again], ['model_info', 'korean', None, 'korean'])
+        self.assertEqual(len(self.calls()), 3)
+
+    def test_filter(self):
+        image_filter = ocr_image_filter(cache_path=self.cache_path, ocr=fake_ocr)
+        kept = image_filter([self.path(name) for name in ['model_00.jpg', 'korean_01.jpg', 'translated_02.jpg']])
+        self.assertEqual(kept, [self.path('translated_02.jpg')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from PIL import Image
+from helpers.image_validation import validate_image, validated_image_paths
+
+
+class TestImageValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tempdir.name, name)
+
+    def test_cmyk_converted_into_a_copy(self):
+        Image.new('CMYK', (40, 30), (0, 50, 50, 0)).save(self.path('cmyk.jpg'))
+        with open(self.path('cmyk.jpg'), 'rb') as f:
+            original = f.read()
+        report = validate_image(self.path('cmyk.jpg'), output_dir=self.tempdir.name)
+        self.assertEqual(report['fixes'], ['CMYK to sRGB'])
+        self.assertNotEqual(report['output_path'], self.path('cmyk.jpg'))
+        self.assertEqual(os.path.basename(report['output_path']), 'cmyk.jpg')
+        self.assertEqual(Image.open(report['output_path']).mode, 'RGB')
+        with open(self.path('cmyk.jpg'), 'rb') as f:
+            self.assertEqual(f.read(), original)
+
+    def test_unsupported_format_to_jpeg_with_alpha_flattened(self):
+        Image.new('RGBA', (40, 30), (255, 0, 0, 128)).save(self.path('layer.tiff'))
+        Image.new('RGB', (40, 30)).save(self.path('layer.jpg'))
+        report = validate_image(self.path('layer.tiff'), output_dir=self.tempdir.name)
+        self.assertEqual(os.path.basename(report['output_path']), 'layer.jpg')
+        self.assertNotEqual(report['output_path'], self.path('layer.jpg'))
+        self.assertEqual(report['fixes'], ['alpha flattened', 'TIFF to JPEG'])
+        self.assertEqual(Image.open(self.path('layer.jpg')).size, (40, 30))
+
+    def test_oversized_scaled_down(self):
+        Image.new('RGB', (400, 400)).save(self.path('large.png'))
+        report = validate_image(self.path('large.png'), limits={'max_megapixels': .04}, output_dir=self.tempdir.name)
+        self.assertEqual(Image.open(report['output_path']).size, (200, 200))
+        self.assertEqual(Image.open(self.path('large.png')).size, (400, 400))
+        self.assertFalse(report['errors'])
+
+    def test_decompression_bomb_reported(self):
+        Image.new('L', (400, 400)).save(self.path('bomb.png'))
+        with patch.object(Image, 'MAX_IMAGE_PIXELS', 100):
+            report = validate_image(self.path('bomb.png'))
+        self.assertIn('decompression bomb', report['errors'][0])
+
+    def test_rejected_images_reported_together(self):
+        frames = [Image.new('RGB', (20, 20), (i * 80, 0, 0)) for i in range(3)]
+        frames[0].save(self.path('animated.gif'), save_all=True, append_images=frames[1:])
+        with open(self.path('broken.jpg'), 'w') as f:
+            f.write('not an image')
+        with self.assertRaises(RuntimeError) as cm:
+            validated_image_paths([self.path('animated.gif'), self.path('broken.jpg')], limits={'max_frames': 1})
+        self.assertIn('2 of 2 images rejected', str(cm.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from helpers.shopify_graphql_client.client import ShopifyGraphqlClient
+from helpers.shopify_graphql_client.instrumentation import Instrumentation, JsonlTraceSink, OpenMetricsSink, operation_name
+
+
+def response(payload):
+    res = MagicMock()
+    res.json.return_value = payload
+    res.content = json.dumps(payload).encode('utf-8')
+    return res
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_operation_name(self):
+        self.assertEqual(operation_name('query productsByQuery($q: String!) { products(query: $q) { nodes { id } } }'), 'productsByQuery')
+        self.assertEqual(operation_name('{ productVariants(first: 10) { nodes { id } } }'), 'query:productVariants')
+        self.assertEqual(operation_name('mutation { productUpdate(input: {}) { product { id } } }'), 'mutation:productUpdate')
+
+    @patch('helpers.shopify_graphql_client.client.time.sleep')
+    @patch('helpers.shopify_graphql_client.client.requests.post')
+    def test_throttled_request_retried_and_recorded(self, mock_post, mock_sleep):
+        cost = {'requestedQueryCost': 52, 'actualQueryCost': 12,
+                'throttleStatus': {'maximumAvailable': 2000, 'currentlyAvailable': 2, 'restoreRate': 100}}
+        mock_post.side_effect = [response({'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}}], 'extensions': {'cost': cost}}),
+                                 response({'data': {'product': {'id': '1'}}, 'extensions': {'cost': cost}})]
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        with tempfile.TemporaryDirectory() as tempdir:
+            instrumentation = sgc.instrument(Instrumentation([JsonlTraceSink(os.path.join(tempdir, 'trace.jsonl')),
+                                                              OpenMetricsSink(os.path.join(tempdir, 'metrics.txt'))]), report_at_exit=False)
+            self.assertEqual(sgc.run_query('query productById { product(id: "1") { id } }'), {'product': {'id': '1'}})
+            instrumentation.close()
+            with open(os.path.join(tempdir, 'trace.jsonl')) as f:
+                trace = [json.loads(line) for line in f]
+            with open(os.path.join(tempdir, 'metrics.txt')) as f:
+                metrics = f.read()
+
+        mock_sleep.assert_called_once_with(.5)
+        [row] = instrumentation.summary()
+        self.assertEqual((row['operation'], row['calls'], row['retries'], row['actual_cost']), ('productById', 1, 1, 12))
+        self.assertEqual(trace[0]['throttle_wait'], .5)
+        self.assertIn('shopify_graphql_retries_total{operation="productById"} 1', metrics)
+        self.assertIn('slowest operations', instrumentation.report())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from helpers.fake_shopify import FakeShopifyServer, FakeShopifyStore
+from helpers.shopify_graphql_client import inventory_management
+
+
+class TestInventoryManagement(unittest.TestCase):
+
+    def setUp(self):
+        inventory_management.location_registries.clear()
+        self.server = FakeShopifyServer(FakeShopifyStore(), maximum_available=100000, restore_rate=100000).start()
+        self.store = self.server.store
+        self.store.seed(products=4, variants_per_product=3)
+        self.second_location_id = self.store.add_location('Second Warehouse')
+        self.client = self.server.client()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_locations_are_read_once(self):
+        main_location_id = self.client.location_id_by_name('Main Warehouse')
+        self.assertEqual(self.client.location_id_by_name('Second Warehouse'), self.second_location_id)
+        self.assertEqual(self.client.location_id_by_name('Main Warehouse'), main_location_id)
+        self.assertEqual(self.server.requests, 1)
+        with self.assertRaises(AssertionError):
+            self.client.location_id_by_name('Warehouse')
+
+    def test_enable_and_activate_inventories(self):
+        skus = [f'SKU{i:05d}-{j + 1}' for i in range(4) for j in range(3)]
+        res = self.client.enable_and_activate_inventories(skus, ['Main Warehouse', 'Second Warehouse'], batch_size=5)
+        self.assertEqual(list(res), skus)
+        # a variants search, the locations, one tracking request of 4 products and 3 activation requests of 12 items
+        self.assertEqual(self.server.requests, 6)
+        for inventory_item_id in res.values():
+            item = self.store.inventory_items[inventory_item_id]
+            self.assertTrue(item['tracked'])
+            self.assertIn(self.second_location_id, item['levels'])
+
+    def test_set_inventory_quantities_by_skus(self):
+        location_id = self.client.location_id_by_name('Main Warehouse')
+        sku_quantity_map = {f'SKU{i:05d}-{j + 1}': i + j for i in range(4) for j in range(3)}
+        changes = self.client.set_inventory_quantities_by_skus_and_location_id(sku_quantity_map, location_id, batch_size=5)
+        # the locations, a variants search and 3 requests of 5 quantities
+        self.assertEqual(self.server.requests, 5)
+        self.assertEqual(len(changes), sum(1 for quantity in sku_quantity_map.values() if quantity))
+        variants = self.client.variants_by_skus(list(sku_quantity_map))
+        for sku, quantity in sku_quantity_map.items():
+            self.assertEqual(self.store.inventory_items[variants[sku]['inventoryItem']['id']]['levels'][location_id]['available'], quantity)
+
+
+if __name__ == '__main__':
+    unittest.main()
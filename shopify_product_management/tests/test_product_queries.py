@@ -0,0 +1,30 @@
+import unittest
+from helpers.fake_shopify import FakeShopifyServer, FakeShopifyStore
+from helpers.shopify_graphql_client.product_queries import products_query
+
+
+class TestProductQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeShopifyServer(FakeShopifyStore(), maximum_available=100000, restore_rate=100000).start()
+        self.server.store.seed(products=2, variants_per_product=3)
+        self.client = self.server.client()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_id_lookups_select_only_ids(self):
+        product = self.client.product_by_title('Product 00001')
+        full_cost = self.server.actual_cost
+        self.assertEqual(self.client.product_id_by_title('Product 00001'), product['id'])
+        self.assertLess(self.server.actual_cost - full_cost, full_cost)
+        self.assertEqual(self.client.product_by_handle(product['handle'], profile='ids'), {'id': product['id']})
+
+    def test_documents_are_built_once_per_profile(self):
+        self.assertIs(products_query('ids', ('status',)), products_query('ids', ('status',)))
+        self.assertNotIn('variants', products_query('summary'))
+        self.assertIn('compareAtPrice', products_query('pricing'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from helpers.fake_shopify import FakeShopifyServer, FakeShopifyStore
+
+
+class TestProductVariantsToProducts(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeShopifyServer(FakeShopifyStore(media_processing_seconds=0, bulk_operation_seconds=0),
+                                        maximum_available=100000, restore_rate=100000).start()
+        self.addCleanup(self.server.stop)
+        store = self.server.store
+        colors, sizes = ['Black', 'Ivory'], ['S', 'M']
+        res = store.product_set({'input': {
+            'title': 'Jumper',
+            'productOptions': [{'name': 'カラー', 'values': [{'name': color} for color in colors]},
+                               {'name': 'サイズ', 'values': [{'name': size} for size in sizes]}],
+            'variants': [{'sku': f'JP-{color[:3].upper()}-{size}', 'price': '10000',
+                          'optionValues': [{'optionName': 'カラー', 'name': color}, {'optionName': 'サイズ', 'name': size}]}
+                         for color in colors for size in sizes],
+        }})
+        product = store.products[res['product']['id']]
+        for i in range(4):
+            media = store.create_media(f'{store.base_url}/cdn/seed/jumper-{i}.jpg', f'jumper {i}')
+            media['ready_at'] = 0
+            store.attach_media(product, media)
+        for variant_id in product['variant_ids']:
+            variant = store.variants[variant_id]
+            variant['media_ids'] = [product['media_ids'][0 if variant['title'].startswith('Black') else 2]]
+        self.source = product
+        self.client = self.server.client()
+
+    def test_reuse_media_references_the_original_files(self):
+        store = self.server.store
+        media_count = len(store.media)
+        new_product_ids = self.client.product_variants_to_products('Jumper')
+
+        self.assertEqual(len(new_product_ids), 2)
+        self.assertEqual(len(store.media), media_count)
+        self.assertFalse(store.staged_uploads)
+        for product_id, color, media_ids in zip(new_product_ids, ['Black', 'Ivory'], [self.source['media_ids'][:2], self.source['media_ids'][2:]]):
+            product = store.products[product_id]
+            self.assertEqual(product['media_ids'], media_ids)
+            self.assertEqual(product['handle'], f'jumper-{color.lower()}')
+            self.assertEqual([option['name'] for option in product['options']], ['サイズ'])
+            variants = [store.variants[variant_id] for variant_id in product['variant_ids']]
+            self.assertEqual([variant['sku'] for variant in variants], [f'JP-{color[:3].upper()}-S', f'JP-{color[:3].upper()}-M'])
+            self.assertEqual({variant['media_ids'][0] for variant in variants}, {media_ids[0]})
+
+
+if __name__ == '__main__':
+    unittest.main()
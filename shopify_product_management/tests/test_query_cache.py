@@ -0,0 +1,48 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from helpers.fake_shopify import FakeShopifyServer, FakeShopifyStore
+from helpers.shopify_graphql_client import inventory_management
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        inventory_management.location_registries.clear()
+        self.server = FakeShopifyServer(FakeShopifyStore(media_processing_seconds=0, bulk_operation_seconds=0),
+                                        maximum_available=100000, restore_rate=100000).start()
+        self.server.store.seed(products=3, variants_per_product=2)
+        self.client = self.server.client()
+        self.cache = self.client.use_query_cache()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_identical_reads_are_sent_once(self):
+        location_id = self.client.location_id_by_name('Main Warehouse')
+        for sku in ['SKU00000-1', 'SKU00000-2', 'SKU00001-1']:
+            self.client.enable_and_activate_inventory(sku, ['Main Warehouse'])
+        self.assertEqual(self.client.location_id_by_name('Main Warehouse'), location_id)
+        # one location read, then an inventory item read and two mutations per sku
+        self.assertEqual(self.server.requests, 1 + 3 * 3)
+
+    def test_mutations_invalidate_touched_reads(self):
+        product = self.client.product_by_title('Product 00000')
+        self.client.tags_add(product['id'], ['new'])
+        self.assertIn('new', self.client.product_by_title('Product 00000')['tags'])
+
+        with self.assertRaises(Exception):
+            self.client.product_id_by_sku('NEW-BLK')
+        created = self.client.product_create('New', '', 'Vendor', [], option_lists=[[{'Color': 'Black'}, 100, 'NEW-BLK']])
+        self.assertEqual(self.client.product_id_by_sku('NEW-BLK'), created['id'])
+
+    def test_concurrent_reads_share_one_request(self):
+        self.server.latency = .2
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            ids = list(executor.map(lambda _: self.client.product_id_by_title('Product 00001'), range(4)))
+        self.assertEqual(len(set(ids)), 1)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.cache.stats()['coalesced'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
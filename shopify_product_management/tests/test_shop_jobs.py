@@ -0,0 +1,54 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+import shop_jobs
+from helpers.fake_shopify import FakeShopifyServer, FakeShopifyStore
+from helpers.shopify_graphql_client import inventory_management
+
+
+def fake_client(shop_name):
+    from helpers.shopify_graphql_client import ShopifyGraphqlClient
+    client = ShopifyGraphqlClient(shop_name, 'fake-token')
+    client.base_url = json.loads(os.environ['FAKE_SHOPIFY_URLS'])[shop_name]
+    return client
+
+
+class TestShopJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = {}
+        for shop_name, products in [('shop-a', 2), ('shop-b', 5)]:
+            self.servers[shop_name] = FakeShopifyServer(FakeShopifyStore(), maximum_available=100000, restore_rate=100000).start()
+            self.servers[shop_name].store.seed(products=products, variants_per_product=1)
+        os.environ['FAKE_SHOPIFY_URLS'] = json.dumps({shop_name: server.graphql_url for shop_name, server in self.servers.items()})
+
+    def tearDown(self):
+        for server in self.servers.values():
+            server.stop()
+        del os.environ['FAKE_SHOPIFY_URLS']
+
+    def test_job_runs_on_every_shop(self):
+        results = shop_jobs.run_job('tag-audit', ['shop-b', 'shop-a', 'shop-c'], client_factory=fake_client)
+        self.assertEqual([res['shop'] for res in results], ['shop-b', 'shop-a', 'shop-c'])
+        self.assertEqual([res['result'] for res in results[:2]], [{'products': 5, 'tags': 2}, {'products': 2, 'tags': 2}])
+        self.assertEqual([res['requests'] for res in results[:2]], [1, 1])
+        self.assertEqual(results[2]['status'], 'error')
+        self.assertIn('shop-c', shop_jobs.results_table(results))
+
+    def test_stock_sync(self):
+        inventory_management.location_registries.clear()
+        client = fake_client('shop-b')
+        rows = [['sku', 'quantity'], ['SKU00000-1', '3'], ['', ''], ['SKU00001-1', '0'], ['SKU00002-1', '5']]
+        with patch.object(client, 'worksheet_rows', create=True, return_value=rows):
+            res = shop_jobs.stock_sync(client, 'sheet', 'A', 'B', 1, 'Main Warehouse', sheet_id='sheet_id')
+        self.assertEqual(res, {'skus': 3, 'updated': 2})
+        # the locations, a variants search and one inventorySetQuantities
+        self.assertEqual(self.servers['shop-b'].requests, 3)
+        with patch.object(client, 'worksheet_rows', create=True, return_value=rows + [['SKU00000-1', '1']]):
+            with self.assertRaisesRegex(AssertionError, 'same sku'):
+                shop_jobs.stock_sync(client, 'sheet', 'A', 'B', 1, 'Main Warehouse', sheet_id='sheet_id')
+
+
+if __name__ == '__main__':
+    unittest.main()
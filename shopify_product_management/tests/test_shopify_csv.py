@@ -0,0 +1,43 @@
+import io
+import unittest
+import pandas as pd
+from helpers.shopify_csv import fill_product_hierarchy, read_export_chunks, set_inventory_levels, tag_matrix
+
+export_csv = """Handle,Title,Tags,Option1 Name,Option1 Value,Variant SKU
+a,A,"x, y",Color,Red,'A-01
+a,,,,Blue,A-02
+b,B,y,Title,Default Title,B-01
+b,,,,,
+c,C,,Color,Blue,C-01
+"""
+
+
+class TestShopifyCsv(unittest.TestCase):
+
+    def test_fill_product_hierarchy(self):
+        df = fill_product_hierarchy(pd.read_csv(io.StringIO(export_csv)))
+        self.assertEqual(df['Title'].tolist(), ['A', 'A', 'B', 'B', 'C'])
+        self.assertEqual(df['Option1 Name'].fillna('').tolist(), ['Color', 'Color', 'Title', '', 'Color'])
+        self.assertEqual(df['Variant SKU'].tolist()[:2], ['A-01', 'A-02'])
+
+    def test_read_export_chunks_fills_across_chunks(self):
+        chunks = list(read_export_chunks(io.StringIO(export_csv), chunksize=2))
+        whole = fill_product_hierarchy(pd.read_csv(io.StringIO(export_csv), dtype=str))
+        self.assertTrue(pd.concat(chunks).equals(whole))
+
+    def test_tag_matrix(self):
+        df = fill_product_hierarchy(pd.read_csv(io.StringIO(export_csv)))
+        matrix = tag_matrix(df)
+        self.assertEqual(list(matrix.columns), ['Handle', 'Title', 'x', 'y'])
+        self.assertEqual(matrix['x'].tolist(), [True, False])
+        self.assertIsInstance(matrix['y'].dtype, pd.SparseDtype)
+
+    def test_set_inventory_levels(self):
+        inventory = pd.DataFrame({'SKU': ['A', 'A', 'B'], 'Location': ['KUME', 'Envycube', 'KUME'],
+                                  'Available': [1, 2, 3], 'On hand': [1, 2, 3]})
+        res = set_inventory_levels(inventory, pd.Series({'A': 9}), 'KUME', zero_locations=['Envycube'])
+        self.assertEqual(res['Available'].tolist(), [9, 0, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -43,7 +43,8 @@ class TestShopifyFunctions(unittest.TestCase):
             'products': {
                 'nodes': [
                     {'id': 'gid://shopify/Product/12345', 'title': 'Test Product'}
-                ]
+                ],
+                'pageInfo': {'hasNextPage': False, 'endCursor': None}
             }
         }
 
@@ -120,6 +121,188 @@ class TestShopifyFunctions(unittest.TestCase):
         self.assertIsNotNone(result)
         mock_run_query.assert_called_once()
 
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    def test_update_variation_products_metafields(self, mock_run_query):
+        mock_run_query.side_effect = lambda query, variables: {
+            'metafieldsSet': {
+                'metafields': [{'id': f"gid://shopify/Metafield/{m['ownerId'].rsplit('/', 1)[-1]}"} for m in variables['metafields']],
+                'userErrors': []
+            }
+        }
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        product_ids = [f'gid://shopify/Product/{i}' for i in range(30)]
+        result = sgc.update_variation_products_metafields(product_ids)
+
+        self.assertEqual(result, [f'gid://shopify/Metafield/{i}' for i in range(30)])
+        self.assertEqual(mock_run_query.call_count, 2)
+        self.assertEqual(sorted(len(c.args[1]['metafields']) for c in mock_run_query.call_args_list), [5, 25])
+
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    def test_metafield_id_by_namespace_and_key_cached_per_shop(self, mock_run_query):
+        mock_run_query.return_value = {
+            'metafieldDefinitions': {
+                'nodes': [{'id': 'gid://shopify/MetafieldDefinition/1', 'namespace': 'custom', 'key': 'product_description', 'type': {'name': 'rich_text_field'}},
+                          {'id': 'gid://shopify/MetafieldDefinition/2', 'namespace': 'custom', 'key': 'size_table_html', 'type': {'name': 'multi_line_text_field'}}],
+                'pageInfo': {'hasNextPage': False, 'endCursor': None}
+            }
+        }
+        from shopify_product_management.shopify_utils import metafield_id_by_namespace_and_key
+        first = metafield_id_by_namespace_and_key('definitions_cache_shop', 'access_token', 'custom', 'product_description')
+        second = metafield_id_by_namespace_and_key('definitions_cache_shop', 'access_token', 'custom', 'size_table_html')
+
+        self.assertEqual([first, second], ['gid://shopify/MetafieldDefinition/1', 'gid://shopify/MetafieldDefinition/2'])
+        mock_run_query.assert_called_once()
+
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    def test_metafield_values_by_owner_ids(self, mock_run_query):
+        mock_run_query.return_value = {
+            'nodes': [{'id': 'gid://shopify/Product/1', 'metafield0': {'value': 'desc'}, 'metafield1': None}, None]
+        }
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        result = sgc.metafield_values_by_owner_ids(['gid://shopify/Product/1', 'gid://shopify/Product/2'],
+                                                   [('custom', 'product_description'), ('custom', 'size_table_html')])
+
+        self.assertEqual(result, {'gid://shopify/Product/1': {('custom', 'product_description'): 'desc', ('custom', 'size_table_html'): None}})
+        self.assertIn('metafield1: metafield(namespace: "custom", key: "size_table_html")', mock_run_query.call_args.args[0])
+        mock_run_query.assert_called_once()
+
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    def test_tag_remapping_plan_and_batch(self, mock_run_query):
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        products_tags = {'gid://shopify/Product/1': {'title': 'a', 'tags': ['DRESS', 'Dress', 'new']},
+                         'gid://shopify/Product/2': {'title': 'b', 'tags': ['sale', 'new']},
+                         'gid://shopify/Product/3': {'title': 'c', 'tags': ['new']}}
+        plan = sgc.tag_remapping_plan({'DRESS': 'Dress', 'sale': '', 'new': 'new'}, products_tags)
+
+        self.assertEqual(plan, {'gid://shopify/Product/1': {'add': ['Dress'], 'remove': ['DRESS']},
+                                'gid://shopify/Product/2': {'add': [], 'remove': ['sale']}})
+
+        mock_run_query.return_value = {'remove0': {'userErrors': []}, 'add0': {'userErrors': []}, 'remove1': {'userErrors': []}}
+        sgc.apply_tag_changes(plan)
+        query = mock_run_query.call_args.args[0]
+        self.assertLess(query.index('remove0: tagsRemove'), query.index('add0: tagsAdd'))
+        self.assertNotIn('add1', query)
+        mock_run_query.assert_called_once()
+
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    def test_price_diff_and_apply(self, mock_run_query):
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        store_prices = [{'variant_id': f'gid://shopify/ProductVariant/{i}', 'sku': sku, 'price': price, 'compare_at_price': compare_at_price,
+                         'product_id': product_id, 'title': 't', 'status': 'ACTIVE'}
+                        for i, (sku, price, compare_at_price, product_id) in enumerate([('A1', '100.00', None, 'gid://shopify/Product/1'),
+                                                                                       ('A2', '100.00', '120.00', 'gid://shopify/Product/1'),
+                                                                                       ('B1', '200.00', None, 'gid://shopify/Product/2')])]
+        sheet_prices = [{'sku': 'A1', 'price': '¥100', 'compare_at_price': ''},
+                        {'sku': 'A2', 'price': 90, 'compare_at_price': '120'},
+                        {'sku': 'B1', 'price': '¥1,200', 'compare_at_price': ''},
+                        {'sku': 'C1', 'price': '300', 'compare_at_price': ''}]
+        diff = sgc.price_diff(sheet_prices, store_prices)
+
+        self.assertEqual(diff['sku'].tolist(), ['A2', 'B1'])
+        self.assertEqual(diff['price_expected'].tolist(), [90, 1200])
+
+        mock_run_query.return_value = {'productVariantsBulkUpdate': {'productVariants': [], 'userErrors': []}}
+        sgc.apply_price_diff(diff)
+        variants = sorted((c.args[1]['productId'], c.args[1]['variants']) for c in mock_run_query.call_args_list)
+        self.assertEqual(variants, [('gid://shopify/Product/1', [{'id': 'gid://shopify/ProductVariant/1', 'price': '90.00', 'compareAtPrice': '120.00'}]),
+                                    ('gid://shopify/Product/2', [{'id': 'gid://shopify/ProductVariant/2', 'price': '1200.00', 'compareAtPrice': None}])])
+
+    def test_variants_to_products_plan(self):
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        medias = [{'id': f'gid://shopify/MediaImage/{i}'} for i in range(4)]
+        variants = [{'id': f'gid://shopify/ProductVariant/{i}', 'title': f'{color} / {size}',
+                     'selectedOptions': [{'name': 'カラー', 'value': color}, {'name': 'サイズ', 'value': size}],
+                     'media': {'nodes': [medias[start]]}}
+                    for i, (color, size, start) in enumerate([('Dark Navy', 'S', 0), ('Dark Navy', 'M', 0), ('Ivory', 'S', 2)])]
+        with patch.object(ShopifyGraphqlClient, 'product_variants_by_product_id', return_value=variants), \
+             patch.object(ShopifyGraphqlClient, 'medias_by_product_id', return_value=medias) as mock_medias:
+            plans = sgc.variants_to_products_plan({'id': 'gid://shopify/Product/1', 'handle': 'jumper'}, 'カラー')
+
+        self.assertEqual([(plan['option_value'], plan['handle'], plan['media_positions']) for plan in plans],
+                         [('Dark Navy', 'jumper-dark-navy', {0, 1}), ('Ivory', 'jumper-ivory', {2, 3})])
+        self.assertEqual(plans[1]['media_ids'], ['gid://shopify/MediaImage/2', 'gid://shopify/MediaImage/3'])
+        self.assertEqual(plans[0]['variant_media'], {'Dark Navy / S': 'gid://shopify/MediaImage/0', 'Dark Navy / M': 'gid://shopify/MediaImage/0'})
+        mock_medias.assert_called_once()
+
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    def test_medias_by_sku_one_query_per_product(self, mock_run_query):
+        medias = [{'id': f'gid://shopify/MediaImage/{i}'} for i in range(4)]
+        variants = [{'id': f'gid://shopify/ProductVariant/{i}', 'sku': sku, 'media': {'nodes': [medias[start]]}}
+                    for i, (sku, start) in enumerate([('NV-S', 0), ('NV-M', 0), ('IV-S', 2)])]
+        mock_run_query.return_value = {'productVariants': {'nodes': [{'product': {'id': 'gid://shopify/Product/1',
+                                                                                  'media': {'nodes': medias},
+                                                                                  'variants': {'nodes': variants}}}]}}
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+
+        self.assertEqual(sgc.medias_by_sku('NV-M'), medias[:2])
+        self.assertEqual(sgc.medias_by_sku('IV-S'), medias[2:])
+        self.assertEqual(sgc.medias_by_variant_id('gid://shopify/ProductVariant/0'), medias[:2])
+        mock_run_query.assert_called_once()
+
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    def test_files_index(self, mock_run_query):
+        def files_page(names, has_next_page):
+            return {'files': {'nodes': [{'id': f'gid://shopify/MediaImage/{name}', 'alt': '',
+                                         'image': {'url': f'https://cdn.shopify.com/s/files/1/files/{name}?v=1'}} for name in names],
+                              'pageInfo': {'hasNextPage': has_next_page, 'endCursor': 'cursor'}}}
+        mock_run_query.side_effect = [files_page(['b_1.jpg', 'a_2.jpg'], True), files_page(['a_1.jpg'], False)]
+        sgc = ShopifyGraphqlClient('files_index_shop', 'dummy_access_token')
+        index = sgc.files_index()
+
+        self.assertEqual([file['file_name'] for file in index.by_prefix('a_')], ['a_1.jpg', 'a_2.jpg'])
+        self.assertEqual(sgc.file_id_by_file_name('b_1.jpg'), 'gid://shopify/MediaImage/b_1.jpg')
+        self.assertEqual(mock_run_query.call_count, 2)
+
+    @patch('helpers.shopify_graphql_client.file_queries.validated_image_paths', side_effect=lambda paths, **kwargs: list(paths))
+    @patch.object(ShopifyGraphqlClient, 'upload_image')
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    def test_upload_and_assign_description_images(self, mock_run_query, mock_upload_image, mock_validated_image_paths):
+        def file_node(i, status):
+            return {'id': f'gid://shopify/MediaImage/{i}', 'fileStatus': status,
+                    'image': {'url': f'https://cdn.shopify.com/s/files/1/files/detail_{i}_abc.jpg?v=1'} if status == 'READY' else None}
+        mock_run_query.side_effect = [
+            {'stagedUploadsCreate': {'stagedTargets': [{'url': 'u', 'resourceUrl': f'r{i}', 'parameters': []} for i in range(2)]}},
+            {'fileCreate': {'files': [file_node(i, 'UPLOADED') for i in range(2)], 'userErrors': []}},
+            {'nodes': [file_node(0, 'READY'), file_node(1, 'PROCESSING')]},
+            {'nodes': [file_node(1, 'READY')]},
+            {'productUpdate': {'product': {'id': 'gid://shopify/Product/1'}, 'userErrors': []}},
+        ]
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        sgc.upload_and_assign_description_images_to_shopify('1', ['/tmp/detail_0.jpg', '/tmp/detail_1.jpg', '/tmp/detail.psd'],
+                                                            'dummy', 'https://cdn.shopify.com/s/files/1')
+
+        self.assertEqual(mock_upload_image.call_count, 2)
+        self.assertEqual(mock_run_query.call_args_list[3].args[1], {'ids': ['gid://shopify/MediaImage/1']})
+        description = mock_run_query.call_args.args[1]['input']['descriptionHtml']
+        self.assertIn('https://cdn.shopify.com/s/files/1/files/detail_1_abc.jpg', description)
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    def test_variant_media_read_overlapping_a_mutation_not_cached(self, mock_run_query):
+        medias = [{'id': f'gid://shopify/MediaImage/{i}'} for i in range(2)]
+        product = {'id': 'gid://shopify/Product/1', 'media': {'nodes': medias},
+                   'variants': {'nodes': [{'id': 'gid://shopify/ProductVariant/1', 'sku': 'NV-S', 'media': {'nodes': medias[:1]}}]}}
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+
+        def read_during_mutation(query, variables=None):
+            if 'productVariantAppendMedia' in query:
+                return {'productVariantAppendMedia': {'userErrors': []}}
+            if mock_run_query.call_count == 1:      # a mutation of the product returns while this read is in flight
+                sgc.append_variant_media('gid://shopify/Product/1', {'gid://shopify/ProductVariant/1': medias[1]['id']})
+            return {'productVariants': {'nodes': [{'product': product}]}}
+        mock_run_query.side_effect = read_during_mutation
+
+        self.assertEqual(sgc.medias_by_sku('NV-S'), medias)
+        self.assertIsNone(sgc.variant_media_cache.get('NV-S'))
+        sgc.medias_by_sku('NV-S')
+        self.assertIsNotNone(sgc.variant_media_cache.get('NV-S'))
+        self.assertEqual(mock_run_query.call_count, 3)
+
+    @patch.object(ShopifyGraphqlClient, 'run_query')
+    def test_wait_for_missing_file(self, mock_run_query):
+        mock_run_query.return_value = {'nodes': [{'id': 'gid://shopify/MediaImage/1', 'fileStatus': 'READY'}, None]}
+        sgc = ShopifyGraphqlClient('dummy_shop_name', 'dummy_access_token')
+        with self.assertRaisesRegex(RuntimeError, 'gid://shopify/MediaImage/2 does not exist'):
+            sgc.wait_for_files_ready(['gid://shopify/MediaImage/1', 'gid://shopify/MediaImage/2'])
+
 
 if __name__ == '__main__':
     unittest.main()
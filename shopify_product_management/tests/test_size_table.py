@@ -0,0 +1,37 @@
+import unittest
+from helpers.size_table import detect_format, size_table_html
+
+
+class TestSizeTable(unittest.TestCase):
+
+    def test_detect_format(self):
+        self.assertEqual(detect_format({'S': '高さ：10'}), 'size_dict')
+        self.assertEqual(detect_format('[0] 着丈 84 / 肩幅 40\n[1] 着丈 90 / 肩幅 42'), 'bracketed_sizes')
+        self.assertEqual(detect_format('着丈 84 / 肩幅 50\n袖丈 60'), 'slash_pairs')
+        self.assertEqual(detect_format('Shoulder strap(cm) 120\n350g'), 'measurement_lines')
+        self.assertEqual(detect_format('※ 平置き採寸です\nサイズ  着丈  胸囲\nS  60  50\n'), 'size_chart')
+
+    def test_measurement_lines(self):
+        result = size_table_html('Width(cm) 30\n\n350g', 'measurement_lines')
+        self.assertEqual(result, '<table><thead><tr><th>Width(cm</th><th>Weight</th></tr></thead>'
+                                 '<tbody><tr><td>30</td><td>350g</td></tr></tbody></table>')
+
+    def test_bracketed_sizes(self):
+        result = size_table_html('[0] 着丈 84 / 肩幅 40\n[1] 着丈 90 / 肩幅 42')
+        self.assertIn('<th>Size</th>', result)
+        self.assertEqual(result.count('<tr>'), 3)
+        self.assertIn('<td>1</td>\n      <td>90</td>\n      <td>42</td>', result)
+
+    def test_size_chart(self):
+        result = size_table_html('※ 平置き採寸です\nサイズ  着丈  胸囲\nS  60  50\nM  62  52\n')
+        self.assertEqual(result, "<table border='1'><thead><tr><th></th><th>着丈</th><th>胸囲</th></tr></thead><tbody>"
+                                 "<tr><td>S</td><td>60</td><td>50</td></tr><tr><td>M</td><td>62</td><td>52</td></tr></tbody></table>\n\n"
+                                 "<p>※ 平置き採寸です</p>\n")
+
+    def test_cached_by_input_text(self):
+        size_text = '着丈 70 / 肩幅 45'
+        self.assertIs(size_table_html(size_text), size_table_html(size_text))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,11 +5,14 @@ import utils
 hidden_description_element_old = 'hidden_product_description_text'
 fb_sync_description_element = 'fb_sync:product_description'
 
-def get_updated_description(sgc:utils.Client, product_id):
+metafield_namespace_keys = [('custom', 'product_description'), ('custom', 'size_table_html')]
+
+def get_updated_description(sgc:utils.Client, product_id, metafield_values=None):
     description_html = sgc.product_description_by_product_id(product_id)
-    metafield_product_description = sgc.product_metafield_value_by_product_id(product_id, 'custom', 'product_description')
+    metafield_values = metafield_values or sgc.metafield_values_by_owner_ids([product_id], metafield_namespace_keys)[product_id]
+    metafield_product_description = metafield_values[('custom', 'product_description')]
     metafield_product_description_converted = sgc.convert_rich_text_to_html(metafield_product_description)
-    metafield_size_table_html = sgc.product_metafield_value_by_product_id(product_id, 'custom', 'size_table_html')
+    metafield_size_table_html = metafield_values[('custom', 'size_table_html')]
     description_html = re.sub(f'<{hidden_description_element_old}>.*</{hidden_description_element_old}>', '', description_html, flags=re.DOTALL)
     description_html = re.sub(f'<{fb_sync_description_element}>.*</{fb_sync_description_element}>', '', description_html, flags=re.DOTALL)
     updated_description = description_html
@@ -23,17 +26,17 @@ def main():
     shop_name = 'apricot-studios'
     client = utils.client(shop_name)
     rows = client.worksheet_rows(client.sheet_id, 'Products Master')
-    for row in rows[1:]:
-        title = row[string.ascii_lowercase.index('b')].strip()
-        if title:
-            product_id = client.product_id_by_title(title)
-            print(product_id, title)
-            updated_description = get_updated_description(client, product_id)
+    titles = [title for row in rows[1:] if (title := row[string.ascii_lowercase.index('b')].strip())]
+    product_ids = [client.product_id_by_title(title) for title in titles]
+    metafield_values = client.metafield_values_by_owner_ids(product_ids, metafield_namespace_keys)
+    for title, product_id in zip(titles, product_ids):
+        print(product_id, title)
+        updated_description = get_updated_description(client, product_id, metafield_values[product_id])
 
-            print()
-            print('updated:')
-            print(updated_description)
-            client.update_product_description(product_id, updated_description)
+        print()
+        print('updated:')
+        print(updated_description)
+        client.update_product_description(product_id, updated_description)
 
 
 if __name__ == '__main__':
@@ -51,26 +51,18 @@ tags_mapping = {
     'new': 'new',
     'new2025-01-31': 'new2025-01-31',
 }
-def get_tag(tag):
-    if tag in tags_mapping:
-        return tags_mapping[tag]
-    else:
-        assert tag in tags_mapping.values(), "Tag not found in mapping"
-        return tag
 def main():
     sgc = utils.client('gbhjapan')
-    for b, a in tags_mapping.items():
-        if b != a:
-            print(f'processing {b}')
-            products = sgc.products_by_tag(b)
-            for product in products:
-                tags = product['tags']
-                new_tags = [get_tag(tag) for tag in tags]
-                if tags != new_tags:
-                    print(f'Updating {product["title"]}')
-                    print(f'from {tags}')
-                    print(f'to {new_tags}')
-                    sgc.update_product_tags(product['id'], ','.join(new_tags))
+    products_tags = sgc.products_tags()
+    plan = sgc.tag_remapping_plan(tags_mapping, products_tags)
+    # only the products being retagged have to be fully mapped, as when each of their tags went through the mapping
+    plan_tags = sgc.tag_index({product_id: products_tags[product_id] for product_id in plan})
+    assert not (unknown_tags := set(plan_tags) - set(tags_mapping) - set(tags_mapping.values())), f"Tags not found in mapping: {unknown_tags}"
+    for product_id, changes in plan.items():
+        print(f'Updating {products_tags[product_id]["title"]}')
+        print(f'remove {changes["remove"]}')
+        print(f'add {changes["add"]}')
+    sgc.apply_tag_changes(plan)
 
 if __name__ == '__main__':
     main()
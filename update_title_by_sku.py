@@ -4,18 +4,23 @@ import utils
 def main():
     sheet_name = '20250211_v3'
     client = utils.client('rawrowr')
-    rows = client.get_rows(client.google_sheet_id, sheet_name)
+    rows = client.worksheet_rows(client.sheet_id, sheet_name)
     title_col = string.ascii_lowercase.index('b')
     sku_col = string.ascii_lowercase.index('q')
 
     print(len(rows))
+    product_inputs = []
     for row in rows[2:]:
         title =row[title_col]
         if title:
             sku = row[sku_col]
-            product_id = sgc.product_id_by_sku(sku)
+            product_id = client.product_id_by_sku(sku)
             print(f'{product_id}: {title}')
-            client.update_product_title(product_id, title)
+            product_inputs.append({'id': product_id, 'title': title})
+    report = client.bulk_update_products(product_inputs)
+    for row in report:
+        if not row['success']:
+            print(f"failed to update {row['variables']['input']}: {row['errors']}")
 
 if __name__ == '__main__':
     main()